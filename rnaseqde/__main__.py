@@ -7,17 +7,34 @@ Usage:
     rnaseqde [options] <sample_sheet>
 
 Options:
-    --workflow <TYPE>     : Workflow [default: fullset]
+    --workflow <TYPE>     : Workflow name or definition yml path [default: fullset]
     --conf <PATH>         : Directory contain configure files for each tool
     --layout <TYPE>       : Library layout (sr/pe) [default: sr]
     --strandness <TYPE>   : Library strandness (none/rf/fr) [default: none]
+    --hisat2-output <TYPE>  : HISAT2 output (bam/sam); bam is sorted in the alignment job [default: bam]
+    --count-engine <ENGINE>  : Engine of count matrices (native/legacy) [default: native]
+    --rsem-abundance      : Also merge TPM and FPKM of RSEM into matrices [default: False]
     --reference <NAME>    : Reference name [default: grch38]
     --annotation <NAME>   : Annotation name (in the case using only one annotation)
     --step-by-step <TYPE> : Run with step (align/quant/de)
     --assets <PATH>       : Assets yml path
     --resume-from <TYPE>  : Resume workflow from (align/quant/de)
+    --cache <TYPE>        : Skip unchanged tasks, identifying input files by (stat/checksum)
+    --scheduler <TYPE>    : Job scheduler (auto/uge/slurm/local) [default: auto]
+    --samples-per-job <N>  : Samples processed by each array job (integer/auto) [default: 1]
+    --star-batch <N>      : Align N samples per STAR job, keeping the genome in shared memory
+    --validate-fastq      : Check integrity and read counts of FASTQs before submission [default: False]
+    --resources <PATH>    : Resource requests per task overriding config/resources.yml
+    --clean               : Delete or compress intermediates once consumed [default: False]
+    --retention <PATH>    : Retention policy per task overriding config/retention.yml
     --ar <ID>             : Advanced Reservation ID (only specify when using UGE)
-    --dry-run             : Dry-run [default: False]
+    --watch               : Monitor submitted jobs until they finish [default: False]
+    --poll-interval <SEC>  : Interval of polling the job scheduler [default: 60]
+    --log-max-size <MB>   : Rotate logs of each tool exceeding the size
+    --log-compress        : Compress rotated logs with gzip [default: False]
+    --log-tee             : Echo logs of each tool to the job logs [default: False]
+    --dry-run             : Dry-run, writing the estimated costs to plan.tsv [default: False]
+    --plan-history <PATH>  : Metrics of previous runs to estimate the costs from [default: run_metrics.tsv]
     <sample_sheet>        : Tab-delimited text that contained the following columns:
                             sample; fastq1[fastq2]; group
 
@@ -42,19 +59,16 @@ Supported annotations:
 
 import sys
 
-from schema import Schema, Use, Or, SchemaError
+from schema import Schema, And, Use, Or, SchemaError
 from docopt import docopt
 
 from rnaseqde.sample_sheet_manager import SampleSheetManager
-from rnaseqde.workflow import (
-    fullset,
-    tophat2_cuffdiff,
-    star_rsem_ebseq,
-    hisat2_stringtie_ballgown,
-    kallisto_sleuth,
-    salmon_deseq2
-)
+from rnaseqde.task.base import Task
+from rnaseqde.monitor import Monitor
+from rnaseqde.planner import Planner, History
+import rnaseqde.workflow.compiler as compiler
 import rnaseqde.utils as utils
+import rnaseqde.logsink as logsink
 
 import logging
 from logging import (
@@ -84,11 +98,15 @@ def _opt_validated(opt):
             'hisat2-stringtie-ballgown',
             'kallisto-sleuth',
             'salmon-deseq2',
-            'check-outputs'
+            'check-outputs',
+            And(str, lambda s: s.endswith(('.yml', '.yaml')), error='Workflow should be a name or a yml path')
             ),
         '--conf': Or(None, str),
         '--layout': Or('sr', 'pe'),
         '--strandness': Or('none', 'rf', 'fr'),
+        '--hisat2-output': Or('bam', 'sam'),
+        '--count-engine': Or('native', 'legacy'),
+        '--rsem-abundance': bool,
         '--step-by-step': Or(
             None,
             'align',
@@ -101,8 +119,22 @@ def _opt_validated(opt):
             'quant',
             'de'
             ),
+        '--cache': Or(None, 'stat', 'checksum'),
+        '--scheduler': Or('auto', 'uge', 'slurm', 'local'),
+        '--resources': Or(None, str),
+        '--clean': bool,
+        '--retention': Or(None, str),
+        '--samples-per-job': Or('auto', And(Use(int), lambda n: n > 0)),
+        '--star-batch': Or(None, And(Use(int), lambda n: n > 0)),
+        '--validate-fastq': bool,
         '--ar': Or(None, Use(int, error='AR ID should be an integer')),
         '--dry-run': bool,
+        '--plan-history': str,
+        '--watch': bool,
+        '--log-max-size': Or(None, And(Use(float), lambda n: n > 0)),
+        '--log-compress': bool,
+        '--log-tee': bool,
+        '--poll-interval': And(Use(float), lambda n: n > 0),
         '<sample_sheet>': str
     })
 
@@ -122,11 +154,15 @@ def main():
         sys.stderr.write("--dry-run, --step-by-step and --resume-from cannot be specified at the same time.")
         sys.exit(1)
 
-    opt.update(
-        SampleSheetManager(
-            opt['<sample_sheet>'],
-            (opt['--layout'] == 'pe')).to_dict()
-    )
+    sample_sheet = SampleSheetManager(opt['<sample_sheet>'], (opt['--layout'] == 'pe'))
+    if opt['--validate-fastq']:
+        try:
+            sample_sheet.validate_fastqs()
+        except Exception as e:
+            sys.stderr.write("{}\n".format(e))
+            sys.exit(1)
+
+    opt.update(sample_sheet.to_dict())
 
     if opt['--assets'] is None:
         assets = utils.load_conf(utils.from_root('config/assets.yml'))
@@ -154,19 +190,28 @@ def main():
             sys.stderr.write("annotation: {}".format(opt['--annotation']))
             sys.exit(1)
 
+    # NOTE: Definitions are config/workflow/<name>.yml or a yml path
     workflows = {
-        'fullset': fullset,
-        'tophat2-cuffdiff': tophat2_cuffdiff,
-        'star-rsem-ebseq': star_rsem_ebseq,
-        'star-rsem-ebseq-gencode_refseq_noncode': star_rsem_ebseq,
-        'hisat2-stringtie-ballgown': hisat2_stringtie_ballgown,
-        'kallisto-sleuth': kallisto_sleuth,
-        'salmon-deseq2': salmon_deseq2,
-        'fullset-ercc': fullset
+        'star-rsem-ebseq-gencode_refseq_noncode': 'star-rsem-ebseq',
+        'fullset-ercc': 'fullset'
     }
 
-    wf = workflows[opt['--workflow']]
-    wf.run(opt, assets)
+    # NOTE: Exported to the wrappers through the environment
+    logsink.export_options(opt['--log-max-size'], opt['--log-compress'], opt['--log-tee'])
+
+    compiler.run(workflows.get(opt['--workflow'], opt['--workflow']), opt, assets)
+
+    if opt['--dry-run']:
+        Planner(Task.instances, History.load(opt['--plan-history'])).write('plan.tsv')
+
+    if opt['--watch'] and not opt['--dry-run']:
+        monitor = Monitor(Task.instances, Task.scheduler, interval=opt['--poll-interval'])
+        if not monitor.watch():
+            sys.exit(1)
+
+    # NOTE: Block until the local executor drains (no-op on UGE/SLURM)
+    if not Task.wait_all_tasks():
+        sys.exit(1)
 
 
 if __name__ == '__main__':
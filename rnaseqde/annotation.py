@@ -0,0 +1,218 @@
+"""
+rnaseqde.annotation
+~~~~~~~~~~~~~~~~~~~
+
+This module provides a store of products derived from annotation GTFs
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+
+from rnaseqde.cache import digest
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+# NOTE: Bump to invalidate the stored products when their format changes
+FORMAT_VERSION = 1
+
+PRODUCTS = {
+    't2g': 't2g.tsv',
+    'lengths': 'lengths.tsv',
+    'genes': 'genes.tsv',
+    'transcripts': 'transcripts.tsv',
+    'bed12': 'transcripts.bed'
+}
+
+ATTRIBUTE = re.compile(r'(\w+) "([^"]*)"')
+
+
+def _writable(dir_):
+    while not os.path.exists(dir_):
+        parent = os.path.dirname(dir_)
+        if parent == dir_:
+            return False
+        dir_ = parent
+
+    return os.access(dir_, os.W_OK)
+
+
+def _content_hash(path, chunk_size=1 << 20):
+    hash_ = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hash_.update(chunk)
+
+    return hash_.hexdigest()
+
+
+def parse(gtf):
+    # NOTE: One pass over the exons; genes and transcripts are in the order of appearance
+    transcripts = {}
+    genes = {}
+
+    with open(gtf) as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) < 9 or fields[2] != 'exon':
+                continue
+
+            attrs = dict(ATTRIBUTE.findall(fields[8]))
+            tx_id, gene_id = attrs.get('transcript_id'), attrs.get('gene_id')
+            if tx_id is None or gene_id is None:
+                continue
+
+            if gene_id not in genes:
+                genes[gene_id] = attrs.get('gene_name', '')
+
+            tx = transcripts.get(tx_id)
+            if tx is None:
+                tx = transcripts[tx_id] = {
+                    'gene_id': gene_id,
+                    'gene_name': attrs.get('gene_name', ''),
+                    'transcript_name': attrs.get('transcript_name', ''),
+                    'chr': fields[0],
+                    'strand': fields[6],
+                    'exons': []
+                }
+
+            tx['exons'].append((int(fields[3]) - 1, int(fields[4])))
+
+    return genes, transcripts
+
+
+def bed12(transcripts):
+    records = []
+    for tx_id, tx in transcripts.items():
+        exons = sorted(tx['exons'])
+        start, end = exons[0][0], max(e for _, e in exons)
+
+        records.append((tx['chr'], start, tx_id, "\t".join([
+            tx['chr'], str(start), str(end), tx_id, '0', tx['strand'],
+            str(start), str(end), '0', str(len(exons)),
+            "".join("{},".format(e - s) for s, e in exons),
+            "".join("{},".format(s - start) for s, _ in exons)
+        ])))
+
+    return [r[-1] for r in sorted(records)]
+
+
+def _write_table(path, header, rows):
+    with open(path, 'w') as f:
+        f.write("\t".join(header) + "\n")
+        f.writelines("\t".join(str(c) for c in r) + "\n" for r in rows)
+
+
+def _read_table(path):
+    with open(path) as f:
+        next(f)
+        return [line.rstrip('\n').split('\t') for line in f]
+
+
+class Annotation:
+    def __init__(self, gtf, root=None):
+        self.gtf = os.path.abspath(os.path.expandvars(gtf))
+
+        # NOTE: Next to the GTF if writable, so that the products are shared by all runs
+        if root is None:
+            root = os.path.join(os.path.dirname(self.gtf), '.rnaseqde')
+            if not _writable(root):
+                root = os.path.join('.rnaseqde', 'annotation')
+
+        self.root = root
+        self._key = None
+
+    @property
+    def key(self):
+        # NOTE: Content hash of the GTF, memoized by its path, size and mtime
+        if self._key is not None:
+            return self._key
+
+        st = os.stat(self.gtf)
+        stamp = os.path.join(self.root, 'stamps', digest([self.gtf, st.st_size, st.st_mtime_ns]))
+
+        try:
+            with open(stamp) as f:
+                self._key = f.read().strip() or None
+        except FileNotFoundError:
+            pass
+
+        # NOTE: An empty stamp (e.g. left by an older run) is taken as a miss
+        if self._key is None:
+            self._key = _content_hash(self.gtf)
+
+            os.makedirs(os.path.dirname(stamp), exist_ok=True)
+            tmp = "{}.{}.tmp".format(stamp, os.getpid())
+            with open(tmp, 'w') as f:
+                f.write(self._key)
+
+            os.replace(tmp, stamp)
+
+        return self._key
+
+    @property
+    def dir(self):
+        return os.path.join(self.root, "{}.v{}".format(self.key, FORMAT_VERSION))
+
+    def path(self, product):
+        if not os.path.exists(os.path.join(self.dir, 'manifest.json')):
+            self.build()
+
+        return os.path.join(self.dir, PRODUCTS[product])
+
+    def build(self):
+        logger.info("Parsing annotation: {}".format(self.gtf))
+        genes, transcripts = parse(self.gtf)
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.root, prefix='.tmp')
+
+        _write_table(
+            os.path.join(tmp, PRODUCTS['t2g']), ['transcript_id', 'gene_id', 'gene_name'],
+            ((t, tx['gene_id'], tx['gene_name']) for t, tx in transcripts.items())
+        )
+        _write_table(
+            os.path.join(tmp, PRODUCTS['lengths']), ['transcript_id', 'length'],
+            ((t, sum(e - s for s, e in tx['exons'])) for t, tx in transcripts.items())
+        )
+        _write_table(
+            os.path.join(tmp, PRODUCTS['genes']), ['gene_id', 'gene_name'], genes.items()
+        )
+        _write_table(
+            os.path.join(tmp, PRODUCTS['transcripts']), ['transcript_id', 'transcript_name'],
+            ((t, tx['transcript_name']) for t, tx in transcripts.items())
+        )
+
+        with open(os.path.join(tmp, PRODUCTS['bed12']), 'w') as f:
+            f.writelines(r + "\n" for r in bed12(transcripts))
+
+        with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+            json.dump({'gtf': self.gtf, 'sha256': self.key, 'version': FORMAT_VERSION}, f, indent=1)
+
+        # NOTE: Concurrent builders (e.g. array elements) race on the rename; the first one wins
+        try:
+            os.rename(tmp, self.dir)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def t2g(self):
+        return {r[0]: r[1] for r in _read_table(self.path('t2g'))}
+
+    def lengths(self):
+        return {r[0]: int(r[1]) for r in _read_table(self.path('lengths'))}
+
+    def gene_names(self):
+        return dict(_read_table(self.path('genes')))
+
+    def transcript_names(self):
+        return dict(_read_table(self.path('transcripts')))
@@ -0,0 +1,150 @@
+"""
+rnaseqde.bundle
+~~~~~~~~~~~~~~~
+
+This module provides a binary bundle of count matrices, written next to the TSV/CSV matrices;
+<name>.mat/ contains values.f64 (float64, little-endian, column-major),
+rows.txt (features), cols.txt (samples) and meta.json.
+scripts/read_bundle.R is the reader of the R scripts.
+
+Usage:
+    rnaseqde.bundle [options] <table>...
+
+Options:
+    --sep <SEP>  : Separator of the tables (default: ',' for *.csv, otherwise tab)
+    <table>      : Count matrices (TSV/CSV) to be converted to bundles
+"""
+
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+DTYPE = '<f8'
+SUFFIX = '.mat'
+
+FILES = {
+    'values': 'values.f64',
+    'rows': 'rows.txt',
+    'cols': 'cols.txt',
+    'meta': 'meta.json'
+}
+
+
+def bundle_path(table):
+    return os.path.splitext(table)[0] + SUFFIX
+
+
+def preferred(table):
+    # NOTE: Bundle of a matrix if it has been written, so that readers skip parsing the table
+    path = bundle_path(table)
+    return path if os.path.exists(os.path.join(path, FILES['meta'])) else table
+
+
+def _write_names(path, names):
+    with open(path, 'w') as f:
+        f.writelines("{}\n".format(n) for n in names)
+
+
+def _read_names(path):
+    with open(path) as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def write(path, row_names, col_names, mat):
+    mat = np.asarray(mat, dtype=DTYPE)
+    if mat.shape != (len(row_names), len(col_names)):
+        raise ValueError("Shape of matrix {} does not match the names".format(mat.shape))
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp')
+
+    # NOTE: Column-major; a sample is contiguous and R fills matrices by columns
+    with open(os.path.join(tmp, FILES['values']), 'wb') as f:
+        f.write(mat.tobytes(order='F'))
+
+    _write_names(os.path.join(tmp, FILES['rows']), row_names)
+    _write_names(os.path.join(tmp, FILES['cols']), col_names)
+
+    with open(os.path.join(tmp, FILES['meta']), 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'dtype': DTYPE, 'order': 'F', 'shape': list(mat.shape)}, f)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp, path)
+
+
+class Bundle:
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, FILES['meta'])) as f:
+            meta = json.load(f)
+
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError("{}: unsupported version {}".format(path, meta['version']))
+
+        self.rows = _read_names(os.path.join(path, FILES['rows']))
+        self.cols = _read_names(os.path.join(path, FILES['cols']))
+        self.shape = tuple(meta['shape'])
+
+        # NOTE: np.memmap cannot map empty files
+        if 0 in self.shape:
+            self.values = np.empty(self.shape, dtype=meta['dtype'], order='F')
+        else:
+            self.values = np.memmap(
+                os.path.join(path, FILES['values']), dtype=meta['dtype'], mode='r',
+                shape=self.shape, order=meta['order']
+            )
+
+    def column(self, name):
+        return self.values[:, self.cols.index(name)]
+
+
+def load(path):
+    return Bundle(path)
+
+
+def _unquote(name):
+    return name[1:-1] if len(name) > 1 and name[0] == name[-1] == '"' else name
+
+
+def read_table(path, sep='\t'):
+    # NOTE: Headers with or without the corner cell (write.table, rsem-generate-data-matrix, prepDE.py)
+    with open(path) as f:
+        header = f.readline().rstrip('\n').split(sep)
+        rows = [line.rstrip('\n').split(sep) for line in f if line.strip()]
+
+    if rows and len(header) == len(rows[0]):
+        header = header[1:]
+
+    values = [r[1:] for r in rows]
+    try:
+        mat = np.array(values, dtype=np.float64)
+    except ValueError:
+        mat = np.array([[np.nan if v == 'NA' else v for v in r] for r in values], dtype=np.float64)
+
+    return [_unquote(r[0]) for r in rows], [_unquote(c) for c in header], mat.reshape(len(rows), len(header))
+
+
+def convert(table, sep=None):
+    sep = sep or (',' if table.endswith('.csv') else '\t')
+    write(bundle_path(table), *read_table(table, sep))
+
+
+def main():
+    from docopt import docopt
+
+    opt = docopt(__doc__)
+
+    for table in opt['<table>']:
+        convert(table, opt['--sep'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+rnaseqde.cache
+~~~~~~~~~~~~~~
+
+This module provides content-addressed cache of task results
+"""
+
+import os
+import json
+import glob
+import time
+import hashlib
+import subprocess
+from functools import lru_cache
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+def _checksum(path, chunk_size=1 << 20):
+    hash_ = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hash_.update(chunk)
+
+    return hash_.hexdigest()
+
+
+def _stat_identity(path, checksum=False):
+    st = os.stat(path)
+    if checksum:
+        return [st.st_size, _checksum(path)]
+
+    return [st.st_size, st.st_mtime_ns]
+
+
+def file_identity(path, checksum=False):
+    # NOTE: Files by size+mtime (or checksum), directories/prefixes (e.g. indexes) by their members
+    path = os.path.expandvars(path)
+
+    if os.path.isfile(path):
+        return _stat_identity(path, checksum)
+
+    if os.path.isdir(path):
+        members = sorted(os.path.join(path, p) for p in os.listdir(path))
+    elif os.sep in path:
+        members = sorted(glob.glob("{}*".format(path)))
+    else:
+        members = []
+
+    identity = [
+        [os.path.basename(m), _stat_identity(m, checksum)] for m in members if os.path.isfile(m)
+    ]
+
+    if not identity:
+        return None
+
+    return identity
+
+
+def _mtime(path):
+    path = os.path.expandvars(path)
+
+    if os.path.exists(path):
+        return os.path.getmtime(path)
+
+    mtimes = [os.path.getmtime(p) for p in glob.glob("{}*".format(path))]
+    if mtimes:
+        return max(mtimes)
+
+    return None
+
+
+@lru_cache(maxsize=None)
+def tool_version(cmd):
+    if cmd is None:
+        return ''
+
+    try:
+        proc = subprocess.run(cmd, shell=True, capture_output=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        return ''
+
+    # NOTE: Some tools print their version to stderr with non-zero exit (e.g. cuffdiff)
+    output = (proc.stdout + proc.stderr).decode(errors='replace').strip()
+    return output.splitlines()[0] if output else ''
+
+
+def digest(obj):
+    return hashlib.sha256(
+        json.dumps(obj, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class TaskCache:
+    def __init__(self, path='.rnaseqde/cache.json', checksum=False):
+        self.path = path
+        self.checksum = checksum
+        self._identities = {}
+
+        try:
+            with open(path) as f:
+                self._manifest = json.load(f)
+        except FileNotFoundError:
+            self._manifest = {}
+
+    def identity(self, path):
+        if path not in self._identities:
+            self._identities[path] = file_identity(path, self.checksum)
+
+        return self._identities[path]
+
+    def lookup(self, key, outputs, markers):
+        entry = self._manifest.get(key, None)
+        if entry is None:
+            return False
+
+        mtimes = [_mtime(p) for p in outputs]
+        if not mtimes or None in mtimes:
+            return False
+
+        if entry['status'] == 'submitted':
+            # NOTE: Completion markers written after the submission mark the run as completed;
+            #       outputs left by failed or killed jobs do not
+            marked = [os.path.getmtime(p) if os.path.isfile(p) else None for p in markers]
+            if not marked or None in marked or min(marked) < entry['submitted_at']:
+                return False
+
+            entry['status'] = 'completed'
+            entry['completed_at'] = max(marked)
+            self.save()
+
+        return True
+
+    def submitted_at(self, key):
+        entry = self._manifest.get(key, None)
+        if entry is None:
+            return None
+
+        return entry['submitted_at']
+
+    def record(self, key, task_name, outputs):
+        # NOTE: Resubmissions keep the first submission time so that
+        #       results of the earlier run remain valid
+        submitted_at = self.submitted_at(key)
+
+        self._manifest[key] = {
+            'task': task_name,
+            'status': 'submitted',
+            'submitted_at': time.time() if submitted_at is None else submitted_at,
+            'outputs': outputs
+        }
+        self.save()
+
+    def save(self):
+        dir_ = os.path.dirname(self.path)
+        if dir_:
+            os.makedirs(dir_, exist_ok=True)
+
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
+
+        os.replace(tmp, self.path)
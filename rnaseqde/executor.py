@@ -0,0 +1,237 @@
+"""
+rnaseqde.executor
+~~~~~~~~~~~~~~~~~
+
+This module provides a local executor running tasks concurrently on the host
+"""
+
+import os
+import itertools
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+def host_slots():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def host_memory():
+    # NOTE: GiB available for new processes
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024 ** 2
+    except FileNotFoundError:
+        pass
+
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3
+    except (ValueError, OSError):
+        return None
+
+
+class LocalJob:
+    def __init__(self, job_id, name, cmd, hold_job_ids, n_tasks, slots, memory, env=None, step=None,
+                 hold_array_job_ids=None):
+        self.job_id = job_id
+        self.name = name
+        self.cmd = cmd
+        self.hold_job_ids = hold_job_ids
+        self.hold_array_job_ids = hold_array_job_ids or []
+        self.n_tasks = n_tasks
+        self.step = step or 1
+        self.env = env or {}
+        self.slots = slots
+        self.memory = memory
+        self.started = set()
+        self.returncodes = {}
+        self.procs = {}
+
+    @property
+    def indices(self):
+        if self.n_tasks is None:
+            return [None]
+
+        return list(range(1, -~self.n_tasks, self.step))
+
+    @property
+    def finished(self):
+        return len(self.returncodes) == len(self.indices)
+
+    @property
+    def failed(self):
+        return any(rc != 0 for rc in self.returncodes.values())
+
+
+class LocalExecutor:
+    def __init__(self, slots=None, memory=None):
+        self.slots = slots or host_slots()
+        self.memory = memory or host_memory()
+
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._queue = []
+        self._slots_used = 0
+        self._memory_used = 0.0
+        self._n_running = 0
+
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=self.slots)
+
+        logger.info("Local executor: {} slot(s), {} GiB memory".format(
+            self.slots, 'unknown' if self.memory is None else round(self.memory, 1)))
+
+    def submit(self, cmd, name=None, hold_job_ids=None, n_tasks=None, step=None,
+               slots=1, memory=None, env=None, hold_array_job_ids=None):
+        with self._cond:
+            job_id = str(next(self._ids))
+            job = LocalJob(
+                job_id, name, cmd,
+                [j for j in (hold_job_ids or []) if j in self._jobs],
+                n_tasks,
+                min(max(slots, 1), self.slots),
+                memory,
+                env,
+                step,
+                [j for j in (hold_array_job_ids or []) if j in self._jobs]
+            )
+
+            self._jobs[job_id] = job
+            self._queue.extend([(job, i) for i in job.indices])
+            self._dispatch()
+
+        return job_id
+
+    def status(self, job_id):
+        with self._cond:
+            job = self._jobs[job_id]
+
+            if job.finished:
+                return 'failed' if job.failed else 'finished'
+
+            if job.started:
+                return 'running'
+
+            return 'pending'
+
+    def element_status(self, job_id):
+        with self._cond:
+            job = self._jobs[job_id]
+            states = {}
+
+            for index in job.indices:
+                if index in job.returncodes:
+                    states[index] = 'failed' if job.returncodes[index] != 0 else 'finished'
+                elif index in job.started:
+                    states[index] = 'running'
+                else:
+                    states[index] = 'pending'
+
+            return states
+
+    def cancel(self, job_id):
+        with self._cond:
+            job = self._jobs[job_id]
+
+            for unit in [u for u in self._queue if u[0] is job]:
+                self._queue.remove(unit)
+                job.returncodes[unit[1]] = -15
+
+            for proc in job.procs.values():
+                proc.terminate()
+
+            self._cond.notify_all()
+
+    def wait(self):
+        with self._cond:
+            while not all(job.finished for job in self._jobs.values()):
+                self._cond.wait()
+
+        failed = [job for job in self._jobs.values() if job.failed]
+        for job in failed:
+            logger.error("Job_ID: {} ({}) failed.".format(job.job_id, job.name))
+
+        return not failed
+
+    def _is_ready(self, job, index):
+        # NOTE: Element-wise holds wait for the element of the same index
+        return (
+            all(self._jobs[j].finished for j in job.hold_job_ids)
+            and all(index in self._jobs[j].returncodes for j in job.hold_array_job_ids)
+        )
+
+    def _fits(self, job):
+        if self._n_running == 0:
+            return True
+
+        if self._slots_used + job.slots > self.slots:
+            return False
+
+        if self.memory is not None and job.memory is not None:
+            if self._memory_used + job.memory > self.memory:
+                return False
+
+        return True
+
+    def _dispatch(self):
+        # NOTE: Called with the lock held
+        for unit in list(self._queue):
+            job, _ = unit
+
+            if not self._is_ready(job, unit[1]) or not self._fits(job):
+                continue
+
+            self._queue.remove(unit)
+            job.started.add(unit[1])
+            self._slots_used += job.slots
+            self._memory_used += job.memory or 0.0
+            self._n_running += 1
+            self._pool.submit(self._execute, *unit)
+
+    def _execute(self, job, index):
+        env = {**os.environ, **job.env}
+        env['NSLOTS'] = str(job.slots)  # NOTE: As UGE
+
+        if index is not None:
+            for prefix in ['RNASEQDE', 'SGE']:
+                env[prefix + '_TASK_ID'] = str(index)
+                env[prefix + '_TASK_STEPSIZE'] = str(job.step)
+                env[prefix + '_TASK_LAST'] = str(job.n_tasks)
+
+        try:
+            proc = subprocess.Popen(
+                job.cmd, shell=True, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            with self._cond:
+                job.procs[index] = proc
+
+            _, stderr = proc.communicate()
+            returncode = proc.returncode
+            logger.info("\n{}".format(stderr.decode()))
+        except Exception as e:
+            logger.error("Job_ID: {} ({}): {}".format(job.job_id, job.name, e))
+            returncode = -1
+
+        if returncode != 0:
+            logger.error("Job_ID: {} ({}) task {} exited with {}.".format(
+                job.job_id, job.name, index or 1, returncode))
+
+        with self._cond:
+            job.procs.pop(index, None)
+            job.returncodes[index] = returncode
+            self._slots_used -= job.slots
+            self._memory_used -= job.memory or 0.0
+            self._n_running -= 1
+            self._dispatch()
+            self._cond.notify_all()
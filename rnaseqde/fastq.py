@@ -0,0 +1,118 @@
+"""
+rnaseqde.fastq
+~~~~~~~~~~~~~~
+
+This module provides a preflight validation of FASTQ files
+"""
+
+import os
+import json
+import gzip
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from rnaseqde.cache import digest
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+def inspect(path, chunk_size=1 << 20):
+    # NOTE: Decompressed to the end, so that truncated or corrupted gzip files are detected
+    path = os.path.expandvars(path)
+
+    lines, head, last = 0, b'', b'\n'
+    try:
+        with open(path, 'rb') as f:
+            open_ = gzip.open if f.read(2) == b'\x1f\x8b' else open
+
+        with open_(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                head = head or chunk[:1]
+                lines += chunk.count(b'\n')
+                last = chunk[-1:]
+    except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+        return {'reads': None, 'error': "{}: {}".format(type(e).__name__, e)}
+    except OSError as e:
+        # NOTE: e.g. EIO, ESTALE or EACCES on shared storage, which may be transient
+        return {'reads': None, 'error': "{}: {}".format(type(e).__name__, e), 'transient': True}
+
+    if last != b'\n':
+        lines += 1
+
+    if lines == 0:
+        return {'reads': 0, 'error': 'no reads'}
+
+    if head != b'@':
+        return {'reads': None, 'error': "not FASTQ (the first line does not start with '@')"}
+
+    if lines % 4:
+        return {'reads': None, 'error': "{} lines are not a multiple of 4".format(lines)}
+
+    return {'reads': lines // 4, 'error': None}
+
+
+class FastqValidator:
+    def __init__(self, path='.rnaseqde/fastq.json', threads=None):
+        self.path = path
+        self.threads = threads or os.cpu_count()
+
+        try:
+            with open(path) as f:
+                self._manifest = json.load(f)
+        except FileNotFoundError:
+            self._manifest = {}
+
+    @staticmethod
+    def _key(fastq):
+        # NOTE: Results are reused while the path, size and mtime of a file are unchanged
+        path = os.path.abspath(os.path.expandvars(fastq))
+        st = os.stat(path)
+
+        return digest([path, st.st_size, st.st_mtime_ns])
+
+    def inspect(self, fastqs):
+        keys = {f: self._key(f) for f in fastqs}
+        todo = sorted({f for f, k in keys.items() if k not in self._manifest})
+
+        results = {}
+        if todo:
+            if self.threads > 1 and len(todo) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.threads, len(todo))) as executor:
+                    results = dict(zip(todo, executor.map(inspect, todo)))
+            else:
+                results = {f: inspect(f) for f in todo}
+
+            # NOTE: Only definitive results are cached; transient errors are checked again
+            for f, r in results.items():
+                if not r.get('transient', False):
+                    self._manifest[keys[f]] = r
+            self.save()
+
+        logger.info("FASTQ validated: {} files ({} cached)".format(len(keys), len(keys) - len(todo)))
+
+        return {f: results[f] if f in results else self._manifest[k] for f, k in keys.items()}
+
+    def validate(self, fastqs, pairs=()):
+        results = self.inspect(list(fastqs) + [f for p in pairs for f in p])
+
+        errors = ["{}: {}".format(f, r['error']) for f, r in results.items() if r['error']]
+        for f1, f2 in pairs:
+            n1, n2 = results[f1]['reads'], results[f2]['reads']
+            if None not in [n1, n2] and n1 != n2:
+                errors.append("{}, {}: numbers of reads differ ({} and {})".format(f1, f2, n1, n2))
+
+        return errors
+
+    def save(self):
+        dir_ = os.path.dirname(self.path)
+        if dir_:
+            os.makedirs(dir_, exist_ok=True)
+
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
+
+        os.replace(tmp, self.path)
@@ -0,0 +1,100 @@
+"""
+rnaseqde.logsink
+~~~~~~~~~~~~~~~~
+
+This module provides log sinks streaming outputs of tools to files
+"""
+
+import os
+import sys
+import gzip
+import shutil
+
+
+# NOTE: Options are passed to the wrappers through the environment (qsub -V, sbatch --export ALL)
+ENV_MAX_SIZE = 'RNASEQDE_LOG_MAX_SIZE'
+ENV_COMPRESS = 'RNASEQDE_LOG_COMPRESS'
+ENV_TEE = 'RNASEQDE_LOG_TEE'
+
+
+def export_options(max_size=None, compress=False, tee=False):
+    if max_size is not None:
+        os.environ[ENV_MAX_SIZE] = str(max_size)
+
+    if compress:
+        os.environ[ENV_COMPRESS] = '1'
+
+    if tee:
+        os.environ[ENV_TEE] = '1'
+
+
+class LogSink:
+    backups = 2
+
+    def __init__(self, path, max_size=None, compress=False, tee=None):
+        # NOTE: max_size in MB; the log is rotated to <path>.1, <path>.2, ... when exceeded
+        self.path = path
+        self.max_bytes = int(max_size * 1024 ** 2) if max_size else None
+        self.compress = compress
+        self.tee = tee
+
+        self._f = open(path, 'wb')
+        self._size = 0
+
+    @classmethod
+    def from_env(cls, path, tee=None):
+        max_size = os.environ.get(ENV_MAX_SIZE, None)
+
+        return cls(
+            path,
+            max_size=float(max_size) if max_size else None,
+            compress=bool(os.environ.get(ENV_COMPRESS, None)),
+            tee=tee if os.environ.get(ENV_TEE, None) else None
+        )
+
+    def _rotated(self, i):
+        return "{}.{}{}".format(self.path, i, '.gz' if self.compress else '')
+
+    def _rotate(self):
+        self._f.close()
+
+        for i in reversed(range(1, self.backups)):
+            if os.path.exists(self._rotated(i)):
+                os.replace(self._rotated(i), self._rotated(-~i))
+
+        if self.compress:
+            with open(self.path, 'rb') as src, gzip.open(self._rotated(1), 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            os.replace(self.path, self._rotated(1))
+
+        self._f = open(self.path, 'wb')
+        self._size = 0
+
+    def write(self, data):
+        if self.max_bytes is not None and self._size > 0 and self._size + len(data) > self.max_bytes:
+            self._rotate()
+
+        self._f.write(data)
+        self._f.flush()
+        self._size += len(data)
+
+        if self.tee is not None:
+            self.tee.write(data)
+            self.tee.flush()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def stdio_sinks(output_dir):
+    return (
+        LogSink.from_env(os.path.join(output_dir, 'stdout.log'), tee=sys.stdout.buffer),
+        LogSink.from_env(os.path.join(output_dir, 'stderr.log'), tee=sys.stderr.buffer)
+    )
@@ -0,0 +1,297 @@
+"""
+rnaseqde.matrix
+~~~~~~~~~~~~~~~
+
+This module provides a count matrix builder of quantified data
+(a native replacement of tximport in scripts/conv_any2raw.R and of scripts/conv_cuffdiff2raw.R)
+
+Usage:
+    rnaseqde.matrix [options] --type <TYPE> <input>...
+
+Options:
+    --gtf <PATH>         : GTF annotation file (not required for cuffdiff)
+    --type <TYPE>        : Input type (kallisto/rsem/stringtie/salmon/cuffdiff)
+    --output-dir <PATH>  : Output directory [default: .]
+    --threads <N>        : Number of samples read in parallel [default: 1]
+    --annotation-dir <PATH>  : Root of the annotation store (default: next to the GTF)
+    <input>              : Output(s) of quantifier;
+                           kallisto: abundance.h5, RSEM: quantified.isoforms.results, StringTie: t_data.ctab, Salmon: quant.sf,
+                           Cuffdiff: isoforms.read_group_tracking and/or genes.read_group_tracking
+"""
+
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+from rnaseqde.annotation import Annotation
+import rnaseqde.bundle as bundle
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+# NOTE: (id, counts, length) columns as tximport; length is used by StringTie only
+COLUMNS = {
+    'kallisto': ('target_id', 'est_counts', None),
+    'salmon': ('Name', 'NumReads', None),
+    'rsem': ('transcript_id', 'expected_count', None),
+    'stringtie': ('t_name', 'cov', 'length')
+}
+
+# NOTE: Default of tximport; StringTie counts are cov * length / read length
+READ_LENGTH = 75
+
+
+def _read_table(path, columns):
+    with open(path) as f:
+        header = f.readline().rstrip('\n').split('\t')
+
+        try:
+            idx = [header.index(c) for c in columns if c is not None]
+        except ValueError:
+            raise ValueError("{}: columns {} are required".format(path, ", ".join(c for c in columns if c)))
+
+        # NOTE: Split only up to the last required column
+        maxsplit = max(idx) + 1
+        rows = [line.rstrip('\n').split('\t', maxsplit) for line in f if line.strip()]
+
+    ids = [r[idx[0]] for r in rows]
+    values = [np.array([r[i] for r in rows], dtype=np.float64) for i in idx[1:]]
+
+    return ids, values
+
+
+def _read_kallisto_h5(path):
+    with h5py.File(path, 'r') as f:
+        ids = f['aux/ids'].asstr()[:].tolist()
+        counts = np.asarray(f['est_counts'][:], dtype=np.float64)
+
+    return ids, counts
+
+
+def read_counts(type_, path):
+    if type_ not in COLUMNS:
+        raise ValueError("Unknown input type: {}".format(type_))
+
+    if type_ == 'kallisto' and path.endswith('.h5'):
+        if h5py is not None:
+            return _read_kallisto_h5(path)
+
+        # NOTE: Without h5py, read the plain text written next to the HDF5
+        path = os.path.join(os.path.dirname(path), 'abundance.tsv')
+
+    ids, values = _read_table(path, COLUMNS[type_])
+
+    if type_ == 'stringtie':
+        return ids, values[0] * values[1] / READ_LENGTH
+
+    return ids, values[0]
+
+
+def _ids_digest(ids):
+    return hashlib.sha256("\n".join(ids).encode()).hexdigest()
+
+
+def _read_sample(args):
+    # NOTE: Runs in worker processes; ids are returned as a digest to keep the transfer small
+    type_, path = args
+    ids, counts = read_counts(type_, path)
+
+    return _ids_digest(ids), counts
+
+
+def sample_name(path):
+    return os.path.basename(os.path.dirname(os.path.normpath(path)))
+
+
+def transcript_matrix(type_, inputs, threads=1):
+    ids, counts = read_counts(type_, inputs[0])
+    ids_digest = _ids_digest(ids)
+
+    mat = np.empty((len(ids), len(inputs)), dtype=np.float64)
+    mat[:, 0] = counts
+
+    rest = [(type_, p) for p in inputs[1:]]
+    if threads > 1 and len(rest) > 1:
+        with ProcessPoolExecutor(max_workers=threads) as executor:
+            results = executor.map(_read_sample, rest, chunksize=max(1, len(rest) // (threads * 4)))
+            for i, (d, counts) in enumerate(results, 1):
+                if d != ids_digest:
+                    raise ValueError("Transcripts of {} differ from {}".format(inputs[i], inputs[0]))
+                mat[:, i] = counts
+    else:
+        for i, args in enumerate(rest, 1):
+            d, counts = _read_sample(args)
+            if d != ids_digest:
+                raise ValueError("Transcripts of {} differ from {}".format(inputs[i], inputs[0]))
+            mat[:, i] = counts
+
+    return ids, mat
+
+
+def gene_matrix(ids, mat, t2g):
+    # NOTE: Sum of transcripts per gene as summarizeToGene; transcripts missing in the GTF are dropped
+    gene_of = [t2g.get(t, None) for t in ids]
+
+    missing = sum(g is None for g in gene_of)
+    if missing:
+        logger.warning("{} of {} transcripts are missing in the GTF.".format(missing, len(ids)))
+
+    genes = sorted(set(g for g in gene_of if g is not None))
+    gene_index = {g: i for i, g in enumerate(genes)}
+
+    rows = np.array([i for i, g in enumerate(gene_of) if g is not None], dtype=np.int64)
+    groups = np.array([gene_index[g] for g in gene_of if g is not None], dtype=np.int64)
+
+    if not genes:
+        return genes, np.zeros((0, mat.shape[1]), dtype=np.float64)
+
+    # NOTE: Rows sorted by gene are summed per contiguous run
+    order = np.argsort(groups, kind='stable')
+    starts = np.flatnonzero(np.diff(groups[order], prepend=-1))
+
+    return genes, np.add.reduceat(mat[rows[order]], starts, axis=0)
+
+
+def write_matrix(path, row_names, col_names, mat):
+    # NOTE: Layout of write.table(quote = FALSE, sep = '\t', col.names = NA)
+    fmt = "\t".join(["%.15g"] * mat.shape[1]) + "\n"
+    has_na = bool(np.isnan(mat).any())
+
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, 'w') as f:
+        f.write("\t" + "\t".join(col_names) + "\n")
+        for name, row in zip(row_names, mat.tolist()):
+            line = fmt % tuple(row)
+            f.write(name + "\t" + (line.replace('nan', 'NA') if has_na else line))
+
+    os.replace(tmp, path)
+    bundle.write(bundle.bundle_path(path), row_names, col_names, mat)
+
+
+def _floats(values):
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        return np.array([np.nan if v == 'NA' else v for v in values], dtype=np.float64)
+
+
+def tracking_matrix(path, chunk_size=1 << 22):
+    # NOTE: Pivot of raw_frags by condition_replicate as tidyr::spread;
+    #       lines are read in chunks of bytes into a dense matrix growing by an index map
+    features, samples = {}, {}
+    mat = np.full((1 << 12, 1 << 3), np.nan)
+    filled = np.zeros(mat.shape, dtype=bool)
+
+    with open(path) as f:
+        header = f.readline().rstrip('\n').split('\t')
+        i_id, i_cond, i_rep, i_frags = (
+            header.index(c) for c in ['tracking_id', 'condition', 'replicate', 'raw_frags']
+        )
+
+        for lines in iter(lambda: f.readlines(chunk_size), []):
+            rows = np.empty(len(lines), dtype=np.int64)
+            cols = np.empty(len(lines), dtype=np.int64)
+            values = []
+
+            for j, line in enumerate(lines):
+                c = line.rstrip('\n').split('\t')
+                rows[j] = features.setdefault(c[i_id], len(features))
+                cols[j] = samples.setdefault(c[i_cond] + '_' + c[i_rep], len(samples))
+                values.append(c[i_frags])
+
+            if len(features) > mat.shape[0] or len(samples) > mat.shape[1]:
+                shape = (
+                    max(mat.shape[0], 1 << len(features).bit_length()),
+                    max(mat.shape[1], 1 << len(samples).bit_length())
+                )
+                mat_, filled_ = np.full(shape, np.nan), np.zeros(shape, dtype=bool)
+                mat_[:mat.shape[0], :mat.shape[1]] = mat
+                filled_[:mat.shape[0], :mat.shape[1]] = filled
+                mat, filled = mat_, filled_
+
+            keys = rows * mat.shape[1] + cols
+            if filled[rows, cols].any() or len(np.unique(keys)) != len(keys):
+                raise ValueError("{}: duplicate rows of a feature and a replicate".format(path))
+
+            mat[rows, cols] = _floats(values)
+            filled[rows, cols] = True
+
+    # NOTE: Features and samples are sorted as spread()
+    row_names, col_names = sorted(features), sorted(samples)
+    mat = mat[np.ix_([features[r] for r in row_names], [samples[c] for c in col_names])]
+
+    return row_names, col_names, mat
+
+
+def _convert_tracking(args):
+    path, output_dir = args
+
+    name = os.path.basename(path)
+    if 'isoforms' in name:
+        level = 'transcript'
+    elif 'genes' in name:
+        level = 'gene'
+    else:
+        raise ValueError("Unknown tracking file: {}".format(path))
+
+    write_matrix(os.path.join(output_dir, "count_matrix_{}.tsv".format(level)), *tracking_matrix(path))
+
+
+def build_tracking(inputs, output_dir='.', threads=1):
+    # NOTE: Tracking files (isoforms and genes) are converted concurrently
+    os.makedirs(output_dir, exist_ok=True)
+
+    args = [(p, output_dir) for p in inputs]
+    if threads > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=min(threads, len(args))) as executor:
+            list(executor.map(_convert_tracking, args))
+    else:
+        for a in args:
+            _convert_tracking(a)
+
+
+def build(type_, inputs, gtf, output_dir='.', threads=1, annotation_dir=None):
+    t2g = Annotation(gtf, annotation_dir).t2g()
+
+    ids, mat = transcript_matrix(type_, inputs, threads)
+    genes, gmat = gene_matrix(ids, mat, t2g)
+
+    samples = [sample_name(p) for p in inputs]
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_matrix(os.path.join(output_dir, 'count_matrix_transcript.tsv'), ids, samples, mat)
+    write_matrix(os.path.join(output_dir, 'count_matrix_gene.tsv'), genes, samples, gmat)
+
+
+def main():
+    from docopt import docopt
+
+    opt = docopt(__doc__)
+
+    if opt['--type'] == 'cuffdiff':
+        build_tracking(opt['<input>'], output_dir=opt['--output-dir'], threads=int(opt['--threads']))
+        return
+
+    if opt['--gtf'] is None:
+        raise SystemExit("--gtf is required for {}".format(opt['--type']))
+
+    build(
+        opt['--type'], opt['<input>'], opt['--gtf'],
+        output_dir=opt['--output-dir'],
+        threads=int(opt['--threads']),
+        annotation_dir=opt['--annotation-dir']
+    )
+
+
+if __name__ == '__main__':
+    main()
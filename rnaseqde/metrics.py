@@ -0,0 +1,181 @@
+"""
+rnaseqde.metrics
+~~~~~~~~~~~~~~~~
+
+This module provides runtime metrics of tool invocations
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+import threading
+
+
+COLUMNS = [
+    'annotation', 'task', 'sample', 'returncode', 'started_at',
+    'wall_s', 'user_s', 'sys_s', 'max_rss_mb', 'read_mb', 'write_mb', 'input_gb'
+]
+
+
+def _proc_io():
+    # NOTE: I/O of reaped children is accumulated into the parent
+    try:
+        with open('/proc/self/io') as f:
+            return {k: int(v) for k, v in (line.split(':') for line in f)}
+    except OSError:
+        return None
+
+
+def measured_run(cmd, stdout=None, stderr=None, chunk_size=1 << 16):
+    # NOTE: Outputs are streamed to the sinks (file-like with write()) if given, otherwise captured
+    io_before = _proc_io()
+    started_at = time.time()
+
+    proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # NOTE: Drain the pipes by ourselves and reap with wait4 to get the rusage of this command alone
+    sinks = {'stdout': stdout, 'stderr': stderr}
+    captured = {}
+
+    def _drain(name):
+        pipe, sink = getattr(proc, name), sinks[name]
+        chunks = []
+
+        for chunk in iter(lambda: pipe.read1(chunk_size), b''):
+            if sink is None:
+                chunks.append(chunk)
+            else:
+                sink.write(chunk)
+
+        captured[name] = b''.join(chunks) if sink is None else None
+
+    threads = [threading.Thread(target=_drain, args=(n,)) for n in ['stdout', 'stderr']]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    wall = time.time() - started_at
+    io_after = _proc_io()
+
+    # NOTE: ru_maxrss is KiB on Linux, bytes on macOS
+    max_rss = rusage.ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+    if io_before is not None and io_after is not None:
+        read_bytes = io_after['read_bytes'] - io_before['read_bytes']
+        write_bytes = io_after['write_bytes'] - io_before['write_bytes']
+    else:
+        read_bytes, write_bytes = rusage.ru_inblock * 512, rusage.ru_oublock * 512
+
+    metrics = {
+        'returncode': proc.returncode,
+        'started_at': round(started_at, 3),
+        'wall_s': round(wall, 3),
+        'user_s': round(rusage.ru_utime, 3),
+        'sys_s': round(rusage.ru_stime, 3),
+        'max_rss_mb': round(max_rss, 1),
+        'read_mb': round(read_bytes / 1024 ** 2, 1),
+        'write_mb': round(write_bytes / 1024 ** 2, 1)
+    }
+
+    completed = subprocess.CompletedProcess(
+        cmd, proc.returncode, captured['stdout'], captured['stderr']
+    )
+
+    return completed, metrics
+
+
+def record(output_dir, metrics, task=None, sample=None, cmd=None):
+    path = os.path.join(output_dir, 'metrics.json')
+
+    try:
+        with open(path) as f:
+            records = json.load(f)
+    except (FileNotFoundError, ValueError):
+        records = []
+
+    # NOTE: Rerun of the same command replaces its record
+    records = [r for r in records if r.get('command') != cmd or cmd is None]
+    records.append({'task': task, 'sample': sample, 'command': cmd, **metrics})
+
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(records, f, indent=1)
+
+    os.replace(tmp, path)
+
+
+def collect(task_dirs, input_gbs=None):
+    # NOTE: task_dirs are (annotation, output directory, GiB of FASTQ of all samples) of the tasks;
+    #       a metrics file belongs to the deepest task directory containing it.
+    #       input_gbs are GiB of FASTQ by sample, to scale the metrics in planning;
+    #       commands without a sample are scaled by the total of the task
+    task_dirs = sorted(
+        ((a, os.path.normpath(d), gb) for a, d, gb in task_dirs),
+        key=lambda x: -len(x[1])
+    )
+
+    paths = set()
+    for _, d, _ in task_dirs:
+        for root, _, files in os.walk(d):
+            if 'metrics.json' in files:
+                paths.add(os.path.normpath(os.path.join(root, 'metrics.json')))
+
+    rows = []
+    for path in sorted(paths):
+        annotation, total_gb = next(
+            ((a, gb) for a, d, gb in task_dirs if path.startswith(d + os.sep)), (None, None)
+        )
+
+        try:
+            with open(path) as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        for r in records:
+            if r.get('sample') is None:
+                input_gb = total_gb
+            else:
+                input_gb = (input_gbs or {}).get(r.get('sample'))
+
+            rows.append({**r, 'annotation': annotation, 'input_gb': input_gb})
+
+    return rows
+
+
+def read_tsv(path):
+    # NOTE: Rows of run_metrics.tsv with the numbers parsed; empty cells are None
+    rows = []
+    with open(path) as f:
+        header = f.readline().rstrip("\n").split("\t")
+
+        for line in f:
+            r = dict(zip(header, line.rstrip("\n").split("\t")))
+
+            for k, v in r.items():
+                if k in ['annotation', 'task', 'sample']:
+                    r[k] = v or None
+                    continue
+
+                try:
+                    r[k] = float(v)
+                except ValueError:
+                    r[k] = None
+
+            rows.append(r)
+
+    return rows
+
+
+def write_tsv(rows, path):
+    with open(path, 'w') as f:
+        f.write("\t".join(COLUMNS) + "\n")
+
+        for r in rows:
+            f.write("\t".join('' if r.get(c) is None else str(r.get(c)) for c in COLUMNS) + "\n")
@@ -0,0 +1,157 @@
+"""
+rnaseqde.monitor
+~~~~~~~~~~~~~~~~
+
+This module provides a monitor of the submitted jobs
+"""
+
+import os
+import time
+from collections import Counter
+
+from rnaseqde.task.base import CommandLineTask, ArrayTask, AliasTask
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+STATES = ['pending', 'running', 'finished', 'failed']
+
+
+class Monitor:
+    def __init__(self, tasks, scheduler, interval=60, path='.rnaseqde/status.tsv'):
+        # NOTE: Aliases share the jobs of their canonical tasks
+        self.tasks = [t for t in tasks if t.job_id is not None and not isinstance(t, AliasTask)]
+        self.scheduler = scheduler
+        self.interval = interval
+        self.path = path
+
+        # NOTE: {(task label, element index): state}; element index is None for non-array tasks
+        self.table = {}
+        self._polled_at = None
+
+        for task in self.tasks:
+            for index, _ in self._elements(task):
+                self.table[(self.label(task), index)] = 'pending'
+
+    @staticmethod
+    def label(task):
+        if isinstance(task, CommandLineTask):
+            return task.output_dir
+
+        return task.task_name
+
+    @staticmethod
+    def _elements(task):
+        # NOTE: (element index, scheduler task id) of the submitted elements
+        if not isinstance(task, ArrayTask) or task.submission is None:
+            return [(None, None)]
+
+        indices, step = task.submission
+        return [(index, -~(i // step * step)) for i, index in enumerate(indices)]
+
+    @property
+    def done(self):
+        return all(s in ['finished', 'failed'] for s in self.table.values())
+
+    @property
+    def failed(self):
+        return sorted(k for k, s in self.table.items() if s == 'failed')
+
+    def poll(self, force=False):
+        # NOTE: Rate-limited; one scheduler query per poll for all jobs
+        now = time.time()
+        if not force and self._polled_at is not None and now - self._polled_at < self.interval:
+            return False
+
+        self._polled_at = now
+
+        queried = self.scheduler.query(sorted(set(t.job_id for t in self.tasks)))
+        if queried is None:
+            return False
+
+        for task in self.tasks:
+            for index, task_id in self._elements(task):
+                key = (self.label(task), index)
+                if self.table[key] in ['finished', 'failed']:
+                    continue
+
+                state = self._state(task, index, queried.get(task.job_id, {}).get(task_id, None))
+                if state != self.table[key]:
+                    self._transit(task, key, state)
+
+        self.save()
+        return True
+
+    def _state(self, task, index, queued):
+        if isinstance(task, ArrayTask):
+            completed = task.is_completed(task.elements[~-index], since=task.submitted_at)
+        elif isinstance(task, CommandLineTask):
+            completed = task.is_completed(since=task.submitted_at)
+        else:
+            completed = None
+
+        if queued in ['pending', 'running']:
+            # NOTE: Packed elements complete one by one in a running job
+            return 'finished' if completed else queued
+
+        if queued == 'failed':
+            return 'failed'
+
+        # NOTE: Left the queue; the exit status is judged by the completion markers
+        if isinstance(task, CommandLineTask):
+            return 'finished' if completed else 'failed'
+
+        return 'finished'
+
+    def _transit(self, task, key, state):
+        self.table[key] = state
+
+        if state == 'failed':
+            if key[1] is None:
+                logger.error("Job_ID: {} ({}) failed.".format(task.job_id, key[0]))
+            else:
+                logger.error("Job_ID: {} ({}) element {} ({}) failed.".format(
+                    task.job_id, key[0], key[1], task.elements[~-key[1]]))
+
+    def summary(self):
+        counts = Counter(s for s in self.table.values())
+        return ", ".join("{} {}".format(counts[s], s) for s in STATES)
+
+    def save(self):
+        if self.path is None:
+            return
+
+        dir_ = os.path.dirname(self.path)
+        if dir_:
+            os.makedirs(dir_, exist_ok=True)
+
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write("task\tjob_id\telement\tstate\n")
+
+            for task in self.tasks:
+                for index, _ in self._elements(task):
+                    key = (self.label(task), index)
+                    f.write("{}\t{}\t{}\t{}\n".format(
+                        key[0], task.job_id, '' if index is None else index, self.table[key]))
+
+        os.replace(tmp, self.path)
+
+    def watch(self):
+        summary = None
+
+        while True:
+            if self.poll():
+                if self.summary() != summary:
+                    summary = self.summary()
+                    logger.info("Jobs: {}".format(summary))
+
+            if self.done:
+                break
+
+            time.sleep(min(self.interval, 5))
+
+        return not self.failed
@@ -0,0 +1,216 @@
+"""
+rnaseqde.planner
+~~~~~~~~~~~~~~~~
+
+This module provides a cost plan of the queued tasks
+(CPU hours, memory, disk footprint and critical path) for dry-runs
+"""
+
+import os
+import statistics
+from collections import defaultdict
+
+import rnaseqde.metrics as metrics
+from rnaseqde.resource import sample_gbs
+from rnaseqde.task.base import CommandLineTask, ArrayTask, AliasTask
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+COLUMNS = [
+    'annotation', 'task', 'output_dir', 'source', 'jobs', 'elements', 'slots', 'memory_gb',
+    'peak_rss_gb', 'cpu_hours', 'wall_hours', 'disk_gb', 'disk', 'finish_hours'
+]
+
+# NOTE: Minutes per job of tasks with neither history nor runtime_hint (matrices, DE),
+#       plus those per sample of the tasks run once for all samples
+DEFAULT_MINUTES = 10
+DEFAULT_MINUTES_PER_SAMPLE = 0.5
+
+KEYS = ['wall_s', 'cpu_s', 'write_mb', 'max_rss_mb']
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+
+    return statistics.median(values) if values else None
+
+
+class History:
+    # NOTE: Costs per sample (array tasks) or per run (other tasks) of previous runs,
+    #       by run_metrics.tsv; scaled by the GiB of FASTQ (of all samples per run) if recorded
+    def __init__(self, rows=()):
+        groups = defaultdict(lambda: {k: 0.0 for k in KEYS})
+
+        for r in rows:
+            if not r.get('task') or r.get('returncode') != 0:
+                continue
+
+            # NOTE: Commands of a sample (or a run) are summed
+            g = groups[(r['task'], r.get('annotation'), r.get('sample'))]
+            g['wall_s'] += r.get('wall_s') or 0.0
+            g['cpu_s'] += (r.get('user_s') or 0.0) + (r.get('sys_s') or 0.0)
+            g['write_mb'] += r.get('write_mb') or 0.0
+            g['max_rss_mb'] = max(g['max_rss_mb'], r.get('max_rss_mb') or 0.0)
+            g['input_gb'] = r.get('input_gb')
+
+        # NOTE: Commands without a sample (e.g. setup of array jobs) are not counted per sample
+        self._groups = defaultdict(list)
+        for (task_name, _, sample), g in groups.items():
+            self._groups[(task_name, sample is not None)].append(g)
+
+    @classmethod
+    def load(cls, path):
+        if path is None or not os.path.exists(path):
+            return cls()
+
+        return cls(metrics.read_tsv(path))
+
+    def estimate(self, task_name, gb=None, per_sample=False):
+        groups = self._groups.get((task_name, per_sample))
+        if not groups:
+            return None
+
+        scaled = [g for g in groups if g['input_gb']]
+
+        estimate = {}
+        for k in KEYS:
+            if k != 'max_rss_mb' and gb and scaled:
+                estimate[k] = sum(g[k] for g in scaled) / sum(g['input_gb'] for g in scaled) * gb
+            else:
+                estimate[k] = _median(g[k] for g in groups)
+
+        estimate['max_rss_mb'] = max(g['max_rss_mb'] for g in groups)
+
+        return estimate
+
+
+class Planner:
+    def __init__(self, tasks, history=None):
+        self.tasks = tasks
+        self.history = history or History()
+
+    @staticmethod
+    def _default(task, slots, gb, n_samples=1):
+        if isinstance(task, ArrayTask):
+            wall = (task.runtime_hint or DEFAULT_MINUTES) * 60.0
+            disk = (task.output_per_gb or 0.0) * gb * 1024
+        else:
+            wall, disk = (DEFAULT_MINUTES + DEFAULT_MINUTES_PER_SAMPLE * n_samples) * 60.0, 0.0
+
+        return {'wall_s': wall, 'cpu_s': wall * slots, 'write_mb': disk, 'max_rss_mb': None}
+
+    def _costs(self, task, slots):
+        # NOTE: Costs of each element (sample) of array tasks, or of the task by all samples
+        gbs = sample_gbs(task.root().outputs or {})
+
+        if not isinstance(task, ArrayTask):
+            gb = sum(gbs.values())
+            return [self.history.estimate(task.task_name, gb) or self._default(task, slots, gb, len(gbs))]
+
+        costs = []
+        for e in task.elements:
+            gb = gbs.get(task.sample_name(e), 0.0)
+            costs.append(self.history.estimate(task.task_name, gb, per_sample=True) or self._default(task, slots, gb))
+
+        return costs
+
+    @staticmethod
+    def _chunks(task, costs):
+        # NOTE: Elements processed by each job, as submitted
+        if not isinstance(task, ArrayTask):
+            return [costs]
+
+        indices, step = task.submission or (list(range(1, -~len(costs))), task.step(len(costs)))
+
+        return [[costs[~-i] for i in indices[j:j + step]] for j in range(0, len(indices), step)]
+
+    def plan(self):
+        # NOTE: Tasks whose outputs are consumed by other tasks are intermediate
+        consumed = set()
+        for t in self.tasks:
+            if not isinstance(t, (CommandLineTask, AliasTask)):
+                continue
+
+            for u in t.required_tasks or []:
+                consumed.add(id(getattr(u, 'canonical', u)))
+
+        rows, finishes = [], {}
+        for t in self.tasks:
+            if isinstance(t, AliasTask):
+                finishes[id(t)] = finishes[id(t.canonical)]
+                continue
+
+            if not isinstance(t, CommandLineTask):
+                continue
+
+            resources = t.resources
+            costs = self._costs(t, resources.slots)
+            walls = [sum(c['wall_s'] for c in chunk) for chunk in self._chunks(t, costs)]
+
+            # NOTE: Critical path with unlimited slots; element-wise holds wait for the same job only
+            ready = [0.0] * len(walls)
+            for u in t.required_tasks or []:
+                upstream = finishes.get(id(u), [0.0])
+                if t.holds_elementwise(u) and len(upstream) == len(walls):
+                    ready = [max(r, f) for r, f in zip(ready, upstream)]
+                else:
+                    ready = [max(r, max(upstream)) for r in ready]
+
+            finishes[id(t)] = [r + w for r, w in zip(ready, walls)]
+
+            rss = [c['max_rss_mb'] for c in costs if c['max_rss_mb'] is not None]
+
+            rows.append({
+                'annotation': t.annotation,
+                'task': t.task_name,
+                'output_dir': t.output_dir,
+                'source': 'history' if self.history.estimate(t.task_name, per_sample=isinstance(t, ArrayTask)) else 'default',
+                'jobs': len(walls),
+                'elements': len(costs),
+                'slots': resources.slots,
+                'memory_gb': resources.total_memory,
+                'peak_rss_gb': round(max(rss) / 1024, 2) if rss else None,
+                'cpu_hours': round(sum(c['cpu_s'] for c in costs) / 3600, 2),
+                'wall_hours': round(max(walls) / 3600, 2),
+                'disk_gb': round(sum(c['write_mb'] or 0.0 for c in costs) / 1024, 2),
+                'disk': 'intermediate' if id(t) in consumed else 'final',
+                'finish_hours': round(max(finishes[id(t)]) / 3600, 2)
+            })
+
+        return rows
+
+    @staticmethod
+    def summary(rows):
+        memory = [r['memory_gb'] for r in rows if r['memory_gb'] is not None]
+
+        return {
+            'jobs': sum(r['jobs'] for r in rows),
+            'cpu_hours': round(sum(r['cpu_hours'] for r in rows), 2),
+            'max_memory_gb': max(memory, default=None),
+            'intermediate_disk_gb': round(sum(r['disk_gb'] for r in rows if r['disk'] == 'intermediate'), 2),
+            'final_disk_gb': round(sum(r['disk_gb'] for r in rows if r['disk'] == 'final'), 2),
+            'critical_path_hours': max((r['finish_hours'] for r in rows), default=0.0)
+        }
+
+    def write(self, path='plan.tsv'):
+        rows = self.plan()
+
+        with open(path, 'w') as f:
+            f.write("\t".join(COLUMNS) + "\n")
+
+            for r in rows:
+                f.write("\t".join('' if r[c] is None else str(r[c]) for c in COLUMNS) + "\n")
+
+        summary = self.summary(rows)
+        logger.info(
+            "Plan: {jobs} jobs, {cpu_hours} CPU hours, up to {max_memory_gb} GiB per job, "
+            "disk {intermediate_disk_gb} GiB intermediate + {final_disk_gb} GiB final, "
+            "critical path {critical_path_hours} hours".format(**summary)
+        )
+        logger.info("Plan of each task was written: {}".format(path))
+
+        return summary
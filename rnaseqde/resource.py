@@ -0,0 +1,125 @@
+"""
+rnaseqde.resource
+~~~~~~~~~~~~~~~~~
+
+This module provides resource requests of tasks
+"""
+
+import os
+import re
+import math
+from functools import lru_cache
+
+import rnaseqde.utils as utils
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+# NOTE: Keys of the rules; see config/resources.yml
+RULE_KEYS = ['slots', 'memory', 'memory_per_gb', 'max_memory']
+
+
+class Resources:
+    # NOTE: Memory is GiB per slot as s_vmem/mem_req of UGE
+    def __init__(self, slots=1, memory=None, pe=None):
+        self.slots = slots
+        self.memory = memory
+        self.pe = pe
+
+    @classmethod
+    def from_header(cls, script):
+        resources = cls()
+
+        try:
+            with open(os.path.expandvars(script)) as f:
+                for line in f:
+                    if not line.startswith('#'):
+                        break
+
+                    m = re.search(r"-pe\s+(\S+)\s+(\d+)", line)
+                    if m:
+                        resources.pe, resources.slots = m.group(1), int(m.group(2))
+
+                    m = re.search(r"s_vmem=([\d.]+)G", line)
+                    if m:
+                        resources.memory = float(m.group(1))
+        except FileNotFoundError:
+            pass
+
+        return resources
+
+    @property
+    def total_memory(self):
+        if self.memory is None:
+            return None
+
+        return self.memory * self.slots
+
+    def updated(self, rule=None, input_gb=0.0):
+        rule = rule or {}
+
+        slots = rule.get('slots', self.slots)
+        memory = rule.get('memory', self.memory)
+
+        if memory is not None and rule.get('memory_per_gb'):
+            memory = math.ceil(memory + rule['memory_per_gb'] * input_gb)
+
+            if rule.get('max_memory') is not None:
+                memory = min(memory, rule['max_memory'])
+
+        return Resources(slots=slots, memory=memory, pe=self.pe)
+
+    def __eq__(self, other):
+        return vars(self) == vars(other)
+
+    def __repr__(self):
+        return "Resources(slots={}, memory={}, pe={})".format(self.slots, self.memory, self.pe)
+
+
+def load_rules(path=None):
+    # NOTE: Rules given per run override the default ones per task
+    rules = utils.load_conf(utils.from_root('config/resources.yml'), strict=False)
+
+    if path is not None:
+        for task_name, rule in utils.load_conf(path).items():
+            rules[task_name] = {**rules.get(task_name, {}), **rule}
+
+    for task_name, rule in rules.items():
+        unknown = set(rule) - set(RULE_KEYS)
+        if unknown:
+            raise ValueError("Unknown resource rule(s) for {}: {}".format(task_name, ", ".join(sorted(unknown))))
+
+    return rules
+
+
+@lru_cache(maxsize=None)
+def file_gb(path):
+    try:
+        return os.path.getsize(os.path.expandvars(path)) / 1024 ** 3
+    except OSError:
+        return 0.0
+
+
+def fastq_gbs(fastq1s, fastq2s=None):
+    # NOTE: GiB of FASTQ of each sample
+    fastq2s = fastq2s or [None] * len(fastq1s)
+
+    return [file_gb(f1) + (file_gb(f2) if f2 else 0.0) for f1, f2 in zip(fastq1s, fastq2s)]
+
+
+def sample_gb(fastq1s, fastq2s=None):
+    # NOTE: GiB of FASTQ of the largest sample; array elements share one request
+    return max(fastq_gbs(fastq1s, fastq2s), default=0.0)
+
+
+def sample_gbs(opt):
+    # NOTE: GiB of FASTQ by sample name (or the FASTQ name as suboutput_dir() without --sample)
+    fastq1s = opt.get('--fastq1') or []
+    gbs = fastq_gbs(fastq1s, opt.get('--fastq2') or None)
+
+    names = opt.get('--sample') or [utils.basename_replaced_ext('.fastq.gz', '', f) for f in fastq1s]
+
+    return dict(zip(names, gbs))
@@ -0,0 +1,211 @@
+"""
+rnaseqde.retention
+~~~~~~~~~~~~~~~~~~
+
+This module provides reference-counted cleanup of intermediate outputs
+"""
+
+import os
+import json
+import glob
+import gzip
+import shutil
+
+import rnaseqde.utils as utils
+from rnaseqde.cache import digest
+from rnaseqde.task.base import CommandLineTask, ArrayTask
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+# NOTE: Passed to the wrappers through the environment (qsub -V, sbatch --export ALL)
+ENV_STATE_DIR = 'RNASEQDE_RETENTION'
+ACTIONS = ['keep', 'compress', 'delete']
+
+
+def load_policy(path=None):
+    # NOTE: Policies given per run override the default ones per task
+    policy = utils.load_conf(utils.from_root('config/retention.yml'), strict=False)
+
+    if path is not None:
+        for task_name, actions in utils.load_conf(path).items():
+            policy[task_name] = {**policy.get(task_name, {}), **actions}
+
+    for task_name, actions in policy.items():
+        unknown = set(actions.values()) - set(ACTIONS)
+        if unknown:
+            raise ValueError("Unknown retention action(s) for {}: {}".format(task_name, ", ".join(sorted(unknown))))
+
+    return policy
+
+
+def export_state_dir(state_dir):
+    os.environ[ENV_STATE_DIR] = os.path.abspath(state_dir)
+
+
+def apply(path, action):
+    if action == 'keep' or not os.path.isfile(path):
+        return
+
+    if action == 'compress':
+        if path.endswith('.gz'):
+            return
+
+        tmp = "{}.gz.{}.tmp".format(path, os.getpid())
+        with open(path, 'rb') as src, gzip.open(tmp, 'wb', compresslevel=1) as dst:
+            shutil.copyfileobj(src, dst)
+
+        os.replace(tmp, "{}.gz".format(path))
+
+    os.remove(path)
+    logger.info("Retention: {} ({})".format(path, action))
+
+
+class Retention:
+    # NOTE: Each intermediate has a directory of references (refs/<path digest>/),
+    #       one file per element of the tasks consuming it; the element removing
+    #       the last reference succeeds in removing the directory and applies the action
+    def __init__(self, policy=None, state_dir='.rnaseqde/retention'):
+        self.policy = policy or {}
+        self.state_dir = os.path.abspath(state_dir)
+
+    @classmethod
+    def from_env(cls):
+        state_dir = os.environ.get(ENV_STATE_DIR, None)
+        if state_dir is None:
+            return None
+
+        try:
+            with open(os.path.join(state_dir, 'policy.json')) as f:
+                policy = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        return cls(policy, state_dir)
+
+    def _path(self, *names):
+        return os.path.join(self.state_dir, *names)
+
+    def references(self, tasks):
+        # NOTE: Intermediates by path: (action, markers of the elements consuming it)
+        producers = {}
+        for t in tasks:
+            if not isinstance(t, CommandLineTask):
+                continue
+
+            for k, v in t.products_map.items():
+                action = self.policy.get(t.task_name, {}).get(k, 'keep')
+                if action == 'keep':
+                    continue
+
+                for p in utils.flatten([v]):
+                    if isinstance(p, str):
+                        producers[p] = action
+
+        references, pinned = {}, set()
+        for t in tasks:
+            if not isinstance(t, CommandLineTask):
+                continue
+
+            consumed = set(p for p in utils.flatten(list(t.inputs.values())) if p in producers)
+            if not consumed:
+                continue
+
+            # NOTE: Only array elements report their success; inputs of other tasks are kept
+            if not isinstance(t, ArrayTask):
+                pinned.update(consumed)
+                continue
+
+            elements = t.elements
+            pinned.update(consumed - set(elements))
+
+            # NOTE: Elements completed by the previous runs (--cache) consume no more
+            indices = t.pending_indices()
+            pending = elements if indices is None else [elements[~-i] for i in indices]
+
+            for e in pending:
+                if e in consumed:
+                    references.setdefault(e, (producers[e], []))[1].append(os.path.abspath(t.marker(e)))
+
+        return {p: r for p, r in references.items() if p not in pinned}
+
+    def register(self, tasks):
+        references = self.references(tasks)
+
+        # NOTE: References of previous runs are replaced
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+        os.makedirs(self._path('refs'))
+        os.makedirs(self._path('consumers'))
+
+        with open(self._path('policy.json'), 'w') as f:
+            json.dump(self.policy, f, indent=1, sort_keys=True)
+
+        consumers = {}
+        for p, (action, markers) in references.items():
+            key = digest(os.path.abspath(p))
+
+            with open(self._path('refs', "{}.json".format(key)), 'w') as f:
+                json.dump({'path': os.path.abspath(p), 'action': action}, f)
+
+            os.makedirs(self._path('refs', key))
+            for m in markers:
+                open(self._path('refs', key, digest(m)), 'w').close()
+                consumers.setdefault(m, []).append(key)
+
+        for m, keys in consumers.items():
+            with open(self._path('consumers', "{}.json".format(digest(m))), 'w') as f:
+                json.dump(keys, f)
+
+        logger.info("Retention: {} intermediate(s) are cleaned once consumed".format(len(references)))
+
+        return references
+
+    def completed(self, task_name, suboutput_dir, marker):
+        # NOTE: Files of the element (e.g. unmapped reads) are consumed by no task
+        for pattern, action in self.policy.get(task_name, {}).items():
+            if pattern.startswith('--'):
+                continue
+
+            for p in glob.glob(os.path.join(suboutput_dir, pattern)):
+                self._apply(p, action)
+
+        self.release(marker)
+
+    def release(self, marker):
+        consumer = digest(os.path.abspath(marker))
+        try:
+            with open(self._path('consumers', "{}.json".format(consumer))) as f:
+                keys = json.load(f)
+        except FileNotFoundError:
+            return
+
+        for key in keys:
+            try:
+                os.remove(self._path('refs', key, consumer))
+            except FileNotFoundError:
+                pass
+
+            try:
+                os.rmdir(self._path('refs', key))
+            except OSError:
+                # NOTE: Other consumers remain (or another one has cleaned it)
+                continue
+
+            with open(self._path('refs', "{}.json".format(key))) as f:
+                ref = json.load(f)
+
+            self._apply(ref['path'], ref['action'])
+            os.remove(self._path('refs', "{}.json".format(key)))
+
+        os.remove(self._path('consumers', "{}.json".format(consumer)))
+
+    @staticmethod
+    def _apply(path, action):
+        # NOTE: Failures of cleanup never fail the job
+        try:
+            apply(path, action)
+        except OSError as e:
+            logger.warning("Retention: {} was not cleaned: {}".format(path, e))
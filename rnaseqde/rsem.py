@@ -0,0 +1,120 @@
+"""
+rnaseqde.rsem
+~~~~~~~~~~~~~
+
+This module provides a merger of RSEM results into data matrices
+(a native replacement of rsem-generate-data-matrix)
+
+Usage:
+    rnaseqde.rsem [options] [--gene-tsv <PATH>...] [--transcript-tsv <PATH>...]
+
+Options:
+    --output-dir <PATH>         : Output directory [default: .]
+    --threads <N>               : Number of results read in parallel [default: 1]
+    --abundance                 : Also output TPM and FPKM matrices [default: False]
+    --gene-tsv <PATH>...        : RSEM results of genes (*.genes.results)
+    --transcript-tsv <PATH>...  : RSEM results of transcripts (*.isoforms.results)
+"""
+
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import rnaseqde.bundle as bundle
+
+
+# NOTE: Columns of *.genes.results and *.isoforms.results; expected_count is the 5th as the Perl script
+COLUMNS = {'count': 'expected_count', 'tpm': 'TPM', 'fpkm': 'FPKM'}
+
+
+def read_results(path, columns=('count',)):
+    # NOTE: Values are kept as written by RSEM, so that the matrices match rsem-generate-data-matrix
+    with open(path) as f:
+        header = f.readline().rstrip('\n').split('\t')
+        idx = [4 if c == 'count' else header.index(COLUMNS[c]) for c in columns]
+
+        ids, values = [], [[] for _ in columns]
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            ids.append(fields[0])
+            for v, i in zip(values, idx):
+                v.append(fields[i])
+
+    if not ids:
+        raise ValueError("Nothing is detected! {} may not exist or is empty.".format(path))
+
+    return ids, [np.array(v, dtype=np.bytes_) for v in values]
+
+
+def _read(args):
+    # NOTE: Runs in worker processes; ids are returned as a digest
+    path, columns = args
+    ids, values = read_results(path, columns)
+
+    return hashlib.sha256("\n".join(ids).encode()).hexdigest(), values
+
+
+def colname(path):
+    return path[2:] if path.startswith('./') else path
+
+
+def write_matrix(path, ids, colnames, columns):
+    # NOTE: Layout of rsem-generate-data-matrix; quoted names, values as they are
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write("\t".join([''] + ['"{}"'.format(c) for c in colnames]).encode() + b"\n")
+
+        mat = np.column_stack(columns)
+        for id_, row in zip(ids, mat.tolist()):
+            f.write(b'"' + id_.encode() + b'"\t' + b"\t".join(row) + b"\n")
+
+    os.replace(tmp, path)
+    bundle.write(bundle.bundle_path(path), ids, colnames, mat.astype(np.float64))
+
+
+def merge(inputs, output_dir, threads=1, abundance=False):
+    # NOTE: Expected counts (and TPM/FPKM) are read at once into <output_dir>/<column>_matrix.tsv
+    columns = ('count', 'tpm', 'fpkm') if abundance else ('count',)
+
+    ids, values = read_results(inputs[0], columns)
+    digest = hashlib.sha256("\n".join(ids).encode()).hexdigest()
+    results = [values]
+
+    rest = [(p, columns) for p in inputs[1:]]
+    if threads > 1 and len(rest) > 1:
+        with ProcessPoolExecutor(max_workers=threads) as executor:
+            read = list(executor.map(_read, rest, chunksize=max(1, len(rest) // (threads * 4))))
+    else:
+        read = [_read(a) for a in rest]
+
+    for path, (d, values) in zip(inputs[1:], read):
+        if d != digest:
+            raise ValueError("Results are not generated from the same reference: {}".format(path))
+        results.append(values)
+
+    colnames = [colname(p) for p in inputs]
+
+    os.makedirs(output_dir, exist_ok=True)
+    for i, c in enumerate(columns):
+        write_matrix(
+            os.path.join(output_dir, "{}_matrix.tsv".format(c)), ids, colnames, [r[i] for r in results]
+        )
+
+
+def main():
+    import rnaseqde.utils as utils
+
+    opt = utils.docmopt(__doc__)
+
+    for v in ['gene', 'transcript']:
+        if opt["--{}-tsv".format(v)]:
+            merge(
+                opt["--{}-tsv".format(v)], os.path.join(opt['--output-dir'], v),
+                threads=int(opt['--threads']), abundance=opt['--abundance']
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,7 @@ from collections import defaultdict
 import inflection
 
 import rnaseqde.utils as utils
+from rnaseqde.fastq import FastqValidator
 
 
 logger = logging.getLogger(__name__)
@@ -54,6 +55,18 @@ class SampleSheetManager:
                 raise Exception("read file: {} does not exists.".format(file))
                 sys.exit(1)
 
+    def validate_fastqs(self, threads=None, cache='.rnaseqde/fastq.json'):
+        # NOTE: Integrity and numbers of reads of all FASTQs (and pairs) before submission
+        validator = FastqValidator(cache, threads=threads)
+
+        if self._is_paired:
+            errors = validator.validate([], pairs=self.fastq_paired)
+        else:
+            errors = validator.validate(self.fastqs)
+
+        if errors:
+            raise Exception("invalid read files:\n{}".format("\n".join(errors)))
+
     @property
     def samples(self):
         return self._dict['sample']
@@ -0,0 +1,35 @@
+"""
+rnaseqde.scheduler
+~~~~~~~~~~~~~~~~~~
+
+This package provides job scheduler backends (UGE, SLURM and local)
+"""
+
+import os
+
+from rnaseqde.scheduler.base import Scheduler, array_task_id, array_task_ids
+from rnaseqde.scheduler.uge import UgeScheduler
+from rnaseqde.scheduler.slurm import SlurmScheduler
+from rnaseqde.scheduler.local import LocalScheduler
+
+
+SCHEDULERS = {
+    'uge': UgeScheduler,
+    'slurm': SlurmScheduler,
+    'local': LocalScheduler
+}
+
+
+def detect():
+    # NOTE: SGE_TASK_ID on the submit host selects UGE as before
+    if os.environ.get('SGE_TASK_ID', None):
+        return 'uge'
+
+    return 'local'
+
+
+def get_scheduler(name=None):
+    if name in [None, 'auto']:
+        name = detect()
+
+    return SCHEDULERS[name]()
@@ -0,0 +1,146 @@
+"""
+rnaseqde.scheduler.base
+~~~~~~~~~~~~~~~~~~~~~~~
+
+This module define base scheduler class
+"""
+
+import os
+import re
+from abc import ABCMeta, abstractmethod
+from functools import lru_cache
+
+import rnaseqde.utils as utils
+from rnaseqde.resource import Resources
+
+
+@lru_cache(maxsize=None)
+def _task_map(path):
+    with open(path) as f:
+        return tuple(int(line) for line in f if line.strip())
+
+
+# NOTE: (task id, step size, last task id) variables of each scheduler;
+#       local executor first, SGE_TASK_ID may be inherited from the submit host
+ARRAY_ENVS = [
+    ('RNASEQDE_TASK_ID', 'RNASEQDE_TASK_STEPSIZE', 'RNASEQDE_TASK_LAST'),
+    ('SLURM_ARRAY_TASK_ID', 'SLURM_ARRAY_TASK_STEP', 'SLURM_ARRAY_TASK_MAX'),
+    ('SGE_TASK_ID', 'SGE_TASK_STEPSIZE', 'SGE_TASK_LAST')
+]
+
+
+def _int_env(key, default=None):
+    try:
+        return int(os.environ[key])
+    except (KeyError, ValueError):
+        return default
+
+
+def _array_task_range():
+    for key_id, key_step, key_last in ARRAY_ENVS:
+        if key_id not in os.environ:
+            continue
+
+        task_id = _int_env(key_id)
+        if task_id is None:
+            return None
+
+        step = _int_env(key_step, 1)
+        last = _int_env(key_last, task_id + step - 1)
+
+        return list(range(task_id, min(task_id + step, -~last)))
+
+    return None
+
+
+def array_task_ids():
+    task_ids = _array_task_range()
+
+    # NOTE: Partially resubmitted arrays map their task ids to the original ones
+    task_map = os.environ.get('RNASEQDE_TASK_MAP', None)
+    if task_ids is None or not task_map:
+        return task_ids
+
+    return [_task_map(task_map)[~-i] for i in task_ids]
+
+
+def array_task_id():
+    task_ids = array_task_ids()
+
+    if not task_ids:
+        return None
+
+    return task_ids[0]
+
+
+def parse_task_ids(text):
+    # NOTE: '3', '1-10:2' or '1,3,5'
+    task_ids = []
+
+    for part in (text or '').split(','):
+        m = re.fullmatch(r"(\d+)(?:-(\d+)(?::(\d+))?)?", part.strip())
+        if m is None:
+            continue
+
+        first = int(m.group(1))
+        last = int(m.group(2) or first)
+        task_ids.extend(range(first, -~last, int(m.group(3) or 1)))
+
+    return task_ids
+
+
+class Scheduler(metaclass=ABCMeta):
+    name = None
+
+    def script_command(self, script, opt_script=None):
+        return "{script} {opt_script}".format(
+            script=script, opt_script=utils.optdict_to_str(opt_script or {})
+        ).rstrip()
+
+    def resources(self, script, resources=None):
+        if resources is None:
+            return Resources.from_header(script)
+
+        return resources
+
+    @abstractmethod
+    def command(self, script, opt_script=None, name=None, hold_job_ids=None, hold_array_job_ids=None,
+                n_tasks=None, step=None, resources=None, reservation=None, env=None, opt=None):
+        # NOTE: Element i of the array waits for element i of hold_array_job_ids
+        pass
+
+    @abstractmethod
+    def submit(self, script, opt_script=None, **kwargs):
+        pass
+
+    @abstractmethod
+    def query(self, job_ids):
+        # NOTE: States of the queued elements of the jobs by one call;
+        #       {job_id: {task_id: state}}, task_id is None for non-array jobs,
+        #       finished elements are absent. None if the scheduler failed
+        pass
+
+    def status(self, job_ids):
+        queried = self.query(job_ids)
+        if queried is None:
+            return {j: 'unknown' for j in job_ids}
+
+        states = {}
+        for job_id, elements in queried.items():
+            if not elements:
+                states[job_id] = 'finished'
+                continue
+
+            for state in ['failed', 'running', 'pending', 'finished']:
+                if state in elements.values():
+                    states[job_id] = state
+                    break
+
+        return states
+
+    @abstractmethod
+    def cancel(self, job_ids):
+        pass
+
+    def wait(self):
+        return True
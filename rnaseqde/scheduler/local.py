@@ -0,0 +1,61 @@
+"""
+rnaseqde.scheduler.local
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module provides local scheduler backed by the local executor
+"""
+
+from rnaseqde.executor import LocalExecutor
+from rnaseqde.scheduler.base import Scheduler
+
+
+class LocalScheduler(Scheduler):
+    name = 'local'
+
+    def __init__(self, slots=None, memory=None):
+        self._slots = slots
+        self._memory = memory
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = LocalExecutor(slots=self._slots, memory=self._memory)
+
+        return self._executor
+
+    def command(self, script, opt_script=None, name=None, hold_job_ids=None, hold_array_job_ids=None,
+                n_tasks=None, step=None, resources=None, reservation=None, env=None, opt=None):
+        return self.script_command(script, opt_script)
+
+    def submit(self, script, opt_script=None, **kwargs):
+        resources = self.resources(script, kwargs.get('resources'))
+
+        return self.executor.submit(
+            self.command(script, opt_script, **kwargs),
+            name=kwargs.get('name'),
+            hold_job_ids=kwargs.get('hold_job_ids'),
+            hold_array_job_ids=kwargs.get('hold_array_job_ids'),
+            n_tasks=kwargs.get('n_tasks'),
+            step=kwargs.get('step'),
+            env=kwargs.get('env'),
+            slots=resources.slots,
+            memory=resources.total_memory
+        )
+
+    def query(self, job_ids):
+        # NOTE: Finished elements are kept since the exit status is known
+        return {j: self.executor.element_status(j) for j in job_ids}
+
+    def status(self, job_ids):
+        return {j: self.executor.status(j) for j in job_ids}
+
+    def cancel(self, job_ids):
+        for j in job_ids:
+            self.executor.cancel(j)
+
+    def wait(self):
+        if self._executor is None:
+            return True
+
+        return self._executor.wait()
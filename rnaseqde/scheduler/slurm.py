@@ -0,0 +1,114 @@
+"""
+rnaseqde.scheduler.slurm
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module provides SLURM scheduler
+"""
+
+import os
+import math
+import getpass
+import subprocess
+
+import rnaseqde.utils as utils
+from rnaseqde.scheduler.base import Scheduler, parse_task_ids
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+STATES = {
+    'PD': 'pending',
+    'CF': 'running',
+    'R': 'running',
+    'CG': 'running',
+    'S': 'running'
+}
+
+
+class SlurmScheduler(Scheduler):
+    name = 'slurm'
+    log_dir = 'slurmlogs'
+
+    def command(self, script, opt_script=None, name=None, hold_job_ids=None, hold_array_job_ids=None,
+                n_tasks=None, step=None, resources=None, reservation=None, env=None, opt=None):
+        resources = self.resources(script, resources)
+        log_name = "%x.{}%A.%a" if n_tasks is not None else "%x.{}%j"
+
+        # NOTE: afterany matches -hold_jid; UGE holds regardless of exit status.
+        #       aftercorr (-hold_jid_ad) requires success; elements after a failed one are
+        #       cancelled instead of pending forever
+        dependency = []
+        if hold_job_ids:
+            dependency.append("afterany:" + ":".join(hold_job_ids))
+        if hold_array_job_ids:
+            dependency.append("aftercorr:" + ":".join(hold_array_job_ids))
+
+        opt_ = {
+            "--parsable": True,
+            "--export": ",".join(["ALL"] + ["{}={}".format(k, v) for k, v in (env or {}).items()]),
+            "--job-name": name,
+            "--dependency": ",".join(dependency) or None,
+            "--kill-on-invalid-dep": "yes" if hold_array_job_ids else None,
+            "--array": "1-{}:{}".format(n_tasks, step or 1) if n_tasks is not None else None,
+            "--reservation": reservation,
+            "--cpus-per-task": resources.slots,
+            "--mem-per-cpu": "{}M".format(math.ceil(resources.memory * 1024)) if resources.memory is not None else None,
+            "--output": os.path.join(self.log_dir, log_name.format('o')),
+            "--error": os.path.join(self.log_dir, log_name.format('e')),
+        }
+
+        if opt is not None:
+            opt_.update(opt)
+
+        cmd = "{base} {opt} {script_command}".format(
+            base="sbatch",
+            opt=utils.optdict_to_str(opt_),
+            script_command=self.script_command(script, opt_script)
+        )
+        return cmd
+
+    def submit(self, script, opt_script=None, **kwargs):
+        cmd = self.command(script, opt_script, **kwargs)
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        proc = subprocess.run(cmd, shell=True, capture_output=True)
+
+        if proc.returncode != 0:
+            logger.error("sbatch failed: {}".format(proc.stderr.decode()))
+            return None
+
+        # NOTE: --parsable returns '<job_id>[;<cluster>]'
+        return proc.stdout.decode().strip().split(";")[0]
+
+    def query(self, job_ids):
+        cmd = "squeue -h -o '%i %t' -u {}".format(getpass.getuser())
+        proc = subprocess.run(cmd, shell=True, capture_output=True)
+
+        if proc.returncode != 0:
+            logger.warning("squeue failed: {}".format(proc.stderr.decode()))
+            return None
+
+        states = {j: {} for j in job_ids}
+
+        for line in proc.stdout.decode().splitlines():
+            try:
+                id_, code = line.split()
+            except ValueError:
+                continue
+
+            # NOTE: '<job_id>', '<job_id>_<task_id>' or '<job_id>_[<ranges>%<limit>]'
+            job_id, _, task_ids = id_.partition("_")
+            if job_id not in states:
+                continue
+
+            task_ids = parse_task_ids(task_ids.strip("[]").split("%")[0])
+            for task_id in task_ids or [None]:
+                states[job_id][task_id] = STATES.get(code, 'failed')
+
+        return states
+
+    def cancel(self, job_ids):
+        subprocess.run("scancel {}".format(" ".join(job_ids)), shell=True, capture_output=True)
@@ -0,0 +1,101 @@
+"""
+rnaseqde.scheduler.uge
+~~~~~~~~~~~~~~~~~~~~~~
+
+This module provides Univa Grid Engine scheduler
+"""
+
+import subprocess
+import xml.etree.ElementTree as ET
+
+import rnaseqde.utils as utils
+from rnaseqde.scheduler.base import Scheduler, parse_task_ids
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+class UgeScheduler(Scheduler):
+    name = 'uge'
+
+    def command(self, script, opt_script=None, name=None, hold_job_ids=None, hold_array_job_ids=None,
+                n_tasks=None, step=None, resources=None, reservation=None, env=None, opt=None):
+        opt_ = {
+            "-V": True,
+            "-terse": True,
+            "-N": name,
+            "-hold_jid": ",".join(hold_job_ids) if hold_job_ids else None,
+            "-hold_jid_ad": ",".join(hold_array_job_ids) if hold_array_job_ids else None,
+        }
+
+        if n_tasks is not None:
+            opt_["-t"] = "1-{n}:{step}".format(n=n_tasks, step=step or 1)
+
+        # NOTE: Options on the command line take precedence over the header
+        if resources is not None:
+            if resources.pe is not None or resources.slots > 1:
+                opt_["-pe"] = "{} {}".format(resources.pe or 'def_slot', resources.slots)
+
+            if resources.memory is not None:
+                opt_["-l"] = "s_vmem={memory:g}G,mem_req={memory:g}G".format(memory=resources.memory)
+
+        if reservation is not None:
+            opt_["-ar"] = reservation
+
+        if env:
+            opt_["-v"] = ",".join("{}={}".format(k, v) for k, v in env.items())
+
+        if opt is not None:
+            opt_.update(opt)
+
+        cmd = "{base} {opt} {script_command}".format(
+            base="qsub",
+            opt=utils.optdict_to_str(opt_),
+            script_command=self.script_command(script, opt_script)
+        )
+        return cmd
+
+    def submit(self, script, opt_script=None, **kwargs):
+        cmd = self.command(script, opt_script, **kwargs)
+        proc = subprocess.run(cmd, shell=True, capture_output=True)
+
+        if proc.returncode != 0:
+            logger.error("qsub failed: {}".format(proc.stderr.decode()))
+            return None
+
+        # NOTE: Array job returns '<job_id>.<first>-<last>:<step>'
+        return proc.stdout.decode().strip().split(".")[0]
+
+    def query(self, job_ids):
+        proc = subprocess.run("qstat -xml", shell=True, capture_output=True)
+
+        if proc.returncode != 0:
+            logger.warning("qstat failed: {}".format(proc.stderr.decode()))
+            return None
+
+        states = {j: {} for j in job_ids}
+
+        for job in ET.fromstring(proc.stdout.decode()).iter('job_list'):
+            job_id = job.findtext('JB_job_number')
+            if job_id not in states:
+                continue
+
+            state = job.findtext('state') or ''
+
+            if 'E' in state:
+                state = 'failed'
+            elif 'r' in state or 't' in state:
+                state = 'running'
+            else:
+                state = 'pending'
+
+            # NOTE: Pending elements are listed as ranges, running ones one by one
+            for task_id in parse_task_ids(job.findtext('tasks')) or [None]:
+                states[job_id][task_id] = state
+
+        return states
+
+    def cancel(self, job_ids):
+        subprocess.run("qdel {}".format(" ".join(job_ids)), shell=True, capture_output=True)
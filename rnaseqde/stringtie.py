@@ -0,0 +1,157 @@
+"""
+rnaseqde.stringtie
+~~~~~~~~~~~~~~~~~~
+
+This module provides an extractor of read counts from StringTie outputs
+(a native replacement of prepDE.py)
+
+Usage:
+    rnaseqde.stringtie [options] --sample <STR>... --quantified-gtf <PATH>...
+
+Options:
+    --sample <STR>...           : Sample(s)
+    --output-dir <PATH>         : Output directory [default: .]
+    --read-length <N>           : Average read length [default: 75]
+    --threads <N>               : Number of samples read in parallel [default: 1]
+    --quantified-gtf <PATH>...  : Quantified GTF file(s) of StringTie
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rnaseqde.matrix import READ_LENGTH
+import rnaseqde.bundle as bundle
+
+
+# NOTE: Same as prepDE.py
+RE_GENE_ID = re.compile(r'gene_id "([^"]+)"')
+RE_GENE_NAME = re.compile(r'ref_gene_name "([^"]+)"')
+RE_TRANSCRIPT_ID = re.compile(r'transcript_id "([^"]+)"')
+RE_COVERAGE = re.compile(r'cov "([\-\+\d\.]+)"')
+
+
+def _gene_id(attrs, tx_id):
+    r, rn = RE_GENE_ID.search(attrs), RE_GENE_NAME.search(attrs)
+    if r is None:
+        return tx_id
+
+    return "{}|{}".format(r.group(1), rn.group(1)) if rn else r.group(1)
+
+
+def read_gtf(path):
+    # NOTE: Exons follow their transcript in StringTie outputs;
+    #       lengths are summed by the index of the last transcript
+    tx_ids, gene_ids, covs = [], [], []
+    exon_tx, exon_starts, exon_ends = [], [], []
+
+    with open(path) as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) < 9:
+                continue
+
+            if fields[2] == 'transcript':
+                tx_id = RE_TRANSCRIPT_ID.search(fields[8]).group(1)
+                cov = RE_COVERAGE.search(fields[8])
+
+                tx_ids.append(tx_id)
+                gene_ids.append(_gene_id(fields[8], tx_id))
+                covs.append(cov.group(1) if cov else 0)
+            elif fields[2] == 'exon' and tx_ids:
+                exon_tx.append(~-len(tx_ids))
+                exon_starts.append(fields[3])
+                exon_ends.append(fields[4])
+
+    lengths = np.bincount(
+        np.array(exon_tx, dtype=np.int64),
+        weights=np.array(exon_ends, dtype=np.int64) - np.array(exon_starts, dtype=np.int64) + 1,
+        minlength=len(tx_ids)
+    )
+
+    return tx_ids, gene_ids, np.maximum(np.array(covs, dtype=np.float64), 0.0), lengths
+
+
+def read_counts(path, read_length=READ_LENGTH):
+    # NOTE: Counts are ceil(cov * length / read length) per transcript and their sums per gene
+    tx_ids, gene_ids, covs, lengths = read_gtf(path)
+    counts = np.ceil(covs * lengths / read_length).astype(np.int64)
+
+    # NOTE: Later records of a transcript override the former as prepDE.py
+    tx = {t: i for i, t in enumerate(tx_ids)}
+    idx = np.fromiter(tx.values(), dtype=np.int64, count=len(tx))
+
+    genes = {}
+    g_idx = np.array([genes.setdefault(gene_ids[i], len(genes)) for i in idx.tolist()], dtype=np.int64)
+    g_counts = np.bincount(g_idx, weights=counts[idx], minlength=len(genes)).astype(np.int64)
+
+    return (list(tx), counts[idx]), (list(genes), g_counts)
+
+
+def _read(args):
+    return read_counts(*args)
+
+
+def _matrix(results):
+    # NOTE: Union of the features of samples; missing counts are 0
+    index = {}
+    for ids, _ in results:
+        for i in ids:
+            index.setdefault(i, len(index))
+
+    mat = np.zeros((len(index), len(results)), dtype=np.int64)
+    for j, (ids, counts) in enumerate(results):
+        mat[[index[i] for i in ids], j] = counts
+
+    names = sorted(index)
+
+    return names, mat[[index[n] for n in names]]
+
+
+def write_csv(path, key, names, samples, mat):
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, 'w') as f:
+        f.write(",".join([key] + samples) + "\n")
+        f.writelines(
+            "{},{}\n".format(n, ",".join(map(str, row))) for n, row in zip(names, mat.tolist())
+        )
+
+    os.replace(tmp, path)
+    bundle.write(bundle.bundle_path(path), names, samples, mat)
+
+
+def extract(samples, inputs, output_dir, threads=1, read_length=READ_LENGTH):
+    args = [(p, read_length) for p in inputs]
+    if threads > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(_read, args))
+    else:
+        results = [_read(a) for a in args]
+
+    os.makedirs(output_dir, exist_ok=True)
+    for i, v in enumerate(['transcript', 'gene']):
+        names, mat = _matrix([r[i] for r in results])
+        write_csv(os.path.join(output_dir, "{}_count_matrix.csv".format(v)), "{}_id".format(v), names, samples, mat)
+
+
+def main():
+    import rnaseqde.utils as utils
+
+    opt = utils.docmopt(__doc__)
+
+    if len(opt['--sample']) != len(opt['--quantified-gtf']):
+        raise SystemExit("Numbers of --sample and --quantified-gtf differ")
+
+    extract(
+        opt['--sample'], opt['--quantified-gtf'], opt['--output-dir'],
+        threads=int(opt['--threads']), read_length=float(opt['--read-length'])
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,7 @@
 
 import sys
 import os
-import subprocess
+import shlex
 
 import rnaseqde.utils as utils
 from rnaseqde.task.base import ArrayTask
@@ -16,6 +16,8 @@ from rnaseqde.task.base import ArrayTask
 
 class AlignHisat2Task(ArrayTask):
     instances = []
+    version_command = 'hisat2 --version'
+    runtime_hint = 30
 
     @property
     def inputs(self):
@@ -39,11 +41,21 @@ class AlignHisat2Task(ArrayTask):
 
         return suboutput_dir_
 
-    def suboutputs(self, input):
-        binding = {'--sam': 'aligned.sam'}
+    def suboutputs(self, input, output='sam'):
+        binding = {'--{}'.format(output): 'aligned.{}'.format(output)}
 
         return self._suboutputs(input, binding)
 
+    @property
+    def output_format(self):
+        # NOTE: bam pipes hisat2 into samtools sort in the same job
+        return self.inputs['--hisat2-output'] or 'bam'
+
+    @property
+    def output_per_gb(self):
+        # NOTE: SAM is uncompressed
+        return 1.0 if self.output_format == 'bam' else 4.0
+
     @property
     def outputs(self):
         def _samples():
@@ -59,7 +71,7 @@ class AlignHisat2Task(ArrayTask):
 
         outputs_ = self._inputs
         outputs_.update(
-            utils.dictcombine([self.suboutputs(s) for s in samples])
+            utils.dictcombine([self.suboutputs(s, self.output_format) for s in samples])
         )
 
         return outputs_
@@ -83,6 +95,7 @@ def main():
         --index <PATH>       : Reference index file
         --layout <TYPE>      : Library layout (sr/pe) [default: sr]
         --strandness <TYPE>  : Library strandness (none/rf/fr) [default: none]
+        --hisat2-output <TYPE>  : Output (sam/bam); bam is sorted without an intermediate SAM [default: bam]
         --output-dir <PATH>  : Output directory [default: .]
         --sample <STR>...    : (Comma delimited) sample(s)
         --conf <PATH>        : Configuration file
@@ -127,6 +140,12 @@ def main():
     }
     opt.update(opt_[opt_runtime['--strandness']])
 
+    if opt_runtime['--hisat2-output'] == 'bam':
+        # NOTE: hisat2 and samtools sort (-@: threads in addition to its own) share the slots of the job
+        slots = utils.job_slots()
+        opt['--threads'] = min(int(opt.get('--threads', 1)), max(1, slots - 1))
+        sort_threads = max(0, slots - opt['--threads'] - 1)
+
     for f1, f2, s in zip(fastq1s, fastq2s, samples):
         if f2 == '':
             opt['-U'] = f1
@@ -134,20 +153,37 @@ def main():
             opt['-1'] = f1
             opt['-2'] = f2
 
-        opt['-S'] = task.suboutputs(s)['--sam']
         opt['--un-conc'] = os.path.join(task.suboutput_dir(s), 'unaligned.fastq')
 
-        cmd = "{base} {opt}".format(
-            base='hisat2',
-            opt=utils.optdict_to_str(opt)
-        )
+        if opt_runtime['--hisat2-output'] == 'bam':
+            # NOTE: pipefail to catch failures of hisat2 as well
+            cmd = "bash -o pipefail -c {}".format(shlex.quote(
+                "{base} {opt} | samtools sort -@ {threads} -T {tmp} -o {bam} -".format(
+                    base='hisat2',
+                    opt=utils.optdict_to_str(opt),
+                    threads=sort_threads,
+                    tmp=os.path.join(task.suboutput_dir(s), 'aligned.tmp'),
+                    bam=task.suboutputs(s, 'bam')['--bam']
+                )
+            ))
+        else:
+            opt['-S'] = task.suboutputs(s)['--sam']
+
+            cmd = "{base} {opt}".format(
+                base='hisat2',
+                opt=utils.optdict_to_str(opt)
+            )
 
         sys.stderr.write("Command: {}\n".format(cmd))
         os.makedirs(task.suboutput_dir(s), exist_ok=True)
 
         if not opt_runtime['--dry-run']:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, task.suboutput_dir(s))
+            proc = utils.run_command(
+                cmd, task.suboutput_dir(s), task=task.task_name, sample=task.sample_name(s)
+            )
+
+            if proc.returncode == 0:
+                task.mark_completed(s)
 
 
 if __name__ == '__main__':
@@ -8,7 +8,6 @@
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
 from rnaseqde.task.base import ArrayTask
@@ -16,6 +15,9 @@ from rnaseqde.task.base import ArrayTask
 
 class AlignStarTask(ArrayTask):
     instances = []
+    version_command = 'STAR --version'
+    runtime_hint = 30
+    output_per_gb = 2.0
 
     @property
     def inputs(self):
@@ -77,6 +79,13 @@ class AlignStarTask(ArrayTask):
 
         return self._n_tasks()
 
+    def step(self, n_tasks):
+        # NOTE: Samples of a batch are aligned by one job against the genome loaded once
+        if self.inputs['--star-batch'] is not None:
+            return max(1, min(int(self.inputs['--star-batch']), n_tasks))
+
+        return super().step(n_tasks)
+
 
 def main():
     """
@@ -92,6 +101,7 @@ def main():
         --strandness <TYPE>  : Library strandness (none/rf/fr) [default: none]
         --output-dir <PATH>  : Output directory [default: .]
         --sample <STR>...    : (Comma delimited) sample(s)
+        --star-batch <N>     : Align N samples per job, keeping the genome in shared memory
         --conf <PATH>        : Configuration file
         --dry-run            : Dry-run [default: False]
         --fastq <PATH>...    : (Ordered) FASTQ file(s)
@@ -128,6 +138,31 @@ def main():
 
     opt = utils.dictbind(task.conf, opt_runtime, binding)
 
+    # NOTE: The genome is loaded by the first sample and shared by the following ones
+    #       (and by the jobs on the same node); junctions of the GTF cannot be inserted
+    #       on the fly into a shared genome, so those built into the index are used
+    #       (and the 2-pass mode, which inserts the junctions of the 1st pass, is dropped).
+    #       BAM sorting requires --limitBAMsortRAM in this mode
+    shared = opt_runtime['--star-batch'] is not None
+    if shared:
+        opt.pop('--sjdbGTFfile', None)
+        if opt.pop('--twopassMode', 'None') != 'None':
+            sys.stderr.write("Warning: --twopassMode is dropped with --genomeLoad LoadAndKeep\n")
+
+        opt['--genomeLoad'] = 'LoadAndKeep'
+
+    try:
+        _align(task, opt, fastq1s, fastq2s, samples, opt_runtime['--dry-run'])
+    finally:
+        if shared:
+            # NOTE: A failure to free the genome never hides that of the alignment
+            try:
+                _remove_genome(task, opt_runtime['--index'], opt_runtime['--dry-run'])
+            except Exception as e:
+                sys.stderr.write("Warning: Shared genome was not removed: {}\n".format(e))
+
+
+def _align(task, opt, fastq1s, fastq2s, samples, dry_run):
     for f1, f2, s in zip(fastq1s, fastq2s, samples):
         opt['--readFilesIn'] = ' '.join((f1, f2)).strip()
         opt['--outFileNamePrefix'] = task.suboutput_dir(s)
@@ -140,9 +175,33 @@ def main():
         sys.stderr.write("Command: {}\n".format(cmd))
         os.makedirs(task.suboutput_dir(s), exist_ok=True)
 
-        if not opt_runtime['--dry-run']:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, task.suboutput_dir(s))
+        if not dry_run:
+            proc = utils.run_command(
+                cmd, task.suboutput_dir(s), task=task.task_name, sample=task.sample_name(s)
+            )
+
+            if proc.returncode == 0:
+                task.mark_completed(s)
+
+
+def _remove_genome(task, index, dry_run):
+    # NOTE: Shared memory is freed once the other jobs of the node detach from it
+    output_dir = os.path.join(task.output_dir, '.genome_load', "{}.{}".format(os.uname().nodename, os.getpid()), '')
+
+    cmd = "{base} {opt}".format(
+        base='STAR',
+        opt=utils.optdict_to_str({
+            '--genomeLoad': 'Remove',
+            '--genomeDir': index,
+            '--outFileNamePrefix': output_dir
+        })
+    )
+
+    sys.stderr.write("Command: {}\n".format(cmd))
+    os.makedirs(output_dir, exist_ok=True)
+
+    if not dry_run:
+        utils.run_command(cmd, output_dir, task=task.task_name)
 
 
 if __name__ == '__main__':
@@ -8,11 +8,16 @@ This module define base task class
 import sys
 import os
 import re
-import random
-import subprocess
+import math
+import time
+from types import MappingProxyType
+from functools import lru_cache
 from abc import ABCMeta, abstractmethod
 
 import rnaseqde.utils as utils
+from rnaseqde.scheduler import get_scheduler, array_task_ids
+from rnaseqde.cache import digest, tool_version
+from rnaseqde.resource import Resources, sample_gb, sample_gbs
 
 from logging import getLogger
 
@@ -20,70 +25,120 @@ from logging import getLogger
 logger = getLogger(__name__)
 
 
+def _resolved_once(name, prop):
+    # NOTE: Cache is valid until Task.invalidate() bumps the generation
+    def fget(self):
+        resolved = self.__dict__.setdefault('_resolved', {})
+
+        try:
+            generation, value = resolved[name]
+            if generation == Task._generation:
+                return value
+        except KeyError:
+            pass
+
+        value = prop.fget(self)
+        if isinstance(value, dict):
+            value = MappingProxyType(value)
+
+        resolved[name] = (Task._generation, value)
+        return value
+
+    return property(fget, prop.fset, prop.fdel, prop.__doc__)
+
+
+@lru_cache(maxsize=None)
+def class_task_name(class_name):
+    # NOTE: e.g. AlignStarTask: align_star
+    return re.sub(r"_task$", "", utils.snake_cased(class_name))
+
+
 class Task(metaclass=ABCMeta):
     instances = []
     dry_run = False
     ar_id = None
+    scheduler = None
+    cache = None
+    resource_rules = {}
+    submitted_at = None
+    memoize = True
+    _generation = 0
+    _required_tasks = None
 
     def __init__(self, required_tasks=None, output_dir=None):
-        self.required_tasks = required_tasks
+        self._required_tasks = required_tasks
         self._output_dir = output_dir
         self._job_id = None
         self.register()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        if not cls.memoize:
+            return
+
+        # NOTE: Resolved inputs/outputs are frozen and computed once per generation
+        for name in ['inputs', 'outputs', 'elements', 'cache_key']:
+            prop = cls.__dict__.get(name, None)
+            if isinstance(prop, property):
+                setattr(cls, name, _resolved_once(name, prop))
+
+    @classmethod
+    def invalidate(cls):
+        Task._generation += 1
+
+    @property
+    def required_tasks(self):
+        return self._required_tasks
+
+    @required_tasks.setter
+    def required_tasks(self, required_tasks):
+        self._required_tasks = required_tasks
+        Task.invalidate()
+
     @classmethod
     def run_all_tasks(cls):
         for task in cls.instances:
             task.run()
 
+    @classmethod
+    def wait_all_tasks(cls):
+        if Task.scheduler is None:
+            return True
+
+        return Task.scheduler.wait()
+
     @classmethod
     def task_job_ids(cls):
         return [task.job_id for task in cls.tasks]
 
-    def submit_query(self, script, opt_script=None, opt_qsub=None, log=True):
+    def submit_query(self, script, opt_script=None, opt_qsub=None, log=True,
+                     n_tasks=None, step=None, env=None):
         if script is None:
             script = self.script
 
-        def _build_command():
-            if not os.environ.get("SGE_TASK_ID", None):
-                cmd = "{script} {opt_script}".format(
-                    script=script, opt_script=utils.optdict_to_str(opt_script)
-                )
-                return cmd
-
-            opt = {
-                "-V": True,
-                "-terse": True,
-                "-N": self.task_name,
-                "-hold_jid": self.qsub_hold_job_ids,
-            }
-
-            if opt_qsub is not None:
-                opt.update(opt_qsub)
-
-            cmd = "{base} {opt} {script} {opt_script}".format(
-                base="qsub",
-                opt=utils.optdict_to_str(opt),
-                script=script,
-                opt_script=utils.optdict_to_str(opt_script)
-            )
-            return cmd
-
-        cmd = _build_command()
+        if Task.scheduler is None:
+            Task.scheduler = get_scheduler()
+
+        kwargs = {
+            "name": self.task_name,
+            "hold_job_ids": self.hold_job_ids,
+            "hold_array_job_ids": self.hold_array_job_ids,
+            "n_tasks": n_tasks,
+            "step": step,
+            "resources": self.resources,
+            "reservation": self.__class__.ar_id,
+            "env": env,
+            "opt": opt_qsub
+        }
 
         if log:
+            cmd = Task.scheduler.command(script, opt_script, **kwargs)
             logger.debug("{}: {}".format(self.task_name, cmd))
 
         if not self.__class__.dry_run:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-
-        if not os.environ.get("SGE_TASK_ID", None):
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            self._job_id = str(random.randrange(1000))
-            logger.info("\n{}".format(proc.stderr.decode()))
-
-        if not self.__class__.dry_run and os.environ.get("SGE_TASK_ID", None):
-            self.job_id = proc.stdout
+            self.submitted_at = time.time()
+            self._job_id = Task.scheduler.submit(script, opt_script, **kwargs)
 
         logger.info("Job_ID: {} was submitted.".format(self.job_id))
 
@@ -92,9 +147,21 @@ class Task(metaclass=ABCMeta):
         if not self.__class__.__name__ == "Task":
             Task.instances.append(self)
 
+    def unregister(self):
+        self.__class__.instances.remove(self)
+        if not self.__class__.__name__ == "Task":
+            Task.instances.remove(self)
+
     def upper(self):
         return self.required_tasks[0]
 
+    def root(self):
+        task = self
+        while task.required_tasks:
+            task = task.upper()
+
+        return task
+
     @property
     def job_id(self):
         return self._job_id
@@ -105,32 +172,76 @@ class Task(metaclass=ABCMeta):
 
     @property
     def task_name(self):
-        return re.sub(r"_task$", "", utils.snake_cased(self.__class__.__name__))
+        return class_task_name(self.__class__.__name__)
 
     @property
     def script(self):
         return utils.actpath_to_sympath(sys.modules[self.__module__].__file__)
 
+    @property
+    def annotation(self):
+        return self.root().annotation
+
+    @property
+    def resources(self):
+        rule = Task.resource_rules.get(self.task_name, {})
+        input_gb = self.input_gb if rule.get('memory_per_gb') else 0.0
+
+        return Resources.from_header(self.script).updated(rule, input_gb)
+
+    @property
+    def input_gb(self):
+        opt = self.root().outputs or {}
+
+        return sample_gb(opt.get('--fastq1', []), opt.get('--fastq2') or None)
+
+    @property
+    def total_input_gb(self):
+        # NOTE: GiB of FASTQ of all samples, for tasks run once for all of them
+        return sum(sample_gbs(self.root().outputs or {}).values())
+
+    def holds_elementwise(self, task):
+        return False
+
+    @property
+    def hold_job_ids(self):
+        if self.required_tasks is None:
+            return None
+
+        job_ids = sorted(set(
+            task.job_id for task in self.required_tasks
+            if task.job_id is not None and not self.holds_elementwise(task)
+        ))
+
+        if not job_ids:
+            return None
+
+        return job_ids
+
+    @property
+    def hold_array_job_ids(self):
+        # NOTE: Array jobs whose element i is waited for only by element i
+        if self.required_tasks is None:
+            return None
+
+        job_ids = sorted(set(
+            task.job_id for task in self.required_tasks
+            if task.job_id is not None and self.holds_elementwise(task)
+        ))
+
+        if not job_ids:
+            return None
+
+        return job_ids
+
     @property
     def qsub_hold_job_ids(self):
-        if self.required_tasks is not None:
-            try:
-                job_ids = ",".join(
-                    set(
-                        [
-                            task.job_id
-                            for task in set(self.required_tasks)
-                            if task.job_id is not None
-                        ]
-                    )
-                )
-
-                if job_ids == "":
-                    return None
-
-                return job_ids
-            except TypeError:
-                return None
+        job_ids = self.hold_job_ids
+
+        if job_ids is None:
+            return None
+
+        return ",".join(job_ids)
 
     @abstractmethod
     def run(self):
@@ -150,6 +261,11 @@ class Task(metaclass=ABCMeta):
 
 
 class CommandLineTask(Task):
+    version_command = None
+    # NOTE: Version of the native engines (rnaseqde.matrix etc.) replacing the R scripts
+    native_version_command = "{} -c 'import numpy; print(numpy.__version__)'".format(sys.executable)
+    marker_name = '.completed'
+
     def __init__(self, required_tasks=None, output_dir=None, conf=None):
         super().__init__(required_tasks=required_tasks, output_dir=output_dir)
 
@@ -175,16 +291,113 @@ class CommandLineTask(Task):
         if self.conf_path:
             _opt = {**_opt, **{'--conf': self.conf_path}}
 
-        _opt_qsub = {}
-        if self.__class__.ar_id:
-            _opt_qsub.update({"-ar": self.__class__.ar_id})
+        if self.is_cached():
+            return
 
         self.submit_query(
             script=self.script,
-            opt_script=_opt,
-            opt_qsub=_opt_qsub
+            opt_script=_opt
         )
 
+        self.record_cache()
+
+    def is_cached(self):
+        if Task.cache is None or self.__class__.dry_run:
+            return False
+
+        if not Task.cache.lookup(self.cache_key, self.products, self.markers):
+            return False
+
+        logger.info("{}: Outputs are up to date, skipped.".format(self.task_name))
+        return True
+
+    def record_cache(self):
+        if Task.cache is None or self.job_id is None:
+            return
+
+        Task.cache.record(self.cache_key, self.task_name, self.products)
+
+    def marker(self, element=None):
+        return os.path.join(self.output_dir, self.marker_name)
+
+    @property
+    def markers(self):
+        # NOTE: Written by the wrappers only if the tools succeeded
+        return [self.marker()]
+
+    def mark_completed(self, element=None):
+        marker = self.marker(element)
+        os.makedirs(os.path.dirname(marker), exist_ok=True)
+
+        # NOTE: Written atomically; a killed job never leaves a marker
+        tmp = "{}.{}.tmp".format(marker, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write("{}\n".format(self.task_name if element is None else element))
+
+        os.replace(tmp, marker)
+
+        return marker
+
+    def is_completed(self, element=None, since=None):
+        try:
+            return os.path.getmtime(self.marker(element)) >= (since or 0.0)
+        except FileNotFoundError:
+            return False
+
+    @property
+    def products(self):
+        # NOTE: Output paths made by this task, excluding ones passed through
+        products_ = list(self.products_map.values())
+
+        return sorted(set(p for p in utils.flatten(products_) if isinstance(p, str)))
+
+    @property
+    def cache_key(self):
+        opt = dict(self.inputs)
+        if self.conf_path:
+            opt['--conf'] = self.conf_path
+
+        # NOTE: Files given by the workflow are identified by their contents,
+        #       files made by upstream tasks by the upstream keys
+        root_values = set(p for p in utils.flatten(list(self.root().outputs.values())) if isinstance(p, str))
+        identities = {}
+        for v in utils.flatten(list(opt.values())):
+            if isinstance(v, str) and v in root_values:
+                identity = Task.cache.identity(v)
+                if identity is not None:
+                    identities[v] = identity
+
+        return digest({
+            'task': self.task_name,
+            'command': utils.optdict_to_str(opt),
+            'conf': self.conf,
+            'version': tool_version(self.version_command),
+            'identities': identities,
+            'upstream': [
+                t.cache_key for t in self.required_tasks or [] if isinstance(t, (CommandLineTask, AliasTask))
+            ]
+        })
+
+    @property
+    def run_key(self):
+        # NOTE: Identity of the command regardless of the output directory;
+        #       the same for annotations sharing the inputs (e.g. a Salmon index)
+        opt = dict(self.inputs)
+        if self.conf_path:
+            opt['--conf'] = self.conf_path
+
+        return digest({
+            'task': self.__class__.__name__,
+            'command': utils.optdict_to_str(opt).replace(self.output_dir, '{output_dir}'),
+            'conf': self.conf
+        })
+
+    @property
+    def products_map(self):
+        inputs_ = self._inputs
+
+        return {k: v for k, v in self.outputs.items() if inputs_.get(k, None) != v}
+
     @property
     def _inputs(self):
         inputs_ = {}
@@ -215,38 +428,143 @@ class CommandLineTask(Task):
     @output_dir.setter
     def output_dir(self, output_dir):
         self._output_dir = output_dir
+        Task.invalidate()
 
 
 class ArrayTask(CommandLineTask):
+    submission = None
+    samples_per_job = 1
+    # NOTE: Typical minutes per sample and per job (queueing, index loading),
+    #       used to pack samples with `samples_per_job = 'auto'`
+    runtime_hint = None
+    job_overhead = 6
+    # NOTE: Typical GiB of outputs per GiB of FASTQ of a sample, used to plan the disk usage
+    output_per_gb = None
+
     def run(self):
         _opt = self.inputs
 
         if self.conf_path:
             _opt = {**_opt, **{'--conf': self.conf_path}}
 
-        _opt_qsub = {"-t": self.qsub_threads}
+        if self.is_cached():
+            return
 
-        if self.__class__.ar_id:
-            _opt_qsub.update({"-ar": self.__class__.ar_id})
+        n_tasks, env = self.n_tasks, None
+        indices = self.pending_indices()
+
+        if indices is not None and len(indices) < n_tasks:
+            if not indices:
+                logger.info("{}: All elements are completed, skipped.".format(self.task_name))
+                return
+
+            logger.info("{}: Resubmitting {} of {} element(s).".format(
+                self.task_name, len(indices), n_tasks))
+            n_tasks, env = len(indices), {'RNASEQDE_TASK_MAP': self.write_task_map(indices)}
+
+        # NOTE: Original indices of the submitted elements and the step, for the monitor
+        self.submission = (indices or list(range(1, -~n_tasks)), self.step(n_tasks))
 
         self.submit_query(
             script=self.script,
             opt_script=_opt,
-            opt_qsub=_opt_qsub
+            n_tasks=n_tasks,
+            step=self.submission[1],
+            env=env
         )
 
+        self.record_cache()
+
+    def holds_elementwise(self, task):
+        # NOTE: Only if both arrays are submitted with the same elements (indices and step)
+        #       for the same samples in the same order
+        upstream = getattr(task, 'canonical', task)
+
+        if not isinstance(upstream, ArrayTask) or upstream.submission is None:
+            return False
+
+        if self.submission != upstream.submission:
+            return False
+
+        return [self.sample_name(e) for e in self.elements] == [upstream.sample_name(e) for e in upstream.elements]
+
     @classmethod
     def scattered(cls, inputs):
-        try:
-            sge_task_id = os.environ.get("SGE_TASK_ID", None)
-            sge_task_id = int(sge_task_id)
-        except ValueError:
-            pass
-        except TypeError:
+        task_ids = array_task_ids()
+
+        if task_ids is None:
             logger.info("Run on local.\n")
             return inputs
-        else:
-            return [inputs[~-sge_task_id]]
+
+        return [inputs[~-i] for i in task_ids if i <= len(inputs)]
+
+    def step(self, n_tasks):
+        # NOTE: Each array element processes a contiguous chunk of samples
+        step = self.__class__.samples_per_job
+
+        if step == 'auto':
+            if self.runtime_hint is None:
+                return 1
+
+            step = math.ceil(self.job_overhead / self.runtime_hint)
+
+        return max(1, min(int(step), n_tasks))
+
+    @property
+    def elements(self):
+        # NOTE: Keys given to suboutput_dir() by each array element, in task id order;
+        #       tasks reading FASTQs are keyed by the samples (or the first mates)
+        if '--sample' not in self.inputs:
+            return list(self.incrementer)
+
+        if self.inputs['--sample'] is not None:
+            return self.inputs['--sample']
+
+        if self.inputs['--layout'] == 'pe':
+            return self.incrementer[0::2]
+
+        return self.incrementer
+
+    def sample_name(self, element):
+        return os.path.basename(os.path.normpath(self.suboutput_dir(element)))
+
+    def marker(self, element):
+        return os.path.join(self.suboutput_dir(element), self.marker_name)
+
+    @property
+    def markers(self):
+        return [self.marker(e) for e in self.elements]
+
+    def mark_completed(self, element):
+        marker = super().mark_completed(element)
+
+        # NOTE: Imported here as rnaseqde.retention depends on this module
+        from rnaseqde.retention import Retention
+
+        retention = Retention.from_env()
+        if retention is not None:
+            retention.completed(self.task_name, self.suboutput_dir(element), marker)
+
+    def pending_indices(self):
+        # NOTE: Markers are trusted only for the same cache key,
+        #       and only if written after its first submission
+        if Task.cache is None or self.__class__.dry_run:
+            return None
+
+        submitted_at = Task.cache.submitted_at(self.cache_key)
+        if submitted_at is None:
+            return None
+
+        return [i for i, e in enumerate(self.elements, 1) if not self.is_completed(e, since=submitted_at)]
+
+    def write_task_map(self, indices):
+        path = os.path.abspath(os.path.join(self.output_dir, '.task_map'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'w') as f:
+            f.write("".join("{}\n".format(i) for i in indices))
+
+        return path
 
     @property
     def incrementer(self):
@@ -259,13 +577,6 @@ class ArrayTask(CommandLineTask):
     def n_tasks(self):
         return self._n_tasks()
 
-    def _qsub_threads(self, step=1):
-        return "1-{n}:{step}".format(n=str(self.n_tasks), step=step)
-
-    @property
-    def qsub_threads(self):
-        return self._qsub_threads()
-
     @abstractmethod
     def suboutput_dir(self):
         pass
@@ -285,9 +596,10 @@ class ArrayTask(CommandLineTask):
 class DictWrapperTask(Task):
     instances = []
 
-    def __init__(self, opt: dict, output_dir=""):
+    def __init__(self, opt: dict, output_dir="", annotation=None):
         self._opt = opt
         self._output_dir = output_dir
+        self._annotation = annotation
         self._job_id = None
         self.register()
 
@@ -298,6 +610,10 @@ class DictWrapperTask(Task):
     def inputs(self):
         pass
 
+    @property
+    def annotation(self):
+        return self._annotation
+
     @property
     def output_dir(self):
         return self._output_dir
@@ -305,3 +621,43 @@ class DictWrapperTask(Task):
     @property
     def outputs(self):
         return self._opt
+
+
+class AliasTask(Task):
+    # NOTE: Stands for the same command queued for another annotation (canonical);
+    #       passes its products with the outputs of the upstream in this annotation
+    instances = []
+
+    def __init__(self, canonical, required_tasks=None):
+        self.canonical = canonical
+        super().__init__(required_tasks=required_tasks)
+
+    def run(self):
+        logger.info("{}: Same as {}, skipped.".format(self.output_dir, self.canonical.output_dir))
+
+    @property
+    def task_name(self):
+        return self.canonical.task_name
+
+    @property
+    def job_id(self):
+        return self.canonical.job_id
+
+    @property
+    def cache_key(self):
+        return self.canonical.cache_key
+
+    @property
+    def inputs(self):
+        return self.canonical.inputs
+
+    @property
+    def output_dir(self):
+        return os.path.join(self.upper().output_dir, self.task_name)
+
+    @property
+    def outputs(self):
+        outputs_ = dict(self.upper().outputs or {})
+        outputs_.update(self.canonical.products_map)
+
+        return outputs_
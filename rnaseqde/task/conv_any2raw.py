@@ -1,21 +1,30 @@
 #! /usr/bin/env python3
 #$ -S $HOME/.pyenv/shims/python3
-#$ -l s_vmem=32G -l mem_req=32G
+#$ -pe def_slot 4
+#$ -l s_vmem=8G -l mem_req=8G
 #$ -cwd
 #$ -o ugelogs/
 #$ -e ugelogs/
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
+import rnaseqde.bundle as bundle
+from rnaseqde.annotation import Annotation
 from rnaseqde.task.base import CommandLineTask
 
 
 class ConvAnyToRawTask(CommandLineTask):
     instances = []
 
+    @property
+    def version_command(self):
+        if self.inputs['--count-engine'] == 'legacy':
+            return 'Rscript --version'
+
+        return self.native_version_command
+
     @property
     def inputs(self):
         inputs_ = utils.dictupdate_if_exists(
@@ -28,27 +37,28 @@ class ConvAnyToRawTask(CommandLineTask):
                 })
 
         def _opt(upper_class):
-            n = upper_class.__class__.__name__
+            # NOTE: By task name, the same for aliases (shared among annotations)
+            n = upper_class.task_name
 
-            if n == 'QuantKallistoTask':
+            if n == 'quant_kallisto':
                 return {
                     '--type': 'kallisto',
                     '--input': upper_class.outputs['--h5']
                 }
 
-            if n == 'QuantRsemTask':
+            if n == 'quant_rsem':
                 return {
                     '--type': 'rsem',
                     '--input': upper_class.outputs['--transcript-tsv']
                 }
 
-            if n == 'QuantStringtieTask':
+            if n == 'quant_stringtie':
                 return {
                     '--type': 'stringtie',
                     '--input': upper_class.outputs['--ctab']
                 }
 
-            if n == 'QuantSalmonTask':
+            if n == 'quant_salmon':
                 return {
                     '--type': 'salmon',
                     '--input': upper_class.outputs['--sf']
@@ -64,13 +74,16 @@ class ConvAnyToRawTask(CommandLineTask):
         outputs_.update({
             f"--{v}-mat-tsv": os.path.join(self.output_dir, f"count_matrix_{v}.tsv") for v in ['gene', 'transcript']
             })
+        outputs_.update({
+            f"--{v}-mat-bundle": bundle.bundle_path(outputs_[f"--{v}-mat-tsv"]) for v in ['gene', 'transcript']
+            })
 
         return outputs_
 
 
 def main():
     """
-    Wrapper for UGE: Convert quantified data to raw count using tximport
+    Wrapper for UGE: Convert quantified data to raw count (natively or using tximport)
 
     Usage:
         conv_any2raw_tximport [options] --gtf <PATH> --type <TYPE> --input <PATH>...
@@ -79,6 +92,7 @@ def main():
         --gtf <PATH>         : GTF annotation file
         --type <TYPE>        : Input type (kallisto/rsem/stringtie/salmon)
         --output-dir <PATH>  : Output directory [default: .]
+        --count-engine <ENGINE>  : Engine of count matrices (native/legacy) [default: native]
         --dry-run            : Dry-run [default: False]
         --input <PATH>...    : Output(s) of quantifier;
                                kallisto: abundance.h5, RSEM: quantified.isoforms.results, StringTie: t_data.ctab, Salmon: quant.sf
@@ -91,19 +105,44 @@ def main():
     opt = utils.dictfilter(opt_runtime, ['--gtf', '--type', '--output-dir'])
     args = [' '.join(opt_runtime['--input'])]
 
-    cmd = "{base} {script} {opt} {args}".format(
-        base='Rscript',
-        script=utils.from_root('scripts/conv_any2raw.R'),
-        opt=utils.optdict_to_str(opt),
-        args=' '.join(args)
-    )
+    if opt_runtime['--count-engine'] == 'legacy':
+        # NOTE: Parsed once per annotation by the store instead of readGFF
+        if not opt_runtime['--dry-run']:
+            opt['--t2g'] = Annotation(opt['--gtf']).path('t2g')
+
+        cmd = "{base} {script} {opt} {args}".format(
+            base='Rscript',
+            script=utils.from_root('scripts/conv_any2raw.R'),
+            opt=utils.optdict_to_str(opt),
+            args=' '.join(args)
+        )
+    else:
+        # NOTE: Samples are read in parallel by the slots of this job
+        opt['--threads'] = utils.job_slots()
+
+        cmd = "{base} -m rnaseqde.matrix {opt} {args}".format(
+            base=sys.executable,
+            opt=utils.optdict_to_str(opt),
+            args=' '.join(args)
+        )
 
     sys.stderr.write("Command: {}\n".format(cmd))
     os.makedirs(task.output_dir, exist_ok=True)
 
     if not opt_runtime['--dry-run']:
-        proc = subprocess.run(cmd, shell=True, capture_output=True)
-        utils.puts_captured_output(proc, task.output_dir)
+        proc = utils.run_command(cmd, task.output_dir, task=task.task_name)
+
+        # NOTE: Partial matrices of a failed tool are not converted into bundles
+        if proc.returncode != 0:
+            sys.exit(proc.returncode)
+
+        if opt_runtime['--count-engine'] == 'legacy':
+            # NOTE: Bundles of the native engine are written by rnaseqde.matrix
+            for v in ['gene', 'transcript']:
+                bundle.convert(task.outputs[f"--{v}-mat-tsv"])
+
+    if not opt_runtime['--dry-run']:
+        task.mark_completed()
 
 
 if __name__ == '__main__':
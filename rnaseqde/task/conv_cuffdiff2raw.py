@@ -1,21 +1,29 @@
 #! /usr/bin/env python3
 #$ -S $HOME/.pyenv/shims/python3
-#$ -l s_vmem=8G -l mem_req=8G
+#$ -pe def_slot 2
+#$ -l s_vmem=4G -l mem_req=4G
 #$ -cwd
 #$ -o ugelogs/
 #$ -e ugelogs/
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
+import rnaseqde.bundle as bundle
 from rnaseqde.task.base import CommandLineTask
 
 
 class ConvCuffdiffToRawTask(CommandLineTask):
     instances = []
 
+    @property
+    def version_command(self):
+        if self.inputs['--count-engine'] == 'legacy':
+            return 'Rscript --version'
+
+        return self.native_version_command
+
     @property
     def inputs(self):
         inputs_ = utils.dictupdate_if_exists(
@@ -36,6 +44,9 @@ class ConvCuffdiffToRawTask(CommandLineTask):
         outputs_.update({
             f"--{v}-mat-tsv": os.path.join(self.output_dir, f"count_matrix_{v}.tsv") for v in ['gene', 'transcript']
             })
+        outputs_.update({
+            f"--{v}-mat-bundle": bundle.bundle_path(outputs_[f"--{v}-mat-tsv"]) for v in ['gene', 'transcript']
+            })
 
         return outputs_
 
@@ -49,6 +60,7 @@ def main():
 
     Options:
         --output-dir <PATH>  : Output directory [default: .]
+        --count-engine <ENGINE>  : Engine of count matrices (native/legacy) [default: native]
         --dry-run            : Dry-run [default: False]
         --input <PATH>       : Cuffdiff output directory
 
@@ -58,23 +70,49 @@ def main():
     task = ConvCuffdiffToRawTask(output_dir=opt_runtime['--output-dir'])
 
     opt = utils.dictfilter(opt_runtime, include=['--output-dir', '--dry-run'])
-
-    for k, v in {'transcript': 'isoforms.read_group_tracking', 'gene': 'genes.read_group_tracking'}.items():
-        args = [os.path.join(opt_runtime['--input'], v)]
-
-        cmd = "{base} {script} {opt} {args}".format(
-            base='Rscript',
-            script=utils.from_root('scripts/conv_cuffdiff2raw.R'),
-            opt=utils.optdict_to_str(opt),
-            args=' '.join(args)
-        )
-
+    trackings = {'transcript': 'isoforms.read_group_tracking', 'gene': 'genes.read_group_tracking'}
+
+    if opt_runtime['--count-engine'] == 'legacy':
+        cmds = [
+            "{base} {script} {opt} {args}".format(
+                base='Rscript',
+                script=utils.from_root('scripts/conv_cuffdiff2raw.R'),
+                opt=utils.optdict_to_str(opt),
+                args=os.path.join(opt_runtime['--input'], v)
+            ) for v in trackings.values()
+        ]
+    else:
+        # NOTE: Both tracking files are converted concurrently in a command
+        opt = utils.dictfilter(opt_runtime, include=['--output-dir'])
+        opt['--type'] = 'cuffdiff'
+        opt['--threads'] = utils.job_slots()
+
+        cmds = [
+            "{base} -m rnaseqde.matrix {opt} {args}".format(
+                base=sys.executable,
+                opt=utils.optdict_to_str(opt),
+                args=' '.join(os.path.join(opt_runtime['--input'], v) for v in trackings.values())
+            )
+        ]
+
+    for cmd in cmds:
         sys.stderr.write("Command: {}\n".format(cmd))
         os.makedirs(task.output_dir, exist_ok=True)
 
         if not opt_runtime['--dry-run']:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, task.output_dir)
+            proc = utils.run_command(cmd, task.output_dir, task=task.task_name)
+
+            # NOTE: Partial matrices of a failed tool are not converted into bundles
+            if proc.returncode != 0:
+                sys.exit(proc.returncode)
+
+    if opt_runtime['--count-engine'] == 'legacy' and not opt_runtime['--dry-run']:
+        # NOTE: Bundles of the native engine are written by rnaseqde.matrix
+        for v in ['gene', 'transcript']:
+            bundle.convert(task.outputs[f"--{v}-mat-tsv"])
+
+    if not opt_runtime['--dry-run']:
+        task.mark_completed()
 
 
 if __name__ == '__main__':
@@ -1,20 +1,28 @@
 #! /usr/bin/env python3
 #$ -S $HOME/.pyenv/shims/python3
+#$ -pe def_slot 2
 #$ -cwd
 #$ -o ugelogs/
 #$ -e ugelogs/
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
+import rnaseqde.bundle as bundle
 from rnaseqde.task.base import CommandLineTask
 
 
 class ConvRsemToMatrixTask(CommandLineTask):
     instances = []
 
+    @property
+    def version_command(self):
+        if self.inputs['--count-engine'] == 'legacy':
+            return 'rsem-calculate-expression --version'
+
+        return self.native_version_command
+
     @property
     def inputs(self):
         inputs_ = utils.dictupdate_if_exists(
@@ -34,6 +42,15 @@ class ConvRsemToMatrixTask(CommandLineTask):
         outputs_.update({
             f"--{v}-mat-tsv": os.path.join(self.output_dir, v, 'count_matrix.tsv') for v in ['gene', 'transcript']
             })
+        outputs_.update({
+            f"--{v}-mat-bundle": bundle.bundle_path(outputs_[f"--{v}-mat-tsv"]) for v in ['gene', 'transcript']
+            })
+
+        if self.inputs['--rsem-abundance'] and self.inputs['--count-engine'] != 'legacy':
+            outputs_.update({
+                f"--{v}-{c}-mat-tsv": os.path.join(self.output_dir, v, f"{c}_matrix.tsv")
+                for v in ['gene', 'transcript'] for c in ['tpm', 'fpkm']
+                })
 
         return outputs_
 
@@ -47,6 +64,8 @@ def main():
 
     Options:
         --output-dir <PATH>         : Output directory [default: .]
+        --count-engine <ENGINE>     : Engine of count matrices (native/legacy) [default: native]
+        --rsem-abundance            : Also generate TPM and FPKM matrices (native only) [default: False]
         --dry-run                   : Dry-run [default: False]
         --gene-tsv <PATH>...        : Gene-level counts TSV file
         --transcript-tsv <PATH>...  : Transcript-level counts TSV file
@@ -59,6 +78,35 @@ def main():
 
     task.output_dir = opt_runtime['--output-dir']
 
+    if opt_runtime['--count-engine'] != 'legacy':
+        # NOTE: Both levels in one command; results are read in parallel by the slots of this job
+        opt = {
+            '--output-dir': task.output_dir,
+            '--threads': utils.job_slots()
+        }
+        if opt_runtime['--rsem-abundance']:
+            opt['--abundance'] = True
+
+        opt.update(utils.dictfilter(opt_runtime, ['--gene-tsv', '--transcript-tsv']))
+
+        cmd = "{base} -m rnaseqde.rsem {opt}".format(
+            base=sys.executable,
+            opt=utils.optdict_to_str(opt)
+        )
+
+        sys.stderr.write("Command: {}\n".format(cmd))
+        os.makedirs(task.output_dir, exist_ok=True)
+
+        if not opt_runtime['--dry-run']:
+            proc = utils.run_command(cmd, task.output_dir, task=task.task_name)
+
+            if proc.returncode != 0:
+                sys.exit(proc.returncode)
+
+            task.mark_completed()
+
+        return
+
     for v in ['gene', 'transcript']:
         key_ = "--{}-tsv".format(v)
         args = opt_runtime[key_]
@@ -78,8 +126,17 @@ def main():
         os.makedirs(output_dir_, exist_ok=True)
 
         if not opt_runtime['--dry-run']:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, output_dir_)
+            proc = utils.run_command(cmd, output_dir_, task=task.task_name)
+
+            # NOTE: Partial matrices of a failed tool are not converted into bundles
+            if proc.returncode != 0:
+                sys.exit(proc.returncode)
+
+            # NOTE: Bundles of the native engine are written by rnaseqde.rsem
+            bundle.convert(os.path.join(output_dir_, 'count_matrix.tsv'))
+
+    if not opt_runtime['--dry-run']:
+        task.mark_completed()
 
 
 if __name__ == '__main__':
@@ -1,5 +1,6 @@
 #! /usr/bin/env python3
 #$ -S $HOME/.pyenv/shims/python3
+#$ -pe def_slot 4
 #$ -l s_vmem=8G -l mem_req=8G
 #$ -cwd
 #$ -o ugelogs/
@@ -7,15 +8,22 @@
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
+import rnaseqde.bundle as bundle
 from rnaseqde.task.base import CommandLineTask
 
 
 class ConvStringtieToRawTask(CommandLineTask):
     instances = []
 
+    @property
+    def version_command(self):
+        if self.inputs['--count-engine'] == 'legacy':
+            return 'stringtie --version'
+
+        return self.native_version_command
+
     @property
     def inputs(self):
         inputs_ = utils.dictupdate_if_exists(
@@ -35,6 +43,9 @@ class ConvStringtieToRawTask(CommandLineTask):
         outputs_.update({
             f"--{v}-mat-csv": os.path.join(self.output_dir, f"{v}_count_matrix.csv") for v in ['gene', 'transcript']
             })
+        outputs_.update({
+            f"--{v}-mat-bundle": bundle.bundle_path(outputs_[f"--{v}-mat-csv"]) for v in ['gene', 'transcript']
+            })
 
         return outputs_
 
@@ -51,7 +62,7 @@ class ConvStringtieToRawTask(CommandLineTask):
 
 def main():
     """
-    Wrapper for UGE: Generate count matrix using PrepDE.py
+    Wrapper for UGE: Generate count matrix (natively or using prepDE.py)
 
     Usage:
         conv_stringtie2raw [options] --sample <STR>... --quantified-gtf <PATH>...
@@ -59,6 +70,7 @@ def main():
     Options:
         --sample <STR>...           : Sample(s)
         --output-dir <PATH>         : Output directory [default: .]
+        --count-engine <ENGINE>     : Engine of count matrices (native/legacy) [default: native]
         --dry-run                   : Dry-run [default: False]
         --quantified-gtf <PATH>...  : Quantified GTF file(s)
 
@@ -70,26 +82,49 @@ def main():
     task.output_dir = opt_runtime['--output-dir']
 
     os.makedirs(task.output_dir, exist_ok=True)
-    list_targets = task.puts_list_targets(
-        opt_runtime['--quantified-gtf'],
-        opt_runtime['--sample']
-        )
 
-    opt = {
-        '-i': list_targets,
-        '-g': task.outputs['--gene-mat-csv'],
-        '-t': task.outputs['--transcript-mat-csv']
-    }
-
-    cmd = "{base} {opt}".format(
-        base='prepDE.py',
-        opt=utils.optdict_to_str(opt)
-        )
+    if opt_runtime['--count-engine'] == 'legacy':
+        list_targets = task.puts_list_targets(
+            opt_runtime['--quantified-gtf'],
+            opt_runtime['--sample']
+            )
+
+        opt = {
+            '-i': list_targets,
+            '-g': task.outputs['--gene-mat-csv'],
+            '-t': task.outputs['--transcript-mat-csv']
+        }
+
+        cmd = "{base} {opt}".format(
+            base='prepDE.py',
+            opt=utils.optdict_to_str(opt)
+            )
+    else:
+        # NOTE: Samples are read in parallel by the slots of this job
+        opt = utils.dictfilter(opt_runtime, ['--output-dir', '--sample', '--quantified-gtf'])
+        opt['--threads'] = utils.job_slots()
+
+        cmd = "{base} -m rnaseqde.stringtie {opt}".format(
+            base=sys.executable,
+            opt=utils.optdict_to_str(opt)
+            )
 
     sys.stderr.write("Command: {}\n".format(cmd))
 
-    proc = subprocess.run(cmd, shell=True, capture_output=True)
-    utils.puts_captured_output(proc, task.output_dir)
+    if not opt_runtime['--dry-run']:
+        proc = utils.run_command(cmd, task.output_dir, task=task.task_name)
+
+        # NOTE: Partial matrices of a failed tool are not converted into bundles
+        if proc.returncode != 0:
+            sys.exit(proc.returncode)
+
+        if opt_runtime['--count-engine'] == 'legacy':
+            # NOTE: Bundles of the native engine are written by rnaseqde.stringtie
+            for v in ['gene', 'transcript']:
+                bundle.convert(task.outputs[f"--{v}-mat-csv"])
+
+    if not opt_runtime['--dry-run']:
+        task.mark_completed()
 
 
 if __name__ == '__main__':
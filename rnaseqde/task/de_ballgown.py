@@ -7,7 +7,6 @@
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
 from rnaseqde.task.base import CommandLineTask
@@ -15,6 +14,7 @@ from rnaseqde.task.base import CommandLineTask
 
 class DeBallgownTask(CommandLineTask):
     instances = []
+    version_command = 'Rscript --version'
 
     @property
     def inputs(self):
@@ -27,7 +27,7 @@ class DeBallgownTask(CommandLineTask):
                 '--ctab': '--ctab'
                 }
 
-        if self.upper().__class__.__name__ == 'QuantStringtieTask':
+        if self.upper().task_name == 'quant_stringtie':
             del binding['--gtf']
 
         inputs_ = utils.dictbind(inputs_, self._inputs, binding)
@@ -78,8 +78,13 @@ def main():
     os.makedirs(task.output_dir, exist_ok=True)
 
     if not opt_runtime['--dry-run']:
-        proc = subprocess.run(cmd, shell=True, capture_output=True)
-        utils.puts_captured_output(proc, task.output_dir)
+        proc = utils.run_command(cmd, task.output_dir, task=task.task_name)
+
+        if proc.returncode != 0:
+            sys.exit(proc.returncode)
+
+    if not opt_runtime['--dry-run']:
+        task.mark_completed()
 
 
 if __name__ == '__main__':
@@ -9,7 +9,6 @@
 
 import sys
 import os
-import subprocess
 import itertools
 
 import rnaseqde.utils as utils
@@ -18,6 +17,7 @@ from rnaseqde.task.base import CommandLineTask
 
 class DeCuffdiffTask(CommandLineTask):
     instances = []
+    version_command = 'cuffdiff'
 
     @property
     def inputs(self):
@@ -117,8 +117,13 @@ def main():
     os.makedirs(task.output_dir, exist_ok=True)
 
     if not opt_runtime['--dry-run']:
-        proc = subprocess.run(cmd, shell=True, capture_output=True)
-        utils.puts_captured_output(proc, task.output_dir)
+        proc = utils.run_command(cmd, task.output_dir, task=task.task_name)
+
+        if proc.returncode != 0:
+            sys.exit(proc.returncode)
+
+    if not opt_runtime['--dry-run']:
+        task.mark_completed()
 
 
 if __name__ == '__main__':
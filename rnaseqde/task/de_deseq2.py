@@ -7,15 +7,16 @@
 
 import sys
 import os
-import subprocess
 import itertools
 
 import rnaseqde.utils as utils
+import rnaseqde.bundle as bundle
 from rnaseqde.task.base import CommandLineTask
 
 
 class DeDeseq2Task(CommandLineTask):
     instances = []
+    version_command = 'Rscript --version'
 
     def __init__(self, required_tasks=None, output_dir=None, conf=None, level=None):
         super().__init__(required_tasks=required_tasks, output_dir=output_dir, conf=conf)
@@ -89,7 +90,8 @@ def main():
     opt = utils.dictfilter(opt_runtime, exclude=["--count-mat-tsv", "--dry-run"])
 
     args = [None] * 1
-    args[0] = opt_runtime["--count-mat-tsv"]
+    # NOTE: The binary bundle is read by the R script without parsing the TSV
+    args[0] = bundle.preferred(opt_runtime["--count-mat-tsv"])
 
     opt["--output-dir"] = task.output_dir
 
@@ -104,8 +106,13 @@ def main():
     os.makedirs(task.output_dir, exist_ok=True)
 
     if not opt_runtime["--dry-run"]:
-        proc = subprocess.run(cmd, shell=True, capture_output=True)
-        utils.puts_captured_output(proc, task.output_dir)
+        proc = utils.run_command(cmd, task.output_dir, task=task.task_name)
+
+        if proc.returncode != 0:
+            sys.exit(proc.returncode)
+
+    if not opt_runtime["--dry-run"]:
+        task.mark_completed()
 
 
 if __name__ == "__main__":
@@ -7,15 +7,16 @@
 
 import sys
 import os
-import subprocess
 import collections
 
 import rnaseqde.utils as utils
+import rnaseqde.bundle as bundle
 from rnaseqde.task.base import CommandLineTask
 
 
 class DeEbseqTask(CommandLineTask):
     instances = []
+    version_command = 'Rscript --version'
 
     @property
     def inputs(self):
@@ -85,7 +86,8 @@ def main():
         }
 
         args = [None] * 3
-        args[0] = opt_runtime[key_]
+        # NOTE: The binary bundle is read by the R script without parsing the TSV
+        args[0] = bundle.preferred(opt_runtime[key_])
         args[1], args[2] = n_reps
 
         cmd = "{base} {script} {opt} {args}".format(
@@ -99,8 +101,13 @@ def main():
         os.makedirs(output_dir_, exist_ok=True)
 
         if not opt_runtime['--dry-run']:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, output_dir_)
+            proc = utils.run_command(cmd, output_dir_, task=task.task_name)
+
+            if proc.returncode != 0:
+                sys.exit(proc.returncode)
+
+    if not opt_runtime['--dry-run']:
+        task.mark_completed()
 
 
 if __name__ == '__main__':
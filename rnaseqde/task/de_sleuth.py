@@ -8,14 +8,15 @@
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
+from rnaseqde.annotation import Annotation
 from rnaseqde.task.base import CommandLineTask
 
 
 class DeSleuthTask(CommandLineTask):
     instances = []
+    version_command = 'Rscript --version'
 
     @property
     def inputs(self):
@@ -64,6 +65,10 @@ def main():
     opt = utils.dictfilter(opt_runtime, ['--gtf', '--sample-sheet', '--output-dir'])
     args = [' '.join(opt_runtime['--h5'])]
 
+    # NOTE: Parsed once per annotation by the store instead of readGFF
+    if not opt_runtime['--dry-run']:
+        opt['--t2g'] = Annotation(opt['--gtf']).path('t2g')
+
     cmd = "{base} {script} {opt} {args}".format(
         base='Rscript',
         script=utils.from_root('scripts/de_sleuth.R'),
@@ -75,8 +80,13 @@ def main():
     os.makedirs(task.output_dir, exist_ok=True)
 
     if not opt_runtime['--dry-run']:
-        proc = subprocess.run(cmd, shell=True, capture_output=True)
-        utils.puts_captured_output(proc, task.output_dir)
+        proc = utils.run_command(cmd, task.output_dir, task=task.task_name)
+
+        if proc.returncode != 0:
+            sys.exit(proc.returncode)
+
+    if not opt_runtime['--dry-run']:
+        task.mark_completed()
 
 
 if __name__ == '__main__':
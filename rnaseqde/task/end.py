@@ -13,11 +13,14 @@ from itertools import groupby
 from operator import itemgetter
 
 import rnaseqde.utils as utils
-from rnaseqde.task.base import Task
+import rnaseqde.metrics as metrics
+from rnaseqde.task.base import Task, CommandLineTask, DictWrapperTask
+from rnaseqde.resource import sample_gbs
 
 
 class EndTask(Task):
     instances = []
+    memoize = False
 
     def run(self):
         self.submit_query(
@@ -35,7 +38,26 @@ class EndTask(Task):
             for o in outputs:
                 f.write("{}\n".format("\t".join(o)))
 
-        return [path]
+        # NOTE: Directories to collect the metrics of each annotation from
+        task_dirs = [(t.annotation or '', t.output_dir, t.total_input_gb) for t in self.required_tasks if t.job_id is not None and isinstance(t, CommandLineTask)]
+
+        path_metrics = 'list_metrics.txt'
+        with open(path_metrics, 'w') as f:
+            for a, d, gb in task_dirs:
+                f.write("{}\t{}\t{:.3f}\n".format(a, d, gb))
+
+        # NOTE: FASTQ sizes of the samples, recorded with the metrics for planning
+        gbs = {}
+        for t in self.required_tasks:
+            if isinstance(t, DictWrapperTask):
+                gbs.update(sample_gbs(t.outputs))
+
+        path_samples = 'list_samples.txt'
+        with open(path_samples, 'w') as f:
+            for k, v in gbs.items():
+                f.write("{}\t{:.3f}\n".format(k, v))
+
+        return [path, path_metrics, path_samples]
 
     @property
     def output_dir(self):
@@ -49,6 +71,17 @@ class EndTask(Task):
 def main():
     input_ = sys.argv[1]
 
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'r') as f:
+            task_dirs = [(a, d, float(gb)) for a, d, gb in csv.reader(f, delimiter="\t")]
+
+        input_gbs = {}
+        if len(sys.argv) > 3:
+            with open(sys.argv[3], 'r') as f:
+                input_gbs = {row[0]: float(row[1]) for row in csv.reader(f, delimiter="\t")}
+
+        metrics.write_tsv(metrics.collect(task_dirs, input_gbs), 'run_metrics.tsv')
+
     # HACK: Use try except
     error_occurred = False
     messages = []
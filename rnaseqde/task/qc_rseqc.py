@@ -7,14 +7,17 @@
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
+from rnaseqde.annotation import Annotation, PRODUCTS
 from rnaseqde.task.base import ArrayTask
 
 
 class QcRseqcTask(ArrayTask):
     instances = []
+    version_command = 'bam_stat.py --version'
+    runtime_hint = 20
+    output_per_gb = 0.01
 
     @property
     def inputs(self):
@@ -77,19 +80,11 @@ def main():
     gtf = opt["--gtf"]
     bams = task.scattered(opt["--bam"])
 
-    bed = os.path.join(
-        os.path.dirname(gtf), utils.basename_replaced_ext(".gtf", ".bed", gtf)
-    )
-
-    if not os.path.exists(bed):
-        cmd1 = "{script} --tx-only {gtf}".format(
-            script=utils.from_root("scripts/gtf2bed4igv.py"), gtf=gtf
-        )
-
-        sys.stderr.write("Command: {}\n".format(cmd1))
-
-        if not opt_runtime["--dry-run"]:
-            proc = subprocess.run(cmd1, shell=True, capture_output=False)
+    # NOTE: BED12 of the transcripts is derived once per annotation by the store
+    if opt_runtime["--dry-run"]:
+        bed = "<annotation store of {}>/{}".format(gtf, PRODUCTS["bed12"])
+    else:
+        bed = Annotation(gtf).path("bed12")
 
     for b in bams:
         cmd2 = "{script} --bed {bed} --output-dir {output_dir} {bam}".format(
@@ -100,11 +95,15 @@ def main():
         )
 
         sys.stderr.write("Command: {}\n".format(cmd2))
-        os.makedirs(task.output_dir, exist_ok=True)
+        os.makedirs(task.suboutput_dir(b), exist_ok=True)
 
         if not opt_runtime["--dry-run"]:
-            proc = subprocess.run(cmd2, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, task.output_dir)
+            proc = utils.run_command(
+                cmd2, task.suboutput_dir(b), task=task.task_name, sample=task.sample_name(b)
+            )
+
+            if proc.returncode == 0:
+                task.mark_completed(b)
 
 
 if __name__ == "__main__":
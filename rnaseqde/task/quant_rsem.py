@@ -8,7 +8,6 @@
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
 from rnaseqde.task.base import ArrayTask
@@ -16,6 +15,9 @@ from rnaseqde.task.base import ArrayTask
 
 class QuantRsemTask(ArrayTask):
     instances = []
+    version_command = 'rsem-calculate-expression --version'
+    runtime_hint = 30
+    output_per_gb = 0.1
 
     @property
     def inputs(self):
@@ -116,8 +118,12 @@ def main():
         os.makedirs(task.suboutput_dir(b), exist_ok=True)
 
         if not opt_runtime['--dry-run']:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, task.suboutput_dir(b))
+            proc = utils.run_command(
+                cmd, task.suboutput_dir(b), task=task.task_name, sample=task.sample_name(b)
+            )
+
+            if proc.returncode == 0:
+                task.mark_completed(b)
 
 
 if __name__ == '__main__':
@@ -7,7 +7,6 @@
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
 from rnaseqde.task.base import ArrayTask
@@ -15,6 +14,9 @@ from rnaseqde.task.base import ArrayTask
 
 class QuantSalmonTask(ArrayTask):
     instances = []
+    version_command = 'salmon --version'
+    runtime_hint = 5
+    output_per_gb = 0.05
 
     @property
     def inputs(self):
@@ -156,8 +158,12 @@ def main():
         os.makedirs(task.suboutput_dir(s), exist_ok=True)
 
         if not opt_runtime['--dry-run']:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, task.suboutput_dir(s))
+            proc = utils.run_command(
+                cmd, task.suboutput_dir(s), task=task.task_name, sample=task.sample_name(s)
+            )
+
+            if proc.returncode == 0:
+                task.mark_completed(s)
 
 
 if __name__ == '__main__':
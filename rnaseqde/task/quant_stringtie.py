@@ -7,7 +7,6 @@
 
 import sys
 import os
-import subprocess
 
 import rnaseqde.utils as utils
 from rnaseqde.task.base import ArrayTask
@@ -15,6 +14,9 @@ from rnaseqde.task.base import ArrayTask
 
 class QuantStringtieTask(ArrayTask):
     instances = []
+    version_command = 'stringtie --version'
+    runtime_hint = 10
+    output_per_gb = 0.05
 
     @property
     def inputs(self):
@@ -108,8 +110,12 @@ def main():
         os.makedirs(task.suboutput_dir(b), exist_ok=True)
 
         if not opt_runtime['--dry-run']:
-            proc = subprocess.run(cmd, shell=True, capture_output=True)
-            utils.puts_captured_output(proc, task.suboutput_dir(b))
+            proc = utils.run_command(
+                cmd, task.suboutput_dir(b), task=task.task_name, sample=task.sample_name(b)
+            )
+
+            if proc.returncode == 0:
+                task.mark_completed(b)
 
 
 if __name__ == '__main__':
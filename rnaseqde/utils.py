@@ -13,11 +13,15 @@ from pathlib import Path
 from copy import deepcopy
 from textwrap import dedent
 import itertools
+from functools import lru_cache
 from typing import Union, List
 
 from docopt import docopt, parse_defaults
 import yaml
 
+import rnaseqde.metrics as metrics
+import rnaseqde.logsink as logsink
+
 
 def root_path():
     abspath_actual = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -102,9 +106,14 @@ def docmopt(doc, **kwargs):
 
 
 def docopt_keys(doc):
+    return list(_docopt_keys(doc))
+
+
+@lru_cache(maxsize=None)
+def _docopt_keys(doc):
     doc = dedent(doc)
     opts = parse_defaults(doc)
-    keys = [o.name for o in opts]
+    keys = tuple(o.name for o in opts)
 
     return keys
 
@@ -223,17 +232,21 @@ def gathered(list_dict: List[dict], key):
     return list_
 
 
-# NOTE: Change bypass flag
-def puts_captured_output(proc, output_dir='.', bypass=False):
-    with open(os.path.join(output_dir, 'stderr.log'), 'w') as f:
-        f.write(proc.stderr.decode())
+def run_command(cmd, output_dir='.', task=None, sample=None):
+    # NOTE: Streams the logs to output_dir and records the metrics
+    stdout, stderr = logsink.stdio_sinks(output_dir)
+
+    with stdout, stderr:
+        proc, metrics_ = metrics.measured_run(cmd, stdout=stdout, stderr=stderr)
+
+    metrics.record(output_dir, metrics_, task=task, sample=sample, cmd=cmd)
+
+    return proc
 
-    with open(os.path.join(output_dir, 'stdout.log'), 'w') as f:
-        f.write(proc.stdout.decode())
 
-    if bypass:
-        sys.stdout.write(proc.stdout.decode())
-        sys.stdout.write(proc.stderr.decode())
+def job_slots():
+    # NOTE: Slots granted to this job by the scheduler (UGE, Slurm)
+    return int(os.environ.get('NSLOTS', os.environ.get('SLURM_CPUS_PER_TASK', 1)))
 
 
 def replaced_ext(ext_target, ext_replacement, input):
@@ -0,0 +1,258 @@
+"""
+rnaseqde.workflow.compiler
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module provides a compiler of workflow definitions (config/workflow/*.yml) into a task DAG
+"""
+
+import inspect
+import pkgutil
+import itertools
+import importlib
+from copy import deepcopy
+
+import rnaseqde.utils as utils
+import rnaseqde.task
+from rnaseqde.scheduler import get_scheduler
+from rnaseqde.cache import TaskCache
+from rnaseqde.resource import load_rules
+from rnaseqde.retention import Retention, load_policy, export_state_dir
+from rnaseqde.task.base import Task, CommandLineTask, ArrayTask, DictWrapperTask, AliasTask, class_task_name
+from rnaseqde.task.end import EndTask
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+ROOT = 'root'
+STEPS = ['align', 'quant', 'de']
+
+
+def task_classes():
+    # NOTE: Tasks by task name (e.g. align_star: AlignStarTask) of the modules in rnaseqde.task
+    classes = {}
+
+    for m in pkgutil.iter_modules(rnaseqde.task.__path__):
+        module = importlib.import_module("rnaseqde.task.{}".format(m.name))
+
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, CommandLineTask) and cls.__module__ == module.__name__:
+                classes[class_task_name(cls.__name__)] = cls
+
+    return classes
+
+
+def definition_path(name):
+    if name.endswith(('.yml', '.yaml')):
+        return name
+
+    return utils.from_root("config/workflow/{}.yml".format(name))
+
+
+def _edges(after):
+    # NOTE: Upstream task IDs and the options required to use them
+    edges = []
+    for e in after:
+        if isinstance(e, str):
+            edges.append((e, {}))
+        else:
+            edges.extend((k, v or {}) for k, v in e.items())
+
+    return edges
+
+
+def load_definition(name, loading=()):
+    path = definition_path(name)
+    if path in loading:
+        raise ValueError("Workflow includes itself: {}".format(path))
+
+    definition = utils.load_conf(path, strict=False)
+    if not definition:
+        raise ValueError("Workflow is not defined: {}".format(path))
+
+    steps, tasks = {}, {}
+    for n in definition.get('include', []):
+        included = load_definition(n, loading=(*loading, path))
+
+        for k, v in included['steps'].items():
+            steps[k] = list(dict.fromkeys(steps.get(k, []) + v))
+        _merge_tasks(tasks, included['tasks'])
+
+    own = {
+        id_: {
+            'task': (spec or {}).get('task', id_),
+            'after': _edges((spec or {}).get('after', [])),
+            'when': (spec or {}).get('when', {}),
+            'foreach': (spec or {}).get('foreach', {})
+        } for id_, spec in definition.get('tasks', {}).items()
+    }
+    _merge_tasks(tasks, own)
+
+    # NOTE: Steps of the including workflow replace the included ones
+    steps.update(definition.get('steps', {}))
+
+    return {'steps': steps, 'tasks': tasks}
+
+
+def _merge_tasks(tasks, others):
+    # NOTE: Tasks of the same ID are merged by their upstreams
+    for id_, spec in others.items():
+        if id_ not in tasks:
+            tasks[id_] = deepcopy(spec)
+            continue
+
+        for k in ['task', 'when', 'foreach']:
+            if spec[k] and tasks[id_][k] and spec[k] != tasks[id_][k]:
+                raise ValueError("Task {} is defined differently in {}".format(id_, k))
+            tasks[id_][k] = tasks[id_][k] or spec[k]
+
+        tasks[id_]['after'] += [e for e in spec['after'] if e not in tasks[id_]['after']]
+
+
+def _sorted_ids(tasks):
+    # NOTE: Topological order, keeping the order of the definitions
+    ordered, visiting = [], set()
+
+    def _visit(id_):
+        if id_ in ordered or id_ == ROOT:
+            return
+        if id_ in visiting:
+            raise ValueError("Workflow has a cycle at: {}".format(id_))
+        if id_ not in tasks:
+            raise ValueError("Task is not defined: {}".format(id_))
+
+        visiting.add(id_)
+        for upstream, _ in tasks[id_]['after']:
+            _visit(upstream)
+        ordered.append(id_)
+
+    for id_ in tasks:
+        _visit(id_)
+
+    return ordered
+
+
+def _matched(opt, when):
+    return all(opt.get(k) == v for k, v in when.items())
+
+
+def init_options(opt, steps):
+    Task.dry_run = opt['--dry-run']
+    Task.ar_id = opt['--ar']
+    Task.scheduler = get_scheduler(opt['--scheduler'])
+    ArrayTask.samples_per_job = opt['--samples-per-job']
+    Task.resource_rules = load_rules(opt['--resources'])
+
+    if opt['--cache'] is not None:
+        Task.cache = TaskCache(checksum=(opt['--cache'] == 'checksum'))
+
+    if opt['--step-by-step'] is not None:
+        Task.dry_run = True
+
+        for t in steps[opt['--step-by-step']]:
+            t.dry_run = False
+
+    if opt['--resume-from'] in ['quant', 'de']:
+        for t in steps['align']:
+            t.dry_run = True
+
+    if opt['--resume-from'] in ['de']:
+        for t in steps['quant']:
+            t.dry_run = True
+
+
+class Compiler:
+    def __init__(self, definition, classes=None):
+        self.definition = definition
+        self.classes = classes or task_classes()
+        self._nodes = {}
+        self._runs = {}
+
+        for id_, spec in definition['tasks'].items():
+            if spec['task'] not in self.classes:
+                raise ValueError("Unknown task: {} ({})".format(spec['task'], id_))
+
+    @property
+    def steps(self):
+        return {k: [self.classes[n] for n in self.definition['steps'].get(k, [])] for k in STEPS}
+
+    def node(self, cls, upstream, kwargs, conf):
+        # NOTE: Structurally identical tasks (task, upstream, arguments and conf) are queued once
+        key = (cls, id(upstream), tuple(sorted(kwargs.items())), conf)
+
+        if key not in self._nodes:
+            if 'conf' in inspect.signature(cls.__init__).parameters:
+                kwargs = {**kwargs, 'conf': conf}
+
+            self._nodes[key] = self.shared(cls([upstream], **kwargs))
+
+        return self._nodes[key]
+
+    def shared(self, task):
+        # NOTE: A task running the same command as one of another annotation
+        #       (e.g. Salmon with an index shared by annotations) is run once
+        canonical = self._runs.setdefault(task.run_key, task)
+        if canonical is task:
+            return task
+
+        task.unregister()
+        logger.debug("{}: Shared with {}".format(task.output_dir, canonical.output_dir))
+
+        return AliasTask(canonical, required_tasks=task.required_tasks)
+
+    def compile(self, opt, roots, conf=None):
+        queued = {ROOT: roots}
+
+        for id_ in _sorted_ids(self.definition['tasks']):
+            spec = self.definition['tasks'][id_]
+            queued[id_] = []
+
+            if not _matched(opt, spec['when']):
+                continue
+
+            keys = list(spec['foreach'].keys())
+            combinations = [
+                dict(zip(keys, values)) for values in itertools.product(*spec['foreach'].values())
+            ]
+
+            for upstream_id, when in spec['after']:
+                if not _matched(opt, when):
+                    continue
+
+                for upstream in queued[upstream_id]:
+                    for kwargs in combinations:
+                        task = self.node(self.classes[spec['task']], upstream, kwargs, conf)
+                        if task not in queued[id_]:
+                            queued[id_].append(task)
+
+        return queued
+
+
+def run(name, opt, assets):
+    compiler = Compiler(load_definition(name))
+    init_options(opt, compiler.steps)
+
+    conf = opt.pop('--conf')
+
+    annotations = assets[opt['--reference']]
+    if opt['--annotation']:
+        annotations = {k: v for k, v in annotations.items() if k == opt['--annotation']}
+
+    roots = []
+    for k, v in annotations.items():
+        opt_ = deepcopy(opt)
+        opt_.update(v)
+        roots.append(DictWrapperTask(opt_, output_dir=k, annotation=k))
+
+    compiler.compile(opt, roots, conf=conf)
+
+    # NOTE: References are registered before any consumer can finish
+    if opt['--clean'] and not opt['--dry-run']:
+        retention = Retention(load_policy(opt['--retention']))
+        retention.register(Task.instances)
+        export_state_dir(retention.state_dir)
+
+    Task.run_all_tasks()
+    EndTask(Task.instances).run()
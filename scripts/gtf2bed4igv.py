@@ -14,17 +14,13 @@ Options:
 
 
 import os
-from functools import partial
+import sys
+import gzip
+import heapq
+import tempfile
 
 from docopt import docopt
 import numpy as np
-import pandas as pd
-from gtfparse import read_gtf
-
-
-def pack_name(id: pd.Series, feature_name: pd.Series, biotype: pd.Series):
-    name_packed = "ID=" + id + ";Name=" + feature_name + ";BioType=" + biotype
-    return name_packed
 
 
 colors_gene = {'+': '128,0,0',
@@ -37,120 +33,247 @@ colors_transcript = {'+': '205,0,0',
 
 ITEM_COLORS = {'gene': colors_gene, 'transcript': colors_transcript}
 
+# NOTE: As gtfparse, optional attributes are 'unknown' if missing in the whole GTF
+#       and empty if missing in a record; placeholders are resolved on output
+OPTIONAL_ATTRIBUTES = ['transcript_name', 'gene_type', 'transcript_type']
+PLACEHOLDERS = {a: chr(1 + i) for i, a in enumerate(OPTIONAL_ATTRIBUTES)}
+
+# NOTE: Records sorted in memory before spilled to a run
+RUN_SIZE = 1 << 16
+
 
 def assign_color(strand, feature):
     return ITEM_COLORS[feature][strand]
 
 
+def pack_name(id, feature_name, biotype):
+    name_packed = "ID=" + id + ";Name=" + feature_name + ";BioType=" + biotype
+    return name_packed
+
+
+def parse_attributes(text):
+    # NOTE: Same as gtfparse; repeated attributes are joined by ','
+    attrs = {}
+
+    for kv in text.replace(';"', '"').replace(";-", "-").split(';'):
+        parts = kv.strip().split(' ', 2)[:2]
+        if len(parts) != 2:
+            continue
+
+        key, value = parts
+        if value.startswith('"'):
+            value = value.replace('"', '')
+
+        attrs[key] = "{},{}".format(attrs[key], value) if attrs.get(key) else value
+
+    return attrs
+
+
+def parse_attribute(text, key):
+    # NOTE: Fast path of parse_attributes() for an attribute given once at the start of a pair
+    text = text.replace(';"', '"').replace(";-", "-")
+    token = key + ' '
+
+    i = text.find(token)
+    if i < 0 or text.find(token, -~i) >= 0 or text[:i].rstrip()[-1:] not in ['', ';']:
+        return parse_attributes(text).get(key)
+
+    return parse_attributes(text[i:].split(';', 1)[0]).get(key)
+
+
+def read_records(path):
+    # NOTE: Same as read_csv of gtfparse; '#' starts a comment anywhere
+    open_ = gzip.open if path.endswith('.gz') else open
+
+    with open_(path, 'rt') as f:
+        for line in f:
+            line = line.rstrip('\n').split('#', 1)[0]
+
+            fields = line.split('\t')
+            if '\t ' in line or line.startswith(' '):
+                fields = [c.lstrip(' ') for c in fields]
+
+            if len(fields) < 9:
+                continue
+
+            yield fields
+
+
+class Block:
+    # NOTE: Records of a run of lines on the same sequence;
+    #       exons are joined with transcripts of the same block
+    def __init__(self, chr_):
+        self.chr = chr_
+        self.genes = []
+        self.transcripts = []
+        self.exon_ids = []
+        self.exon_starts = []
+        self.exon_ends = []
+
+    def records(self):
+        for seq, start, end, name, strand in self.genes:
+            yield (self.chr, start - 1, name, end, 0, seq), "\t".join([
+                self.chr, str(start - 1), str(end), name, '0', strand,
+                str(start - 1), str(end), assign_color(strand, 'gene'),
+                '1', "{},".format(end - start + 1), '0,'
+            ])
+
+        yield from self._transcript_records()
+
+    def _transcript_records(self):
+        if not self.transcripts:
+            return
+
+        index = {}
+        for r in self.transcripts:
+            index.setdefault(r[1], len(index))
+
+        row_tx = np.array([index[r[1]] for r in self.transcripts], dtype=np.int64)
+        row_start = np.array([r[2] for r in self.transcripts], dtype=np.int64)
+
+        ex_tx = np.array([index.get(t, -1) for t in self.exon_ids], dtype=np.int64)
+        keep = ex_tx >= 0
+        ex_tx = ex_tx[keep]
+        ex_start = np.array(self.exon_starts, dtype=np.int64)[keep]
+        ex_end = np.array(self.exon_ends, dtype=np.int64)[keep]
+
+        # NOTE: Every exon is paired with every transcript record of the same ID (inner join)
+        n_rows = np.bincount(row_tx, minlength=len(index))
+        row_order = np.argsort(row_tx, kind='stable')
+        row_first = np.cumsum(n_rows) - n_rows
+
+        reps = n_rows[ex_tx]
+        p_exon = np.repeat(np.arange(len(ex_tx)), reps)
+        offsets = np.arange(len(p_exon)) - np.repeat(np.cumsum(reps) - reps, reps)
+        p_row = row_order[row_first[ex_tx[p_exon]] + offsets]
+        p_tx = ex_tx[p_exon]
+
+        # NOTE: Blocks ordered by start; lexsort is stable for the ties
+        order = np.lexsort((ex_start[p_exon], p_tx))
+        sizes = (ex_end - ex_start + 1)[p_exon][order].tolist()
+        rel_starts = (ex_start[p_exon] - row_start[p_row])[order].tolist()
+        bounds = np.searchsorted(p_tx[order], np.arange(len(index) + 1)).tolist()
+
+        blocks = {}
+        for seq, tx_id, start, end, name, strand in self.transcripts:
+            i = index[tx_id]
+            lo, hi = bounds[i], bounds[-~i]
+
+            if lo == hi:
+                sys.stderr.write("No exons of transcript: {}\n".format(tx_id))
+                continue
+
+            if i not in blocks:
+                blocks[i] = (
+                    str(hi - lo),
+                    ",".join(map(str, sizes[lo:hi])) + ",",
+                    ",".join(map(str, rel_starts[lo:hi])) + ","
+                )
+
+            yield (self.chr, start - 1, name, end, 1, seq), "\t".join([
+                self.chr, str(start - 1), str(end), name, '0', strand,
+                str(start - 1), str(end), assign_color(strand, 'transcript'),
+                *blocks[i]
+            ])
+
+
+def _spill(records, dir_):
+    records.sort(key=lambda r: r[0])
+
+    f = tempfile.NamedTemporaryFile('w', dir=dir_, suffix='.run', delete=False)
+    with f:
+        f.writelines("{}\t{}\t{}\n".format(line, key[4], key[5]) for key, line in records)
+
+    records.clear()
+    return f.name
+
+
+def _read_run(path):
+    with open(path) as f:
+        for line in f:
+            c = line.rstrip('\n').split('\t')
+            yield (c[0], int(c[1]), c[3], int(c[2]), int(c[12]), int(c[13])), "\t".join(c[:12])
+
+
+def convert(gtf_path, output_path, tx_only=False):
+    # NOTE: One pass over the GTF; sorted runs are spilled to temporary files
+    #       and merged, so memory is bounded by a run and a block
+    seen = set()
+    runs = []
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as tmp:
+        records = []
+        block = None
+
+        def _flush(block):
+            if block is None:
+                return
+
+            records.extend(block.records())
+            if len(records) >= RUN_SIZE:
+                runs.append(_spill(records, tmp))
+
+        for seq, fields in enumerate(read_records(gtf_path)):
+            chr_, feature, strand = fields[0], fields[2], fields[6]
+
+            if feature not in ['gene', 'transcript', 'exon']:
+                # NOTE: Attributes of any feature make the columns of gtfparse
+                if len(seen) < len(OPTIONAL_ATTRIBUTES):
+                    seen.update(a for a in OPTIONAL_ATTRIBUTES if a + ' ' in fields[8])
+                continue
+
+            if block is None or block.chr != chr_:
+                _flush(block)
+                block = Block(chr_)
+
+            if feature == 'exon':
+                if len(seen) < len(OPTIONAL_ATTRIBUTES):
+                    seen.update(a for a in OPTIONAL_ATTRIBUTES if a + ' ' in fields[8])
+
+                block.exon_ids.append(parse_attribute(fields[8], 'transcript_id') or '')
+                block.exon_starts.append(int(fields[3]))
+                block.exon_ends.append(int(fields[4]))
+                continue
+
+            attrs = parse_attributes(fields[8])
+            seen.update(a for a in OPTIONAL_ATTRIBUTES if a in attrs)
+
+            def _attr(key):
+                return attrs.get(key, PLACEHOLDERS.get(key, ''))
+
+            if feature == 'gene' and not tx_only:
+                block.genes.append((
+                    seq, int(fields[3]), int(fields[4]),
+                    pack_name(_attr('gene_id'), _attr('gene_name'), _attr('gene_type')), strand
+                ))
+            elif feature == 'transcript':
+                block.transcripts.append((
+                    seq, _attr('transcript_id'), int(fields[3]), int(fields[4]),
+                    pack_name(_attr('transcript_id'), _attr('transcript_name'), _attr('transcript_type')),
+                    strand
+                ))
+
+        _flush(block)
+        if records:
+            runs.append(_spill(records, tmp))
+
+        table = str.maketrans({
+            c: '' if a in seen else 'unknown' for a, c in PLACEHOLDERS.items()
+        })
+
+        with open(output_path, 'w') as f:
+            # FIXME: Some tools did not work correctly
+            #        if the following tags are exists;
+            # f.write("#gffTags\n")
+            for _, line in heapq.merge(*[_read_run(r) for r in runs], key=lambda r: r[0]):
+                f.write(line.translate(table) + "\n")
+
+
 def main():
     options = docopt(__doc__)
     gtf_path = options['<gtf>']
     tx_only = options['--tx-only']
 
-    gtf_df = read_gtf(gtf_path)
-    gtf_df.strand = gtf_df.strand.replace('nan', '.')
-    # gtf_df.columns
-    # Index(['seqname', 'source', 'feature', 'start', 'end', 'score', 'strand',
-    #        'frame', 'havana_gene', 'gene_id', 'tag', 'index', 'gene_type', 'level',
-    #        'gene_name', 'transcript_id', 'transcript_name', 'havana_transcript',
-    #        'ont', 'transcript_type', 'exon_id', 'exon_number',
-    #        'transcript_support_level', 'protein_id', 'ccdsid'],
-    #       dtype='object')
-
-    optional_columns = ['transcript_name', 'gene_type', 'transcript_type']
-    for c in optional_columns:
-        if c not in gtf_df.columns:
-            gtf_df[c] = 'unknown'
-
-    features = ['gene', 'transcript', 'exon']
-
-    gtf_dfs = {}
-    for f in features:
-        gtf_dfs[f] = gtf_df.query("feature == '{}'".format(f))
-
-    bed_dfs = {}
-    # NOTE: bed_columns
-    # 'chr', 'start', 'end', 'name', 'score', 'strand',
-    # 'thick_start', 'thick_end', 'block_count', 'block_sizes', 'block_starts'
-
-    if not tx_only:
-        # Gene record
-        feature = 'gene'
-        assign_color_ = partial(assign_color, feature=feature)
-        gtf_df = gtf_dfs[feature]
-        zeros_ = np.zeros(len(gtf_df.index)).astype(int)
-        starts_ = gtf_df.start - 1
-        ends_ = gtf_df.end
-        bed_df = pd.DataFrame({
-            'chr': gtf_df.seqname,
-            'start': starts_,
-            'end': ends_,
-            'name': pack_name(gtf_df.gene_id, gtf_df.gene_name, gtf_df.gene_type),
-            'score': zeros_,
-            'strand': gtf_df.strand,
-            'thick_start': starts_,
-            'thick_end': ends_,
-            'item_rgb': gtf_df.strand.apply(assign_color_),
-            'block_count': np.ones(len(gtf_df.index)),
-            'block_sizes': (gtf_df.end - gtf_df.start + 1).astype(str) + ',',
-            'block_starts': pd.Series(zeros_).astype(str).values + ','})
-
-        bed_dfs['gene'] = bed_df
-
-    # Exon record
-    gtf_df = gtf_dfs['exon'].copy()
-
-    optional_columns = ['exon_id']
-    for c in optional_columns:
-        if c not in gtf_df.columns:
-            gtf_df[c] = np.array(range(len(gtf_df)), dtype=np.unicode)
-
-    gtf_df['size'] = gtf_df.end - gtf_df.start + 1
-    columns_ = ['transcript_id', 'start', 'end']
-    outer_df = gtf_df
-    inner_df = gtf_dfs['transcript'].filter(columns_)
-    gtf_df = pd.merge(outer_df, inner_df, on='transcript_id', left_index=True)
-    gtf_df['rel_start'] = gtf_df.start_x - gtf_df.start_y
-    gtf_df = gtf_df.sort_values(['transcript_id', 'start_x'])
-    gtf_df['size'] = gtf_df['size'].astype(str)
-    gtf_df['rel_start'] = gtf_df['rel_start'].astype(str)
-
-    sizes_ = gtf_df.groupby('transcript_id')['size'].apply(lambda x: ','.join(x))
-    rel_starts_ = gtf_df.groupby('transcript_id')['rel_start'].apply(lambda x: ','.join(x))
-    counts_ = gtf_df.groupby('transcript_id')['exon_id'].count().rename(columns={'exon_id': 'count'})
-
-    # Transcript record
-    feature = 'transcript'
-    assign_color_ = partial(assign_color, feature=feature)
-    gtf_df = gtf_dfs[feature].copy()
-    zeros_ = np.zeros(len(gtf_df.index)).astype(int)
-    starts_ = gtf_df.start - 1
-    ends_ = gtf_df.end
-
-    bed_df = pd.DataFrame({
-        'chr': gtf_df.seqname,
-        'start': starts_,
-        'end': ends_,
-        'name': pack_name(gtf_df.transcript_id,
-                          gtf_df.transcript_name,
-                          gtf_df.transcript_type),
-        'score': zeros_,
-        'strand': gtf_df.strand,
-        'thick_start': starts_,
-        'thick_end': ends_,
-        'item_rgb': gtf_df.strand.apply(assign_color_)}).reset_index(drop=True)
-
-    bed_df = [bed_df, pd.DataFrame({
-        'block_count': counts_[gtf_df.transcript_id].astype(str),
-        'block_sizes': (sizes_[gtf_df.transcript_id].astype(str) + ','),
-        'block_starts': (rel_starts_[gtf_df.transcript_id].astype(str) + ',')}).reset_index(drop=True)]
-
-    bed_df = pd.concat(bed_df, axis=1)
-    bed_dfs['transcript'] = bed_df
-
-    bed_df_merged = pd.concat(bed_dfs.values())
-    bed_df_merged = bed_df_merged.sort_values(['chr', 'start', 'name', 'end'])
-
     output_dir = os.path.dirname(gtf_path)
     if output_dir == '':
         output_dir = '.'
@@ -158,14 +281,7 @@ def main():
     gtf_root, _ = os.path.splitext(os.path.basename(gtf_path))
     output_path = os.path.join(output_dir, "{}.bed".format(gtf_root))
 
-    for c in ['score', 'thick_start', 'thick_end', 'block_count']:
-        bed_df_merged[c] = bed_df_merged[c].astype(int)
-
-    with open(output_path, 'w') as f:
-        # FIXME: Some tools did not work correctly
-        #        if the following tags are exists;
-        # f.write("#gffTags\n")
-        bed_df_merged.to_csv(f, sep="\t", header=False, index=False)
+    convert(gtf_path, output_path, tx_only=tx_only)
 
 
 if __name__ == '__main__':
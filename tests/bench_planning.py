@@ -0,0 +1,94 @@
+#! /usr/bin/env python3
+
+"""
+Benchmark for planning the fullset workflow (DAG construction and input/output resolution)
+
+Usage:
+    bench_planning.py [--samples <N>] [--layout <TYPE>]
+
+Options:
+    --samples <N>    : Number of samples [default: 5000]
+    --layout <TYPE>  : Library layout (sr/pe) [default: pe]
+
+"""
+
+import os
+import time
+import logging
+import tempfile
+
+from docopt import docopt
+
+import rnaseqde.workflow.compiler as compiler
+
+
+def _opt(n_samples, layout):
+    samples = ["S{:05d}".format(i) for i in range(n_samples)]
+    fastq1s = ["/data/{}_R1.fastq.gz".format(s) for s in samples]
+    fastq2s = ["/data/{}_R2.fastq.gz".format(s) for s in samples]
+    fastqs = fastq1s if layout == 'sr' else [f for p in zip(fastq1s, fastq2s) for f in p]
+
+    return {
+        '--workflow': 'fullset',
+        '--conf': None,
+        '--layout': layout,
+        '--strandness': 'none',
+        '--hisat2-output': 'bam',
+        '--count-engine': 'native',
+        '--rsem-abundance': False,
+        '--validate-fastq': False,
+        '--reference': 'grch38',
+        '--annotation': None,
+        '--step-by-step': None,
+        '--assets': None,
+        '--resume-from': None,
+        '--cache': None,
+        '--scheduler': 'local',
+        '--samples-per-job': 1,
+        '--star-batch': None,
+        '--resources': None,
+        '--clean': False,
+        '--retention': None,
+        '--ar': None,
+        '--dry-run': True,
+        '--plan-history': 'run_metrics.tsv',
+        '--watch': False,
+        '--log-max-size': None,
+        '--log-compress': False,
+        '--log-tee': False,
+        '--poll-interval': 60.0,
+        '<sample_sheet>': 'sample_sheet.tsv',
+        '--sample': samples,
+        '--group': ['A' if i % 2 else 'B' for i in range(n_samples)],
+        '--fastq': fastqs,
+        '--fastq1': fastq1s,
+        '--fastq2': fastq2s if layout == 'pe' else []
+    }
+
+
+def _assets():
+    keys = ['gtf', 'tophat2-index', 'hisat2-index', 'star-index', 'kallisto-index',
+            'rsem-index', 'ebseq-ngvector', 'salmon-index']
+    return {
+        'grch38': {
+            a: {'--' + k: "/ref/{}/{}".format(a, k) for k in keys}
+            for a in ['gencode', 'gencode_basic', 'gencode_refseq']
+        }
+    }
+
+
+def main():
+    opt = docopt(__doc__)
+    logging.getLogger('rnaseqde').setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as d:
+        os.chdir(d)
+        start = time.perf_counter()
+        compiler.run('fullset', _opt(int(opt['--samples']), opt['--layout']), _assets())
+        elapsed = time.perf_counter() - start
+
+    print("samples: {}, elapsed: {:.2f} s".format(opt['--samples'], elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+This is test for rnaseqde.annotation
+"""
+
+import os
+import unittest
+import tempfile
+from unittest import mock
+
+import rnaseqde.annotation as annotation
+
+
+GTF = (
+    '#!genome-build test\n'
+    'chr1\tT\tgene\t1\t100\t.\t+\t.\tgene_id "G2"; gene_name "B";\n'
+    'chr1\tT\texon\t60\t100\t.\t+\t.\tgene_id "G2"; gene_name "B"; transcript_id "T1"; transcript_name "B-1";\n'
+    'chr1\tT\texon\t1\t50\t.\t+\t.\tgene_id "G2"; gene_name "B"; transcript_id "T1"; transcript_name "B-1";\n'
+    'chr1\tT\texon\t1\t80\t.\t+\t.\tgene_id "G2"; gene_name "B"; transcript_id "T2"; transcript_name "B-2";\n'
+    'chr2\tT\texon\t11\t20\t.\t-\t.\tgene_id "G1"; transcript_id "T3";\n'
+)
+
+
+class TestAnnotation(unittest.TestCase):
+    def test_products(self):
+        with tempfile.TemporaryDirectory() as d:
+            gtf = os.path.join(d, 'a.gtf')
+            with open(gtf, 'w') as f:
+                f.write(GTF)
+
+            store = annotation.Annotation(gtf)
+
+            self.assertEqual(store.t2g(), {'T1': 'G2', 'T2': 'G2', 'T3': 'G1'})
+            self.assertEqual(store.lengths(), {'T1': 91, 'T2': 80, 'T3': 10})
+            self.assertEqual(store.gene_names(), {'G2': 'B', 'G1': ''})
+            self.assertEqual(store.transcript_names(), {'T1': 'B-1', 'T2': 'B-2', 'T3': ''})
+
+            with open(store.path('bed12')) as f:
+                self.assertEqual(f.read().splitlines(), [
+                    "chr1\t0\t100\tT1\t0\t+\t0\t100\t0\t2\t50,41,\t0,59,",
+                    "chr1\t0\t80\tT2\t0\t+\t0\t80\t0\t1\t80,\t0,",
+                    "chr2\t10\t20\tT3\t0\t-\t10\t20\t0\t1\t10,\t0,"
+                ])
+
+            # NOTE: Stored next to the GTF; the following lookups do not parse it again
+            self.assertTrue(store.dir.startswith(os.path.join(d, '.rnaseqde')))
+            with mock.patch.object(annotation, 'parse') as parse:
+                self.assertEqual(annotation.Annotation(gtf).t2g()['T3'], 'G1')
+                parse.assert_not_called()
+
+    def test_content_key(self):
+        with tempfile.TemporaryDirectory() as d:
+            paths = [os.path.join(d, p) for p in ['a.gtf', 'b.gtf']]
+            for p in paths:
+                with open(p, 'w') as f:
+                    f.write(GTF)
+
+            keys = [annotation.Annotation(p, root=os.path.join(d, 'store')).key for p in paths]
+            self.assertEqual(keys[0], keys[1])
+
+            # NOTE: Empty stamps are recomputed
+            stamps = os.path.join(d, 'store', 'stamps')
+            for p in os.listdir(stamps):
+                open(os.path.join(stamps, p), 'w').close()
+
+            self.assertEqual(keys[0], annotation.Annotation(paths[0], root=os.path.join(d, 'store')).key)
+
+
+if __name__ == '__main__':
+    unittest.main()
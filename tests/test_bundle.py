@@ -0,0 +1,81 @@
+"""
+This is test for rnaseqde.bundle
+"""
+
+import os
+import unittest
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+import rnaseqde.bundle as bundle
+import rnaseqde.task.conv_stringtie2raw as conv_stringtie2raw
+
+
+class TestBundle(unittest.TestCase):
+    def test_write_load(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'count_matrix_gene.mat')
+            mat = np.array([[1.5, np.nan], [0, 1e6], [3, 4]])
+
+            bundle.write(path, ['G1', 'G2', 'G3'], ['A1', 'B1'], mat)
+            b = bundle.load(path)
+
+            self.assertEqual(b.rows, ['G1', 'G2', 'G3'])
+            self.assertEqual(b.cols, ['A1', 'B1'])
+            self.assertIsInstance(b.values, np.memmap)
+            np.testing.assert_array_equal(b.values, mat)
+            np.testing.assert_array_equal(b.column('B1'), [np.nan, 1e6, 4])
+
+            # NOTE: Column-major as R matrices
+            with open(os.path.join(path, 'values.f64'), 'rb') as f:
+                np.testing.assert_array_equal(np.frombuffer(f.read(), dtype='<f8')[:3], [1.5, 0, 3])
+
+    def test_convert(self):
+        with tempfile.TemporaryDirectory() as d:
+            tables = {
+                'count_matrix.tsv': '\t"a/A1.genes.results"\t"B1.genes.results"\n"G1"\t1.00\t2.00\n',
+                'count_matrix_gene.tsv': 'A1\tB1\nG1\t1\tNA\n',
+                'gene_count_matrix.csv': 'gene_id,A1,B1\nG1,1,2\n'
+            }
+            for name, text in tables.items():
+                path = os.path.join(d, name)
+                with open(path, 'w') as f:
+                    f.write(text)
+
+                self.assertEqual(bundle.preferred(path), path)
+                bundle.convert(path)
+                self.assertEqual(bundle.preferred(path), bundle.bundle_path(path))
+
+            b = bundle.load(os.path.join(d, 'count_matrix.mat'))
+            self.assertEqual((b.rows, b.cols), (['G1'], ['a/A1.genes.results', 'B1.genes.results']))
+
+            b = bundle.load(os.path.join(d, 'count_matrix_gene.mat'))
+            np.testing.assert_array_equal(b.values, [[1, np.nan]])
+
+            b = bundle.load(os.path.join(d, 'gene_count_matrix.mat'))
+            self.assertEqual(b.cols, ['A1', 'B1'])
+
+    def test_failed_legacy(self):
+        with tempfile.TemporaryDirectory() as d:
+            # NOTE: Left by a failed prepDE.py
+            path = os.path.join(d, 'gene_count_matrix.csv')
+            with open(path, 'w') as f:
+                f.write('gene_id,A1\n')
+
+            argv = [
+                'conv_stringtie2raw', '--count-engine', 'legacy', '--output-dir', d,
+                '--sample', 'A1', '--quantified-gtf', os.path.join(d, 'A1.gtf')
+            ]
+            with mock.patch('sys.argv', argv), \
+                    mock.patch('rnaseqde.utils.run_command', return_value=mock.Mock(returncode=1)):
+                with self.assertRaises(SystemExit) as e:
+                    conv_stringtie2raw.main()
+
+            self.assertEqual(e.exception.code, 1)
+            self.assertEqual(bundle.preferred(path), path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+This is test for rnaseqde.cache
+"""
+
+import os
+import time
+import unittest
+import tempfile
+
+from rnaseqde.cache import TaskCache, file_identity, digest
+
+
+class TestCache(unittest.TestCase):
+    def test_file_identity(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'ref.fa')
+            with open(path, 'w') as f:
+                f.write('>chr1\nACGT\n')
+
+            self.assertEqual(file_identity(path), file_identity(path))
+            self.assertEqual(4 + 7, file_identity(path, checksum=True)[0])
+
+            # NOTE: Index prefixes are identified by their members
+            self.assertEqual('ref.fa', file_identity(os.path.join(d, 'ref'))[0][0])
+            self.assertIsNone(file_identity(os.path.join(d, 'missing')))
+
+    def test_lookup(self):
+        with tempfile.TemporaryDirectory() as d:
+            manifest = os.path.join(d, 'cache.json')
+            output = os.path.join(d, 'out.tsv')
+            marker = os.path.join(d, '.completed')
+            key = digest({'task': 'quant', 'command': 'quant in.fq'})
+
+            cache = TaskCache(path=manifest)
+            self.assertFalse(cache.lookup(key, [output], [marker]))
+
+            cache.record(key, 'quant', [output])
+            self.assertFalse(cache.lookup(key, [output], [marker]))
+
+            # NOTE: Outputs left by a failed job without its marker
+            time.sleep(0.01)
+            open(output, 'w').close()
+            self.assertFalse(TaskCache(path=manifest).lookup(key, [output], [marker]))
+
+            open(marker, 'w').close()
+            self.assertTrue(TaskCache(path=manifest).lookup(key, [output], [marker]))
+
+            os.remove(output)
+            self.assertFalse(TaskCache(path=manifest).lookup(key, [output], [marker]))
+
+
+if __name__ == '__main__':
+    unittest.main()
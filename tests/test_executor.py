@@ -0,0 +1,72 @@
+"""
+This is test for rnaseqde.executor
+"""
+
+import os
+import unittest
+import tempfile
+
+from rnaseqde.executor import LocalExecutor
+
+
+class TestExecutor(unittest.TestCase):
+    def test_hold_job_ids(self):
+        with tempfile.TemporaryDirectory() as d:
+            log = os.path.join(d, 'log.txt')
+            executor = LocalExecutor(slots=4, memory=8)
+
+            jid1 = executor.submit("sleep 0.2; echo first >> {}".format(log))
+            jid2 = executor.submit("echo second >> {}".format(log), hold_job_ids=[jid1])
+
+            self.assertNotEqual(jid1, jid2)
+            self.assertTrue(executor.wait())
+
+            with open(log) as f:
+                self.assertEqual(['first', 'second'], f.read().split())
+
+    def test_hold_array_job_ids(self):
+        with tempfile.TemporaryDirectory() as d:
+            log = os.path.join(d, 'log.txt')
+            executor = LocalExecutor(slots=4, memory=8)
+
+            jid1 = executor.submit(
+                "sleep $((2 - $RNASEQDE_TASK_ID)); echo first$RNASEQDE_TASK_ID >> {}".format(log), n_tasks=2
+            )
+            executor.submit("echo second$RNASEQDE_TASK_ID >> {}".format(log), n_tasks=2, hold_array_job_ids=[jid1])
+
+            self.assertTrue(executor.wait())
+
+            # NOTE: Element 2 does not wait for element 1 of the upstream
+            with open(log) as f:
+                lines = f.read().split()
+
+            self.assertLess(lines.index('second2'), lines.index('first1'))
+            self.assertLess(lines.index('first1'), lines.index('second1'))
+
+    def test_array_job(self):
+        with tempfile.TemporaryDirectory() as d:
+            executor = LocalExecutor(slots=2, memory=8)
+            jid = executor.submit("touch {}/$RNASEQDE_TASK_ID".format(d), n_tasks=3)
+
+            self.assertTrue(executor.wait())
+            self.assertEqual('finished', executor.status(jid))
+            self.assertEqual(['1', '2', '3'], sorted(os.listdir(d)))
+
+    def test_array_job_step(self):
+        with tempfile.TemporaryDirectory() as d:
+            executor = LocalExecutor(slots=2, memory=8)
+            executor.submit("touch {}/$RNASEQDE_TASK_ID-$RNASEQDE_TASK_STEPSIZE".format(d), n_tasks=5, step=2)
+
+            self.assertTrue(executor.wait())
+            self.assertEqual(['1-2', '3-2', '5-2'], sorted(os.listdir(d)))
+
+    def test_failed_job(self):
+        executor = LocalExecutor(slots=1)
+        jid = executor.submit("exit 3")
+
+        self.assertFalse(executor.wait())
+        self.assertEqual('failed', executor.status(jid))
+
+
+if __name__ == '__main__':
+    unittest.main()
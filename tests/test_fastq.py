@@ -0,0 +1,70 @@
+"""
+This is test for rnaseqde.fastq
+"""
+
+import os
+import gzip
+import unittest
+import tempfile
+from unittest import mock
+
+import rnaseqde.fastq as fastq
+
+
+def _reads(n, name='r'):
+    return "".join("@{}{}\nACGT\n+\nIIII\n".format(name, i) for i in range(n)).encode()
+
+
+class TestFastq(unittest.TestCase):
+    def test_inspect(self):
+        with tempfile.TemporaryDirectory() as d:
+            paths = {k: os.path.join(d, k) for k in ['ok.fq.gz', 'plain.fq', 'truncated.fq.gz', 'odd.fq']}
+
+            with gzip.open(paths['ok.fq.gz'], 'wb') as f:
+                f.write(_reads(1000))
+            with open(paths['plain.fq'], 'wb') as f:
+                f.write(_reads(3).rstrip(b'\n'))
+            with open(paths['ok.fq.gz'], 'rb') as f, open(paths['truncated.fq.gz'], 'wb') as g:
+                g.write(f.read()[:-20])
+            with open(paths['odd.fq'], 'wb') as f:
+                f.write(_reads(2) + b"@r\nACGT\n")
+
+            self.assertEqual(fastq.inspect(paths['ok.fq.gz']), {'reads': 1000, 'error': None})
+            self.assertEqual(fastq.inspect(paths['plain.fq'], chunk_size=7), {'reads': 3, 'error': None})
+            self.assertIn('EOFError', fastq.inspect(paths['truncated.fq.gz'])['error'])
+            self.assertIn('multiple of 4', fastq.inspect(paths['odd.fq'])['error'])
+
+    def test_validate(self):
+        with tempfile.TemporaryDirectory() as d:
+            pairs = []
+            for s, n2 in [('A1', 5), ('B1', 4)]:
+                pair = (os.path.join(d, s + '_1.fq.gz'), os.path.join(d, s + '_2.fq.gz'))
+                for p, n in zip(pair, [5, n2]):
+                    with gzip.open(p, 'wb') as f:
+                        f.write(_reads(n))
+                pairs.append(pair)
+
+            cache = os.path.join(d, 'fastq.json')
+            errors = fastq.FastqValidator(cache, threads=2).validate([], pairs=pairs)
+
+            self.assertEqual(len(errors), 1)
+            self.assertIn('B1_1.fq.gz', errors[0])
+
+            # NOTE: Unchanged files are not read again
+            with mock.patch.object(fastq, 'inspect') as inspect:
+                self.assertEqual(fastq.FastqValidator(cache, threads=1).validate([], pairs=pairs[:1]), [])
+                inspect.assert_not_called()
+
+            # NOTE: Transient errors of the storage are not cached
+            path = os.path.join(d, 'C1.fq.gz')
+            with gzip.open(path, 'wb') as f:
+                f.write(_reads(5))
+
+            with mock.patch('gzip.open', side_effect=OSError(5, 'Input/output error')):
+                self.assertIn('Input/output error', fastq.FastqValidator(cache, threads=1).validate([path])[0])
+
+            self.assertEqual(fastq.FastqValidator(cache, threads=1).validate([path]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+This is test for scripts/gtf2bed4igv.py
+"""
+
+import os
+import sys
+import unittest
+import tempfile
+from unittest import mock
+
+import rnaseqde.utils as utils
+
+sys.path.insert(0, utils.from_root('scripts'))
+import gtf2bed4igv  # noqa: E402
+
+
+GTF = (
+    '##format: gtf\n'
+    'chr2\tT\tgene\t100\t900\t.\t-\t.\tgene_id "G2"; gene_type "lncRNA"; gene_name "B";\n'
+    'chr2\tT\ttranscript\t100\t900\t.\t-\t.\tgene_id "G2"; transcript_id "T3"; gene_type "lncRNA"; gene_name "B"; transcript_name "B-1";\n'
+    'chr2\tT\texon\t700\t900\t.\t-\t.\tgene_id "G2"; transcript_id "T3"; gene_name "B"; exon_number 1;\n'
+    'chr2\tT\texon\t100\t200\t.\t-\t.\tgene_id "G2"; transcript_id "T3"; gene_name "B"; exon_number 2;\n'
+    'chr1\tT\tgene\t1\t500\t.\t+\t.\tgene_id "G1"; gene_type "protein_coding"; gene_name "A";\n'
+    'chr1\tT\ttranscript\t11\t500\t.\t+\t.\tgene_id "G1"; transcript_id "T1"; gene_type "protein_coding"; gene_name "A"; transcript_name "A-1";\n'
+    'chr1\tT\texon\t11\t100\t.\t+\t.\tgene_id "G1"; transcript_id "T1"; gene_name "A"; exon_number 1;\n'
+    'chr1\tT\texon\t301\t500\t.\t+\t.\tgene_id "G1"; transcript_id "T1"; gene_name "A"; exon_number 2;\n'
+    'chr1\tT\tCDS\t20\t90\t.\t+\t0\tgene_id "G1"; transcript_id "T1"; gene_name "A";\n'
+    'chr1\tT\ttranscript\t1\t400\t.\t.\t.\tgene_id "G1"; transcript_id "T2"; gene_type "protein_coding"; gene_name "A";\n'
+    'chr1\tT\texon\t1\t400\t.\t.\t.\tgene_id "G1"; transcript_id "T2"; gene_name "A"; exon_number 1;\n'
+)
+
+# NOTE: Output of the previous pandas implementation
+BED = (
+    'chr1\t0\t500\tID=G1;Name=A;BioType=protein_coding\t0\t+\t0\t500\t128,0,0\t1\t500,\t0,\n'
+    'chr1\t0\t400\tID=T2;Name=;BioType=unknown\t0\t.\t0\t400\t0,205,0\t1\t400,\t0,\n'
+    'chr1\t10\t500\tID=T1;Name=A-1;BioType=unknown\t0\t+\t10\t500\t205,0,0\t2\t90,200,\t0,290,\n'
+    'chr2\t99\t900\tID=G2;Name=B;BioType=lncRNA\t0\t-\t99\t900\t0,0,128\t1\t801,\t0,\n'
+    'chr2\t99\t900\tID=T3;Name=B-1;BioType=unknown\t0\t-\t99\t900\t0,0,205\t2\t101,201,\t0,600,\n'
+)
+
+
+class TestGtf2bed4igv(unittest.TestCase):
+    def test_convert(self):
+        with tempfile.TemporaryDirectory() as d:
+            gtf = os.path.join(d, 'a.gtf')
+            with open(gtf, 'w') as f:
+                f.write(GTF)
+
+            # NOTE: Spilled runs are merged in the same order
+            for run_size in [gtf2bed4igv.RUN_SIZE, 1]:
+                with mock.patch.object(gtf2bed4igv, 'RUN_SIZE', run_size):
+                    gtf2bed4igv.convert(gtf, os.path.join(d, 'a.bed'))
+
+                with open(os.path.join(d, 'a.bed')) as f:
+                    self.assertEqual(f.read(), BED)
+
+    def test_tx_only(self):
+        with tempfile.TemporaryDirectory() as d:
+            gtf = os.path.join(d, 'a.gtf')
+            with open(gtf, 'w') as f:
+                f.write(GTF)
+
+            gtf2bed4igv.convert(gtf, os.path.join(d, 'a.bed'), tx_only=True)
+
+            with open(os.path.join(d, 'a.bed')) as f:
+                self.assertEqual(f.read(), "".join(l for l in BED.splitlines(True) if "ID=T" in l))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+This is test for rnaseqde.logsink
+"""
+
+import os
+import io
+import gzip
+import tempfile
+import unittest
+import unittest.mock
+
+import rnaseqde.logsink as logsink
+from rnaseqde.metrics import measured_run
+
+
+class TestLogSink(unittest.TestCase):
+    def test_rotate(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'stderr.log')
+
+            with logsink.LogSink(path, max_size=10 / 1024 ** 2) as sink:
+                for i in range(4):
+                    sink.write("line{:05d}\n".format(i).encode())
+
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'line00003\n')
+            with open(path + '.1', 'rb') as f:
+                self.assertEqual(f.read(), b'line00002\n')
+            with open(path + '.2', 'rb') as f:
+                self.assertEqual(f.read(), b'line00001\n')
+            self.assertFalse(os.path.exists(path + '.3'))
+
+    def test_rotate_compress(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'stderr.log')
+
+            with logsink.LogSink(path, max_size=10 / 1024 ** 2, compress=True) as sink:
+                for i in range(2):
+                    sink.write("line{:05d}\n".format(i).encode())
+
+            with gzip.open(path + '.1.gz', 'rb') as f:
+                self.assertEqual(f.read(), b'line00000\n')
+            self.assertFalse(os.path.exists(path + '.1'))
+
+    def test_streamed_run(self):
+        with tempfile.TemporaryDirectory() as d:
+            tee = io.BytesIO()
+            out = logsink.LogSink(os.path.join(d, 'stdout.log'))
+            err = logsink.LogSink(os.path.join(d, 'stderr.log'), tee=tee)
+
+            with out, err:
+                proc, _ = measured_run("echo out; echo err >&2", stdout=out, stderr=err)
+
+            self.assertEqual(proc.returncode, 0)
+            self.assertIsNone(proc.stdout)
+            with open(os.path.join(d, 'stdout.log'), 'rb') as f:
+                self.assertEqual(f.read(), b'out\n')
+            self.assertEqual(tee.getvalue(), b'err\n')
+
+    def test_from_env(self):
+        env = {logsink.ENV_MAX_SIZE: '1.5', logsink.ENV_COMPRESS: '1'}
+
+        with tempfile.TemporaryDirectory() as d, unittest.mock.patch.dict(os.environ, env):
+            with logsink.LogSink.from_env(os.path.join(d, 'stdout.log'), tee=io.BytesIO()) as sink:
+                self.assertEqual(sink.max_bytes, int(1.5 * 1024 ** 2))
+                self.assertTrue(sink.compress)
+                self.assertIsNone(sink.tee)
+
+
+if __name__ == '__main__':
+    unittest.main()
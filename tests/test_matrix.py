@@ -0,0 +1,121 @@
+"""
+This is test for rnaseqde.matrix
+"""
+
+import os
+import unittest
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+import rnaseqde.matrix as matrix
+import rnaseqde.bundle as bundle
+
+
+GTF = (
+    '#!genome-build test\n'
+    'chr1\tT\tgene\t1\t100\t.\t+\t.\tgene_id "G2";\n'
+    'chr1\tT\texon\t1\t50\t.\t+\t.\tgene_id "G2"; transcript_id "T1";\n'
+    'chr1\tT\texon\t60\t100\t.\t+\t.\tgene_id "G2"; transcript_id "T1";\n'
+    'chr1\tT\texon\t1\t80\t.\t+\t.\tgene_id "G2"; transcript_id "T2";\n'
+    'chr2\tT\texon\t1\t80\t.\t-\t.\tgene_id "G1"; transcript_id "T3";\n'
+)
+
+
+class TestMatrix(unittest.TestCase):
+    def _write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def test_build(self):
+        with tempfile.TemporaryDirectory() as d:
+            gtf = os.path.join(d, 'a.gtf')
+            self._write(gtf, GTF)
+
+            inputs = []
+            for s, counts in [('A1', [1.5, 2, 3]), ('B1', [0, 10, 100000])]:
+                path = os.path.join(d, s, 'quant.sf')
+                self._write(path, "Name\tLength\tEffectiveLength\tTPM\tNumReads\n" + "".join(
+                    "{}\t100\t80\t1\t{}\n".format(t, c) for t, c in zip(['T1', 'T2', 'T4'], counts)))
+                inputs.append(path)
+
+            out = os.path.join(d, 'out')
+            matrix.build('salmon', inputs, gtf, output_dir=out, threads=2, annotation_dir=os.path.join(d, 'store'))
+
+            with open(os.path.join(out, 'count_matrix_transcript.tsv')) as f:
+                self.assertEqual(f.read(), "\tA1\tB1\nT1\t1.5\t0\nT2\t2\t10\nT4\t3\t100000\n")
+
+            b = bundle.load(os.path.join(out, 'count_matrix_transcript.mat'))
+            self.assertEqual((b.rows, b.cols), (['T1', 'T2', 'T4'], ['A1', 'B1']))
+            np.testing.assert_array_equal(b.values, [[1.5, 0], [2, 10], [3, 100000]])
+
+            # NOTE: T4 is missing in the GTF
+            with open(os.path.join(out, 'count_matrix_gene.tsv')) as f:
+                self.assertEqual(f.read(), "\tA1\tB1\nG2\t3.5\t10\n")
+
+    def test_stringtie(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'A1', 't_data.ctab')
+            self._write(path, (
+                "t_id\tchr\tstrand\tstart\tend\tt_name\tnum_exons\tlength\tgene_id\tgene_name\tcov\tFPKM\n"
+                "1\tchr1\t+\t1\t100\tT1\t2\t150\tG2\t.\t2.5\t1.0\n"
+            ))
+
+            ids, counts = matrix.read_counts('stringtie', path)
+
+            self.assertEqual(ids, ['T1'])
+            np.testing.assert_allclose(counts, [2.5 * 150 / 75])
+
+    def test_transcripts_differ(self):
+        with tempfile.TemporaryDirectory() as d:
+            inputs = []
+            for s, t in [('A1', 'T1'), ('B1', 'T2')]:
+                path = os.path.join(d, s, 'abundance.tsv')
+                self._write(path, "target_id\tlength\teff_length\test_counts\ttpm\n{}\t1\t1\t1\t1\n".format(t))
+                inputs.append(path)
+
+            with self.assertRaises(ValueError):
+                matrix.transcript_matrix('kallisto', inputs)
+
+    def test_tracking(self):
+        with tempfile.TemporaryDirectory() as d:
+            header = "tracking_id\tcondition\treplicate\traw_frags\tinternal_scaled_frags\tstatus\n"
+            for name, ids in [('isoforms', ['TCONS_2', 'TCONS_1']), ('genes', ['XLOC_1'])]:
+                self._write(os.path.join(d, 'cuffdiff', name + '.read_group_tracking'), header + "".join(
+                    "{}\t{}\t{}\t{}\t0\tOK\n".format(t, c, r, v)
+                    for t in ids for c, r, v in [('q2', 0, 2.5), ('q1', 1, 1), ('q1', 0, 0)]
+                    if (t, c) != ('TCONS_1', 'q2')
+                ))
+
+            out = os.path.join(d, 'out')
+            matrix.build_tracking([
+                os.path.join(d, 'cuffdiff', p) for p in ['isoforms.read_group_tracking', 'genes.read_group_tracking']
+            ], output_dir=out, threads=2)
+
+            with open(os.path.join(out, 'count_matrix_transcript.tsv')) as f:
+                self.assertEqual(f.read(), "\tq1_0\tq1_1\tq2_0\nTCONS_1\t0\t1\tNA\nTCONS_2\t0\t1\t2.5\n")
+
+            with open(os.path.join(out, 'count_matrix_gene.tsv')) as f:
+                self.assertEqual(f.read(), "\tq1_0\tq1_1\tq2_0\nXLOC_1\t0\t1\t2.5\n")
+
+            with self.assertRaises(ValueError):
+                self._write(os.path.join(d, 'dup', 'genes.read_group_tracking'), header + "X\tq1\t0\t1\t0\tOK\n" * 2)
+                matrix.tracking_matrix(os.path.join(d, 'dup', 'genes.read_group_tracking'))
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'cuffdiff', 'genes.read_group_tracking')
+            self._write(path, "tracking_id\tcondition\treplicate\traw_frags\nXLOC_1\tq1\t0\t3\n")
+
+            out = os.path.join(d, 'out')
+            with mock.patch('sys.argv', ['matrix', '--type', 'cuffdiff', '--output-dir', out, '--threads', '2', path]):
+                matrix.main()
+
+            with open(os.path.join(out, 'count_matrix_gene.tsv')) as f:
+                self.assertEqual(f.read(), "\tq1_0\nXLOC_1\t3\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+This is test for rnaseqde.metrics
+"""
+
+import os
+import unittest
+import tempfile
+
+import rnaseqde.metrics as metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def test_measured_run(self):
+        proc, metrics_ = metrics.measured_run("echo foo; echo bar >&2; exit 3")
+
+        self.assertEqual(3, proc.returncode)
+        self.assertEqual(b'foo\n', proc.stdout)
+        self.assertEqual(b'bar\n', proc.stderr)
+        self.assertEqual(3, metrics_['returncode'])
+        self.assertGreater(metrics_['max_rss_mb'], 0)
+
+    def test_collect(self):
+        with tempfile.TemporaryDirectory() as d:
+            quant_dir = os.path.join(d, 'gencode', 'quant_kallisto')
+            de_dir = os.path.join(quant_dir, 'de_sleuth')
+            os.makedirs(os.path.join(quant_dir, 'A1'))
+            os.makedirs(de_dir)
+
+            _, metrics_ = metrics.measured_run("true")
+            metrics.record(os.path.join(quant_dir, 'A1'), metrics_, task='quant_kallisto', sample='A1', cmd='foo')
+            metrics.record(os.path.join(quant_dir, 'A1'), metrics_, task='quant_kallisto', sample='A1', cmd='foo')
+            metrics.record(de_dir, metrics_, task='de_sleuth', cmd='bar')
+
+            rows = metrics.collect([('gencode', quant_dir, 1.5), ('basic', de_dir, 3.0)], input_gbs={'A1': 1.5})
+
+            expected = [('gencode', 'quant_kallisto', 'A1'), ('basic', 'de_sleuth', None)]
+            actual = [(r['annotation'], r['task'], r['sample']) for r in rows]
+            self.assertEqual(sorted(expected, key=str), sorted(actual, key=str))
+
+            path = os.path.join(d, 'run_metrics.tsv')
+            metrics.write_tsv(rows, path)
+
+            with open(path) as f:
+                self.assertEqual(metrics.COLUMNS, f.readline().rstrip("\n").split("\t"))
+
+            read = {(r['task'], r['sample']): r for r in metrics.read_tsv(path)}
+            self.assertEqual(1.5, read[('quant_kallisto', 'A1')]['input_gb'])
+            self.assertEqual(0, read[('quant_kallisto', 'A1')]['returncode'])
+            # NOTE: Runs for all samples are scaled by the total
+            self.assertEqual(3.0, read[('de_sleuth', None)]['input_gb'])
+
+
+if __name__ == '__main__':
+    unittest.main()
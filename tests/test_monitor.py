@@ -0,0 +1,62 @@
+"""
+This is test for rnaseqde.monitor
+"""
+
+import os
+import unittest
+import tempfile
+
+from rnaseqde.monitor import Monitor
+from rnaseqde.task.base import DictWrapperTask
+from rnaseqde.task.align_hisat2 import AlignHisat2Task
+
+
+class _Scheduler:
+    def __init__(self, states):
+        self.states = states
+        self.n_queries = 0
+
+    def query(self, job_ids):
+        self.n_queries += 1
+        return {j: self.states.get(j, {}) for j in job_ids}
+
+
+class TestMonitor(unittest.TestCase):
+    def test_poll(self):
+        with tempfile.TemporaryDirectory() as d:
+            dict_ = {
+                '--hisat2-index': 'foo',
+                '--layout': 'sr',
+                '--fastq': ['baz.fastq.gz', 'qax.fastq.gz']
+                }
+
+            driver = DictWrapperTask(dict_, output_dir=d)
+            task = AlignHisat2Task([driver])
+            task._job_id, task.submission, task.submitted_at = '7', ([1, 2], 1), 0.0
+
+            scheduler = _Scheduler({'7': {2: 'running'}})
+            monitor = Monitor([driver, task], scheduler, interval=3600, path=os.path.join(d, 'status.tsv'))
+
+            task.mark_completed('baz.fastq.gz')
+            self.assertTrue(monitor.poll())
+            self.assertFalse(monitor.poll())
+            self.assertEqual(1, scheduler.n_queries)
+
+            label = task.output_dir
+            self.assertEqual('finished', monitor.table[(label, 1)])
+            self.assertEqual('running', monitor.table[(label, 2)])
+            self.assertFalse(monitor.done)
+
+            # NOTE: Left the queue without its marker
+            scheduler.states = {}
+            monitor.poll(force=True)
+
+            self.assertTrue(monitor.done)
+            self.assertEqual([(label, 2)], monitor.failed)
+
+            with open(os.path.join(d, 'status.tsv')) as f:
+                self.assertEqual(3, len(f.readlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
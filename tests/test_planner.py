@@ -0,0 +1,102 @@
+"""
+This is test for rnaseqde.planner
+"""
+
+import os
+import unittest
+import tempfile
+
+from rnaseqde.planner import Planner, History
+from rnaseqde.task.base import DictWrapperTask
+from rnaseqde.task.align_hisat2 import AlignHisat2Task
+from rnaseqde.task.conv_sam2bam import ConvSamToBamTask
+from rnaseqde.task.de_cuffdiff import DeCuffdiffTask
+
+
+class TestPlanner(unittest.TestCase):
+    def _tasks(self, d):
+        fastqs = []
+        for s, gb in [('A1', 1), ('B1', 2)]:
+            path = os.path.join(d, "{}.fastq.gz".format(s))
+            with open(path, 'wb') as f:
+                f.truncate(gb << 30)
+            fastqs.append(path)
+
+        dict_ = {
+            '--hisat2-index': 'foo',
+            '--layout': 'sr',
+            '--hisat2-output': 'sam',
+            '--sample': ['A1', 'B1'],
+            '--fastq': fastqs,
+            '--fastq1': fastqs,
+            '--fastq2': []
+            }
+
+        driver = DictWrapperTask(dict_, output_dir='tmp', annotation='gencode')
+        aligned = AlignHisat2Task([driver])
+        converted = ConvSamToBamTask([aligned])
+
+        for t in [aligned, converted]:
+            t.submission = ([1, 2], 1)
+
+        return [driver, aligned, converted]
+
+    def test_default(self):
+        with tempfile.TemporaryDirectory() as d:
+            rows = Planner(self._tasks(d)).plan()
+
+            aligned, converted = rows
+            self.assertEqual(('default', 2, 'intermediate'), (aligned['source'], aligned['jobs'], aligned['disk']))
+            self.assertEqual(0.5, aligned['wall_hours'])
+            self.assertEqual(12.0, aligned['disk_gb'])
+
+            # NOTE: Sorting of each sample follows its own alignment
+            self.assertEqual('final', converted['disk'])
+            self.assertEqual(round(0.5 + 10 / 60, 2), converted['finish_hours'])
+
+    def test_history(self):
+        rows = [
+            {'annotation': 'gencode', 'task': 'align_hisat2', 'sample': 'X1', 'returncode': 0,
+             'wall_s': 3600.0, 'user_s': 7000.0, 'sys_s': 200.0, 'max_rss_mb': 8192.0, 'write_mb': 2048.0, 'input_gb': 2.0},
+            {'annotation': 'gencode', 'task': 'align_hisat2', 'sample': None, 'returncode': 0,
+             'wall_s': 100000.0, 'user_s': 0.0, 'sys_s': 0.0, 'max_rss_mb': 0.0, 'write_mb': 0.0, 'input_gb': None},
+            {'annotation': 'gencode', 'task': 'align_hisat2', 'sample': 'X2', 'returncode': 1,
+             'wall_s': 100000.0, 'user_s': 0.0, 'sys_s': 0.0, 'max_rss_mb': 0.0, 'write_mb': 0.0, 'input_gb': 1.0}
+        ]
+
+        with tempfile.TemporaryDirectory() as d:
+            plan = Planner(self._tasks(d), History(rows)).plan()
+
+        aligned = plan[0]
+        self.assertEqual('history', aligned['source'])
+
+        # NOTE: 1800 s/GiB by the successful run; the run without a sample and the failed one are ignored
+        self.assertEqual(1.0, aligned['wall_hours'])
+        self.assertEqual(3.0, aligned['cpu_hours'])
+        self.assertEqual(3.0, aligned['disk_gb'])
+        self.assertEqual(8.0, aligned['peak_rss_gb'])
+
+        summary = Planner.summary(plan)
+        self.assertEqual(4, summary['jobs'])
+        self.assertEqual(3.0, summary['intermediate_disk_gb'])
+
+    def test_per_run(self):
+        rows = [
+            {'annotation': 'gencode', 'task': 'de_cuffdiff', 'sample': None, 'returncode': 0,
+             'wall_s': 36000.0, 'user_s': 0.0, 'sys_s': 0.0, 'max_rss_mb': 0.0, 'write_mb': 0.0, 'input_gb': 30.0}
+        ]
+
+        with tempfile.TemporaryDirectory() as d:
+            tasks = self._tasks(d)
+            tasks.append(DeCuffdiffTask([tasks[-1]]))
+
+            default = Planner(tasks).plan()[-1]
+            history = Planner(tasks, History(rows)).plan()[-1]
+
+        # NOTE: Tasks run once for all samples are scaled by the samples (3 GiB of 2 samples)
+        self.assertEqual(round((10 + 0.5 * 2) / 60, 2), default['wall_hours'])
+        self.assertEqual(1.0, history['wall_hours'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+This is test for rnaseqde.resource
+"""
+
+import os
+import unittest
+import tempfile
+
+from rnaseqde.resource import Resources, load_rules, sample_gb
+import rnaseqde.utils as utils
+
+
+class TestResource(unittest.TestCase):
+    def test_from_header(self):
+        script = utils.from_root('rnaseqde/task/align_star.py')
+
+        expected = Resources(slots=2, memory=32.0, pe='def_slot')
+        actual = Resources.from_header(script)
+
+        self.assertEqual(expected, actual)
+        self.assertEqual(64.0, actual.total_memory)
+
+    def test_updated(self):
+        rule = {'memory': 2, 'memory_per_gb': 1.5, 'max_memory': 8}
+
+        self.assertEqual(5, Resources(memory=16).updated(rule, input_gb=2.0).memory)
+        self.assertEqual(8, Resources(memory=16).updated(rule, input_gb=10.0).memory)
+        self.assertEqual(4, Resources(memory=16).updated({'slots': 4}).slots)
+
+    def test_load_rules(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'resources.yml')
+
+            with open(path, 'w') as f:
+                f.write("quant_stringtie:\n  max_memory: 64\n")
+
+            rules = load_rules(path)
+            self.assertEqual(64, rules['quant_stringtie']['max_memory'])
+            self.assertIn('memory_per_gb', rules['quant_stringtie'])
+
+            with open(path, 'w') as f:
+                f.write("quant_stringtie:\n  vmem: 64\n")
+
+            with self.assertRaises(ValueError):
+                load_rules(path)
+
+    def test_sample_gb(self):
+        with tempfile.TemporaryDirectory() as d:
+            paths = [os.path.join(d, "{}.fastq.gz".format(i)) for i in range(3)]
+
+            for i, p in enumerate(paths):
+                with open(p, 'wb') as f:
+                    f.write(b'\0' * 1024 * (i + 1))
+
+            self.assertAlmostEqual(5 * 1024 / 1024 ** 3, sample_gb(paths[:2], paths[1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+This is test for rnaseqde.retention
+"""
+
+import os
+import gzip
+import unittest
+import tempfile
+from unittest import mock
+
+import rnaseqde.retention as retention
+from rnaseqde.task.base import DictWrapperTask
+from rnaseqde.task.align_star import AlignStarTask
+from rnaseqde.task.quant_rsem import QuantRsemTask
+
+
+POLICY = {'align_star': {'--transcript-bam': 'delete', '--bam': 'keep', 'Unmapped.out.mate?': 'compress'}}
+
+
+class TestRetention(unittest.TestCase):
+    def test_load_policy(self):
+        self.assertEqual('delete', retention.load_policy()['align_star']['--transcript-bam'])
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'retention.yml')
+            with open(path, 'w') as f:
+                f.write("align_star:\n  --transcript-bam: remove\n")
+
+            with self.assertRaisesRegex(ValueError, 'Unknown retention action'):
+                retention.load_policy(path)
+
+    def test_release(self):
+        with tempfile.TemporaryDirectory() as d:
+            dict_ = {
+                '--star-index': 'foo',
+                '--rsem-index': 'bar',
+                '--gtf': 'baz.gtf',
+                '--layout': 'sr',
+                '--sample': ['A1', 'B1'],
+                '--fastq': ['A1.fastq.gz', 'B1.fastq.gz']
+                }
+
+            star = AlignStarTask([DictWrapperTask(dict_, output_dir=os.path.join(d, 'gencode'))])
+            rsems = [QuantRsemTask([star]), QuantRsemTask([star], output_dir=os.path.join(d, 'rsem'))]
+
+            bams = star.outputs['--transcript-bam']
+            for p in bams + [os.path.join(star.suboutput_dir('A1'), 'Unmapped.out.mate1')]:
+                os.makedirs(os.path.dirname(p), exist_ok=True)
+                with open(p, 'w') as f:
+                    f.write("reads\n")
+
+            state_dir = os.path.join(d, 'retention')
+            references = retention.Retention(POLICY, state_dir).register([star] + rsems)
+            self.assertEqual(sorted(bams), sorted(references))
+
+            with mock.patch.dict(os.environ, {retention.ENV_STATE_DIR: state_dir}):
+                # NOTE: Files not consumed by any task are cleaned with the sample
+                star.mark_completed('A1')
+                with gzip.open(os.path.join(star.suboutput_dir('A1'), 'Unmapped.out.mate1.gz'), 'rt') as f:
+                    self.assertEqual("reads\n", f.read())
+
+                # NOTE: Deleted once both RSEM runs of the sample succeeded
+                rsems[0].mark_completed(bams[0])
+                self.assertTrue(os.path.exists(bams[0]))
+
+                rsems[1].mark_completed(bams[0])
+                self.assertFalse(os.path.exists(bams[0]))
+                self.assertTrue(os.path.exists(bams[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
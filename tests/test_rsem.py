@@ -0,0 +1,62 @@
+"""
+This is test for rnaseqde.rsem
+"""
+
+import os
+import unittest
+import tempfile
+
+import rnaseqde.rsem as rsem
+
+
+HEADER = "transcript_id\tgene_id\tlength\teffective_length\texpected_count\tTPM\tFPKM\tIsoPct\n"
+
+
+class TestRsem(unittest.TestCase):
+    def _write(self, path, rows):
+        with open(path, 'w') as f:
+            f.write(HEADER + "".join("\t".join(r) + "\n" for r in rows))
+
+    def test_merge(self):
+        with tempfile.TemporaryDirectory() as d:
+            cwd = os.getcwd()
+            os.chdir(d)
+            try:
+                self._write('A1.isoforms.results', [
+                    ('T1', 'G1', '100', '80.00', '1.00', '10.50', '9.00', '100.00'),
+                    ('T2', 'G1', '200', '180.00', '0.00', '0.00', '0.00', '0.00')
+                ])
+                self._write('B1.isoforms.results', [
+                    ('T1', 'G1', '100', '80.00', '12345.67', '1.25', '1.00', '100.00'),
+                    ('T2', 'G1', '200', '180.00', '3.00', '2.00', '1.75', '0.00')
+                ])
+
+                rsem.merge(['./A1.isoforms.results', 'B1.isoforms.results'], 'out', threads=2, abundance=True)
+
+                # NOTE: Same as rsem-generate-data-matrix; values are copied as written
+                with open(os.path.join('out', 'count_matrix.tsv')) as f:
+                    self.assertEqual(f.read(), (
+                        '\t"A1.isoforms.results"\t"B1.isoforms.results"\n'
+                        '"T1"\t1.00\t12345.67\n'
+                        '"T2"\t0.00\t3.00\n'
+                    ))
+
+                with open(os.path.join('out', 'fpkm_matrix.tsv')) as f:
+                    self.assertEqual(f.read().splitlines()[1:], ['"T1"\t9.00\t1.00', '"T2"\t0.00\t1.75'])
+
+                self.assertTrue(os.path.exists(os.path.join('out', 'tpm_matrix.tsv')))
+            finally:
+                os.chdir(cwd)
+
+    def test_reference_differ(self):
+        with tempfile.TemporaryDirectory() as d:
+            inputs = [os.path.join(d, p) for p in ['A1.isoforms.results', 'B1.isoforms.results']]
+            self._write(inputs[0], [('T1', 'G1', '1', '1', '1', '1', '1', '1')])
+            self._write(inputs[1], [('T2', 'G1', '1', '1', '1', '1', '1', '1')])
+
+            with self.assertRaises(ValueError):
+                rsem.merge(inputs, os.path.join(d, 'out'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+This is test for rnaseqde.scheduler
+"""
+
+import os
+import stat
+import unittest
+import tempfile
+from textwrap import dedent
+
+from rnaseqde.scheduler import (
+    get_scheduler,
+    UgeScheduler,
+    SlurmScheduler
+)
+from rnaseqde.resource import Resources
+import rnaseqde.utils as utils
+
+
+def _put_fake_binary(dir, name, body):
+    path = os.path.join(dir, name)
+    with open(path, 'w') as f:
+        f.write("#! /bin/sh\n" + dedent(body))
+
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._cwd = os.getcwd()
+        self._path = os.environ['PATH']
+
+        os.chdir(self._tmp.name)
+        os.environ['PATH'] = self._tmp.name + os.pathsep + self._path
+
+    def tearDown(self):
+        os.environ['PATH'] = self._path
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_uge_command(self):
+        cmd = UgeScheduler().command(
+            'foo.py', {'--bar': 'baz'}, name='foo', hold_job_ids=['1', '2'], n_tasks=3
+        )
+
+        expected = "qsub -V -terse -N foo -hold_jid 1,2 -t 1-3:1 foo.py --bar baz"
+        self.assertEqual(expected, cmd)
+
+        cmd = UgeScheduler().command('foo.py', hold_job_ids=['1'], hold_array_job_ids=['2'], n_tasks=3)
+
+        expected = "qsub -V -terse -hold_jid 1 -hold_jid_ad 2 -t 1-3:1 foo.py"
+        self.assertEqual(expected, cmd)
+
+        cmd = UgeScheduler().command('foo.py', resources=Resources(slots=4, memory=2.5))
+
+        expected = "qsub -V -terse -pe def_slot 4 -l s_vmem=2.5G,mem_req=2.5G foo.py"
+        self.assertEqual(expected, cmd)
+
+    def test_slurm_submit(self):
+        _put_fake_binary(self._tmp.name, 'sbatch', """
+            echo "$@" > sbatch_args.txt
+            echo "4242;cluster"
+            """)
+
+        job_id = SlurmScheduler().submit(
+            utils.from_root('rnaseqde/task/align_star.py'),
+            name='align_star', hold_job_ids=['41'], n_tasks=2
+        )
+
+        self.assertEqual('4242', job_id)
+
+        with open('sbatch_args.txt') as f:
+            args = f.read()
+
+        self.assertIn('--dependency afterany:41', args)
+        self.assertIn('--array 1-2:1', args)
+        self.assertIn('--cpus-per-task 2', args)
+        self.assertIn('--mem-per-cpu 32768M', args)
+
+        cmd = SlurmScheduler().command(
+            'foo.py', resources=Resources(), hold_job_ids=['41'], hold_array_job_ids=['42', '43'], n_tasks=2
+        )
+
+        self.assertIn('--dependency afterany:41,aftercorr:42:43', cmd)
+        self.assertIn('--kill-on-invalid-dep yes', cmd)
+
+    def test_slurm_status(self):
+        _put_fake_binary(self._tmp.name, 'squeue', """
+            echo "100_[2-3] PD"
+            echo "100_1 R"
+            echo "101 PD"
+            echo "102 OOM"
+            """)
+
+        expected = {
+            '100': 'running',
+            '101': 'pending',
+            '102': 'failed',
+            '103': 'finished'
+        }
+        actual = SlurmScheduler().status(['100', '101', '102', '103'])
+
+        self.assertEqual(expected, actual)
+
+    def test_uge_query(self):
+        _put_fake_binary(self._tmp.name, 'qstat', """
+            cat << EOF
+            <job_info>
+              <queue_info>
+                <job_list state="running"><JB_job_number>100</JB_job_number><state>r</state><tasks>1</tasks></job_list>
+              </queue_info>
+              <job_info>
+                <job_list state="pending"><JB_job_number>100</JB_job_number><state>qw</state><tasks>2-3:1</tasks></job_list>
+                <job_list state="pending"><JB_job_number>101</JB_job_number><state>Eqw</state></job_list>
+              </job_info>
+            </job_info>
+            EOF
+            """)
+
+        expected = {
+            '100': {1: 'running', 2: 'pending', 3: 'pending'},
+            '101': {None: 'failed'},
+            '102': {}
+        }
+        actual = UgeScheduler().query(['100', '101', '102'])
+
+        self.assertEqual(expected, actual)
+        self.assertEqual('running', UgeScheduler().status(['100'])['100'])
+
+    def test_local_submit(self):
+        scheduler = get_scheduler('local')
+        jid1 = scheduler.submit('true')
+        jid2 = scheduler.submit('false', hold_job_ids=[jid1])
+
+        self.assertFalse(scheduler.wait())
+        self.assertEqual({jid1: 'finished', jid2: 'failed'}, scheduler.status([jid1, jid2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+This is test for rnaseqde.stringtie
+"""
+
+import os
+import unittest
+import tempfile
+
+import rnaseqde.stringtie as stringtie
+
+
+GTF = (
+    '# stringtie -e -B -G a.gtf -o quantified.gtf\n'
+    '# StringTie version 2.1.4\n'
+    'chr1\tStringTie\ttranscript\t1\t100\t1000\t+\t.\tgene_id "G1"; transcript_id "T1"; ref_gene_name "A"; cov "{}"; FPKM "1.0";\n'
+    'chr1\tStringTie\texon\t1\t50\t1000\t+\t.\tgene_id "G1"; transcript_id "T1"; exon_number "1"; ref_gene_name "A"; cov "1.0";\n'
+    'chr1\tStringTie\texon\t61\t100\t1000\t+\t.\tgene_id "G1"; transcript_id "T1"; exon_number "2"; ref_gene_name "A"; cov "1.0";\n'
+    'chr1\tStringTie\ttranscript\t1\t75\t1000\t+\t.\tgene_id "G1"; transcript_id "T2"; ref_gene_name "A"; cov "{}";\n'
+    'chr1\tStringTie\texon\t1\t75\t1000\t+\t.\tgene_id "G1"; transcript_id "T2"; exon_number "1"; ref_gene_name "A"; cov "0.0";\n'
+    'chr2\tStringTie\ttranscript\t1\t30\t1000\t-\t.\tgene_id "G2"; transcript_id "T3"; cov "{}";\n'
+    'chr2\tStringTie\texon\t1\t30\t1000\t-\t.\tgene_id "G2"; transcript_id "T3"; exon_number "1"; cov "0.0";\n'
+)
+
+
+class TestStringtie(unittest.TestCase):
+    def test_extract(self):
+        with tempfile.TemporaryDirectory() as d:
+            inputs = []
+            for s, covs in [('A1', ['2.5', '0.0', '5.0']), ('B1', ['0.01', '3.0', '-1.0'])]:
+                path = os.path.join(d, s + '.gtf')
+                with open(path, 'w') as f:
+                    f.write(GTF.format(*covs))
+                inputs.append(path)
+
+            stringtie.extract(['A1', 'B1'], inputs, os.path.join(d, 'out'), threads=2)
+
+            # NOTE: T1: ceil(2.5 * 90 / 75) = 3, ceil(0.01 * 90 / 75) = 1; T3: ceil(5.0 * 30 / 75) = 2
+            with open(os.path.join(d, 'out', 'transcript_count_matrix.csv')) as f:
+                self.assertEqual(f.read(), "transcript_id,A1,B1\nT1,3,1\nT2,0,3\nT3,2,0\n")
+
+            with open(os.path.join(d, 'out', 'gene_count_matrix.csv')) as f:
+                self.assertEqual(f.read(), "gene_id,A1,B1\nG1|A,3,4\nG2,2,0\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,18 @@
 This is test for rnaseqde.utils
 """
 
+import os
 import unittest
+import tempfile
+from unittest import mock
 
-from rnaseqde.task.base import DictWrapperTask
+from rnaseqde.cache import TaskCache
+from rnaseqde.task.base import Task, DictWrapperTask
 from rnaseqde.task.align_hisat2 import AlignHisat2Task
+import rnaseqde.task.align_hisat2 as align_hisat2
+from rnaseqde.task.conv_sam2bam import ConvSamToBamTask
+from rnaseqde.task.align_star import AlignStarTask
+import rnaseqde.task.align_star as align_star
 
 
 class TestTask(unittest.TestCase):
@@ -24,6 +32,156 @@ class TestTask(unittest.TestCase):
             print("inputs: {}".format(t.inputs))
             print("outputs: {}".format(t.outputs))
 
+    def test_resolved_once(self):
+        dict_ = {
+            '--hisat2-index': 'foo',
+            '--layout': 'sr',
+            '--hisat2-output': 'sam',
+            '--fastq': ['baz.fastq.gz', 'qax.fastq.gz']
+            }
+
+        driver = DictWrapperTask(dict_, output_dir='tmp')
+        task = AlignHisat2Task([driver])
+
+        self.assertIs(task.outputs, task.outputs)
+
+        with self.assertRaises(TypeError):
+            task.outputs['--sam'] = None
+
+        task.output_dir = 'quux'
+
+        expected = ['quux/baz/aligned.sam', 'quux/qax/aligned.sam']
+        actual = task.outputs['--sam']
+        self.assertEqual(expected, actual)
+
+    def test_hisat2_output(self):
+        dict_ = {
+            '--hisat2-index': 'foo',
+            '--layout': 'sr',
+            '--hisat2-output': 'bam',
+            '--fastq': ['baz.fastq.gz', 'qax.fastq.gz']
+            }
+
+        driver = DictWrapperTask(dict_, output_dir='tmp')
+        task = AlignHisat2Task([driver])
+
+        expected = ['tmp/align_hisat2/baz/aligned.bam', 'tmp/align_hisat2/qax/aligned.bam']
+        actual = task.outputs['--bam']
+        self.assertEqual(expected, actual)
+        self.assertNotIn('--sam', task.outputs)
+
+        with tempfile.TemporaryDirectory() as d:
+            argv = ['align_hisat2', '--index', 'foo', '--conf', 'config/task', '--output-dir', d, '--fastq', 'baz.fastq.gz']
+            with mock.patch('sys.argv', argv), \
+                    mock.patch.object(Task, 'instances', []), \
+                    mock.patch.object(AlignHisat2Task, 'instances', []), \
+                    mock.patch.dict(os.environ, {'NSLOTS': '2'}), \
+                    mock.patch('rnaseqde.utils.run_command', return_value=mock.Mock(returncode=1)) as run:
+                align_hisat2.main()
+
+            # NOTE: hisat2 and samtools sort share the 2 slots of the job
+            cmd = run.call_args[0][0]
+            self.assertIn('--threads 1 ', cmd)
+            self.assertIn('samtools sort -@ 0 ', cmd)
+
+    def test_pending_indices(self):
+        with tempfile.TemporaryDirectory() as d:
+            dict_ = {
+                '--hisat2-index': 'foo',
+                '--layout': 'sr',
+                '--fastq': ['baz.fastq.gz', 'qax.fastq.gz']
+                }
+
+            driver = DictWrapperTask(dict_, output_dir=d)
+            task = AlignHisat2Task([driver])
+
+            with mock.patch.object(Task, 'cache', TaskCache(path=os.path.join(d, 'cache.json'))):
+                self.assertIsNone(task.pending_indices())
+
+                Task.cache.record(task.cache_key, task.task_name, task.products)
+                task.mark_completed('baz.fastq.gz')
+                self.assertEqual([2], task.pending_indices())
+
+                env = {'RNASEQDE_TASK_ID': '1', 'RNASEQDE_TASK_MAP': task.write_task_map([2])}
+                with mock.patch.dict(os.environ, env):
+                    self.assertEqual(['qax.fastq.gz'], task.scattered(dict_['--fastq']))
+
+    def test_scattered_step(self):
+        inputs = ['a', 'b', 'c', 'd', 'e']
+
+        env = {'RNASEQDE_TASK_ID': '3', 'RNASEQDE_TASK_STEPSIZE': '2', 'RNASEQDE_TASK_LAST': '5'}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(['c', 'd'], AlignHisat2Task.scattered(inputs))
+
+        env = {'RNASEQDE_TASK_ID': '5', 'RNASEQDE_TASK_STEPSIZE': '2', 'RNASEQDE_TASK_LAST': '5'}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(['e'], AlignHisat2Task.scattered(inputs))
+
+    def test_holds_elementwise(self):
+        dict_ = {
+            '--hisat2-index': 'foo',
+            '--layout': 'sr',
+            '--hisat2-output': 'sam',
+            '--dry-run': False,
+            '--fastq': ['baz.fastq.gz', 'qax.fastq.gz']
+            }
+
+        driver = DictWrapperTask(dict_, output_dir='tmp')
+        aligned = AlignHisat2Task([driver])
+        converted = ConvSamToBamTask([aligned])
+
+        aligned._job_id = '1'
+        aligned.submission = ([1, 2], 1)
+
+        # NOTE: Sorting of sample i waits only for alignment of sample i
+        converted.submission = ([1, 2], 1)
+        self.assertEqual((None, ['1']), (converted.hold_job_ids, converted.hold_array_job_ids))
+
+        # NOTE: Elements differ by the chunks or partial resubmission
+        for submission in [([1], 1), ([1, 2], 2)]:
+            converted.submission = submission
+            self.assertEqual((['1'], None), (converted.hold_job_ids, converted.hold_array_job_ids))
+
+    def test_star_batch(self):
+        dict_ = {
+            '--star-index': 'foo',
+            '--gtf': 'bar',
+            '--layout': 'sr',
+            '--fastq': ['a.fastq.gz', 'b.fastq.gz', 'c.fastq.gz']
+            }
+
+        task = AlignStarTask([DictWrapperTask(dict_, output_dir='tmp')])
+        self.assertEqual(1, task.step(task.n_tasks))
+
+        task = AlignStarTask([DictWrapperTask({**dict_, '--star-batch': 2}, output_dir='tmp')])
+        self.assertEqual(2, task.step(task.n_tasks))
+        self.assertEqual(['a.fastq.gz', 'b.fastq.gz', 'c.fastq.gz'], task.inputs['--fastq'])
+
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, 'align_star.yml'), 'w') as f:
+                f.write("--twopassMode: Basic\n")
+
+            def run_command(cmd, *args, **kwargs):
+                raise OSError('Remove') if 'Remove' in cmd else RuntimeError('Align')
+
+            argv = [
+                'align_star', '--index', 'foo', '--gtf', 'bar.gtf', '--star-batch', '2',
+                '--conf', d, '--output-dir', d, '--fastq', 'a.fastq.gz'
+            ]
+            with mock.patch('sys.argv', argv), \
+                    mock.patch.object(Task, 'instances', []), \
+                    mock.patch.object(AlignStarTask, 'instances', []), \
+                    mock.patch('rnaseqde.utils.run_command', side_effect=run_command) as run:
+                # NOTE: Not hidden by the failure to remove the genome
+                with self.assertRaisesRegex(RuntimeError, 'Align'):
+                    align_star.main()
+
+            cmds = [c[0][0] for c in run.call_args_list]
+            self.assertEqual(2, len(cmds))
+            self.assertIn('--genomeLoad LoadAndKeep', cmds[0])
+            self.assertNotIn('--twopassMode', cmds[0])
+            self.assertNotIn('--sjdbGTFfile', cmds[0])
+
 
 if __name__ == '__main__':
     unittest.main()
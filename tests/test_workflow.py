@@ -0,0 +1,108 @@
+"""
+This is test for rnaseqde.workflow.compiler
+"""
+
+import os
+import unittest
+import tempfile
+
+import rnaseqde.workflow.compiler as compiler
+from rnaseqde.task.base import DictWrapperTask, AliasTask
+from rnaseqde.task.align_hisat2 import AlignHisat2Task
+from rnaseqde.task.conv_sam2bam import ConvSamToBamTask
+from rnaseqde.task.quant_stringtie import QuantStringtieTask
+
+
+OPT = {'--layout': 'sr', '--strandness': 'none', '--dry-run': True, '<sample_sheet>': 'sample_sheet.tsv'}
+
+
+class TestWorkflow(unittest.TestCase):
+    def test_load_definition(self):
+        definition = compiler.load_definition('fullset')
+
+        self.assertIn('conv_rsem_to_matrix', definition['steps']['de'])
+        self.assertEqual(
+            definition['tasks']['quant_stringtie']['after'],
+            [('align_hisat2', {'--hisat2-output': 'bam'}), ('conv_sam_to_bam', {}),
+             ('align_star', {}), ('align_tophat2', {})]
+        )
+
+        for n in ['star-rsem-ebseq', 'hisat2-stringtie-ballgown', 'tophat2-cuffdiff', 'kallisto-sleuth', 'salmon-deseq2']:
+            compiler.Compiler(compiler.load_definition(n))
+
+    def test_compile(self):
+        definition = compiler.load_definition('hisat2-stringtie-ballgown')
+        opt = {**OPT, '--hisat2-index': 'foo', '--gtf': 'bar', '--fastq': ['baz.fastq.gz']}
+
+        for hisat2_output, expected in [('bam', []), ('sam', [ConvSamToBamTask])]:
+            opt_ = {**opt, '--hisat2-output': hisat2_output}
+            queued = compiler.Compiler(definition).compile(opt_, [DictWrapperTask(opt_, output_dir='tmp')])
+
+            self.assertEqual([type(t) for t in queued['conv_sam_to_bam']], expected)
+            self.assertEqual(len(queued['quant_stringtie']), 1)
+
+    def test_dedup(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'custom.yml')
+            with open(path, 'w') as f:
+                f.write(
+                    "include: [hisat2-stringtie-ballgown]\n"
+                    "tasks:\n"
+                    "  align_hisat2_again: {task: align_hisat2, after: [root]}\n"
+                    "  quant_stringtie: {after: [align_hisat2_again]}\n"
+                )
+
+            opt = {**OPT, '--hisat2-output': 'bam', '--hisat2-index': 'foo', '--gtf': 'bar'}
+            root = DictWrapperTask({**opt, '--fastq': ['baz.fastq.gz']}, output_dir='tmp')
+            queued = compiler.Compiler(compiler.load_definition(path)).compile(opt, [root])
+
+            self.assertIs(queued['align_hisat2'][0], queued['align_hisat2_again'][0])
+            self.assertIsInstance(queued['align_hisat2'][0], AlignHisat2Task)
+            self.assertEqual(len(queued['quant_stringtie']), 1)
+            self.assertIsInstance(queued['quant_stringtie'][0], QuantStringtieTask)
+
+    def test_shared(self):
+        definition = compiler.load_definition('salmon-deseq2')
+        opt = {**OPT, '--salmon-index': 'foo', '--fastq': ['baz.fastq.gz'], '--sample': ['baz']}
+        roots = [
+            DictWrapperTask({**opt, '--gtf': "{}.gtf".format(k)}, output_dir=k, annotation=k)
+            for k in ['gencode', 'gencode_basic']
+        ]
+
+        queued = compiler.Compiler(definition).compile(opt, roots)
+        salmon, alias = queued['quant_salmon']
+
+        # NOTE: Salmon runs once; counts are converted with the GTF of each annotation
+        self.assertIsInstance(alias, AliasTask)
+        self.assertIs(alias.canonical, salmon)
+        self.assertEqual(alias.output_dir, 'gencode_basic/quant_salmon')
+        self.assertNotIn(alias, salmon.__class__.instances)
+
+        salmon._job_id = '1'
+        converted = {t.annotation: t for t in queued['conv_any_to_raw']}
+        self.assertEqual(converted['gencode_basic'].inputs['--input'], ['gencode/quant_salmon/baz/quant.sf'])
+        self.assertEqual(converted['gencode_basic'].inputs['--gtf'], 'gencode_basic.gtf')
+        self.assertEqual(converted['gencode_basic'].hold_job_ids, ['1'])
+        self.assertEqual(converted['gencode_basic'].output_dir, 'gencode_basic/quant_salmon/conv_any_to_raw')
+
+    def test_invalid(self):
+        with tempfile.TemporaryDirectory() as d:
+            definitions = {
+                'cycle.yml': "tasks:\n  align_star: {after: [quant_rsem]}\n  quant_rsem: {after: [align_star]}\n",
+                'unknown.yml': "tasks:\n  align_foo: {after: [root]}\n",
+                'self.yml': "include: [{}]\n".format(os.path.join(d, 'self.yml'))
+            }
+            for name, text in definitions.items():
+                with open(os.path.join(d, name), 'w') as f:
+                    f.write(text)
+
+            with self.assertRaisesRegex(ValueError, 'cycle'):
+                compiler.Compiler(compiler.load_definition(os.path.join(d, 'cycle.yml'))).compile({}, [])
+            with self.assertRaisesRegex(ValueError, 'Unknown task'):
+                compiler.Compiler(compiler.load_definition(os.path.join(d, 'unknown.yml')))
+            with self.assertRaisesRegex(ValueError, 'includes itself'):
+                compiler.load_definition(os.path.join(d, 'self.yml'))
+
+
+if __name__ == '__main__':
+    unittest.main()